@@ -4,8 +4,23 @@
 Reverse engineers the sound_cpu_8051.bin to understand UART command protocol
 """
 
+import mmap
+import re
 import struct
 import sys
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional - without it decode_all walks the instruction
+    # boundaries of a region one opcode at a time in the interpreter
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 # 8051 Instruction set - opcodes and mnemonics
 OPCODES = {
@@ -151,74 +166,145 @@ SFR_NAMES = {
     0xD0: "PSW",    # Program status word
 }
 
+# Operand text for every direct address: the SFR name or the raw hex value
+_SFR = tuple(SFR_NAMES.get(i, f"0x{i:02X}") for i in range(256))
+
+# Operand kind flags, derived once from the mnemonic text
+HAS_DIRECT = 0x01
+HAS_DATA = 0x02
+HAS_REL = 0x04
+HAS_ADDR16 = 0x08
+HAS_DATA16 = 0x10
+
+# Operand placeholders as they appear in the OPCODES mnemonics
+_OPERAND_RE = re.compile(r"#data16|#data|direct|addr16|rel")
+
+# Opcode metadata as parallel 256-entry arrays indexed by opcode. OP_FMT_ID
+# points into _MNEMONICS; id 0 is reserved for unknown opcodes.
+OP_LEN = np.ones(256, dtype=np.uint8)
+OP_KIND = np.zeros(256, dtype=np.uint8)
+OP_FMT_ID = np.zeros(256, dtype=np.uint8)
+_MNEMONICS = [None]
+
+for _op, (_mnem, _length) in OPCODES.items():
+    if _mnem not in _MNEMONICS:
+        _MNEMONICS.append(_mnem)
+    OP_FMT_ID[_op] = _MNEMONICS.index(_mnem)
+    OP_LEN[_op] = _length
+    OP_KIND[_op] = ((HAS_DIRECT if "direct" in _mnem else 0) |
+                    (HAS_DATA16 if "#data16" in _mnem else
+                     HAS_DATA if "#data" in _mnem else 0) |
+                    (HAS_REL if "rel" in _mnem else 0) |
+                    (HAS_ADDR16 if "addr16" in _mnem else 0))
+
+# Opcodes that compare or branch on A (CJNE A,#data / JZ / JNZ)
+_CMP_OP = np.zeros(256, dtype=bool)
+_CMP_OP[[0xB4, 0x60, 0x70]] = True
+
+# Two-digit hex text for every byte value
+_HEX = tuple(f"{i:02X}" for i in range(256))
+
 def load_binary(filename):
-    """Load the binary file"""
+    """Map the binary file read-only (no copy into the Python heap)"""
     with open(filename, 'rb') as f:
-        return bytearray(f.read())
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+# Operand formatters - one function per opcode, generated at import with the
+# operand decoding and the mnemonic text inlined into a single f-string.
+# Each maps chunk -> (instr, length, disp). chunk holds the instruction
+# bytes; for relative branches instr keeps a {tgt} placeholder and disp is
+# the target offset from the instruction address, so the result does not
+# depend on where the instruction sits.
+
+_SFR_OPERAND = "{_SFR[chunk[1]]}"
+_REL_OPERAND = "0x{{tgt}}"
+
+def _operand_fields(length, kind):
+    """Return the f-string field for each substituted placeholder and the
+    branch displacement expression (or None) for an opcode kind"""
+    if length == 2:
+        if kind & HAS_DIRECT:
+            return {"direct": _SFR_OPERAND}, None
+        elif kind & HAS_DATA:
+            return {"#data": "#0x{chunk[1]:02X}"}, None
+        elif kind & HAS_REL:
+            return {"rel": _REL_OPERAND}, "2 + ((chunk[1] ^ 0x80) - 0x80)"
+    elif length == 3:
+        if kind & HAS_ADDR16:
+            return {"addr16": "0x{(chunk[1] << 8) | chunk[2]:04X}"}, None
+        elif kind & HAS_DATA16:
+            return {"#data16": "#0x{(chunk[1] << 8) | chunk[2]:04X}"}, None
+        elif (kind & (HAS_DIRECT | HAS_DATA)) == (HAS_DIRECT | HAS_DATA):
+            return {"direct": _SFR_OPERAND, "#data": "#0x{chunk[2]:02X}"}, None
+        elif kind & HAS_REL:
+            disp = "3 + ((chunk[2] ^ 0x80) - 0x80)"
+            if kind & HAS_DATA:
+                return {"#data": "#0x{chunk[1]:02X}", "rel": _REL_OPERAND}, disp
+            return {"direct": _SFR_OPERAND, "rel": _REL_OPERAND}, disp
+    return {}, None
+
+def _formatter_source(opcode):
+    """Generate the source of the formatter function for one opcode"""
+    fmt_id = int(OP_FMT_ID[opcode])
+    if fmt_id == 0:
+        instr = f"DB 0x{opcode:02X}  ; Unknown opcode"
+        body = f"return {instr!r}, 1, None"
+    else:
+        mnem = _MNEMONICS[fmt_id].replace("{", "{{").replace("}", "}}")
+        fields, disp = _operand_fields(int(OP_LEN[opcode]), int(OP_KIND[opcode]))
+        text = _OPERAND_RE.sub(lambda m: fields.get(m.group(), m.group()), mnem)
+        body = f"return f{text!r}, {int(OP_LEN[opcode])}, {disp}"
+    return f"def _fmt_{opcode:02X}(chunk):\n    {body}\n"
+
+_formatters = {"_SFR": _SFR}
+exec(compile("".join(_formatter_source(op) for op in range(256)),
+             "<opcode formatters>", "exec"), _formatters)
+_FORMATTER = [_formatters[f"_fmt_{op:02X}"] for op in range(256)]
+_LENGTH = tuple(OP_LEN.tolist())
+
+@njit(cache=True)
+def decode_all(data_u8, start, end, max_count, op_len):
+    """
+    Walk instruction boundaries from start up to end
+    
+    Returns:
+        (addrs, lengths) arrays of the decoded instructions, at most
+        max_count entries
+    """
+    addrs = np.empty(max_count, dtype=np.int32)
+    lengths = np.empty(max_count, dtype=np.int32)
+    pc = start
+    count = 0
+    while pc < end and count < max_count:
+        length = int(op_len[data_u8[pc]])
+        addrs[count] = pc
+        lengths[count] = length
+        pc += length
+        count += 1
+    return addrs[:count], lengths[:count]
+
+@lru_cache(maxsize=4096)
+def _decode(chunk):
+    """Decode instruction bytes independently of their address"""
+    return _FORMATTER[chunk[0]](chunk)
 
 def disassemble_instruction(data, addr):
     """Disassemble a single instruction"""
     if addr >= len(data):
         return None, 0
     
-    opcode = data[addr]
-    
-    if opcode not in OPCODES:
-        return f"DB 0x{opcode:02X}  ; Unknown opcode", 1
-    
-    mnem, length = OPCODES[opcode]
-    
-    # Build instruction string with operands
-    instr = mnem
-    operands = []
-    
-    for i in range(1, length):
-        if addr + i < len(data):
-            operands.append(data[addr + i])
-    
-    # Format the operands
-    if length == 2:
-        if "direct" in mnem:
-            sfr = operands[0] if operands else 0
-            sfr_name = SFR_NAMES.get(sfr, f"0x{sfr:02X}")
-            instr = instr.replace("direct", sfr_name)
-        elif "#data" in mnem:
-            instr = instr.replace("#data", f"#0x{operands[0]:02X}")
-        elif "rel" in mnem:
-            rel = operands[0] if operands else 0
-            if rel > 127:
-                rel = rel - 256
-            target = addr + length + rel
-            instr = instr.replace("rel", f"0x{target:04X}")
-    elif length == 3:
-        if "addr16" in mnem:
-            addr16 = (operands[0] << 8) | operands[1] if len(operands) >= 2 else 0
-            instr = instr.replace("addr16", f"0x{addr16:04X}")
-        elif "#data16" in mnem:
-            data16 = (operands[0] << 8) | operands[1] if len(operands) >= 2 else 0
-            instr = instr.replace("#data16", f"#0x{data16:04X}")
-        elif "direct" in mnem and "#data" in mnem:
-            sfr = operands[0] if operands else 0
-            sfr_name = SFR_NAMES.get(sfr, f"0x{sfr:02X}")
-            data_val = operands[1] if len(operands) >= 2 else 0
-            instr = instr.replace("direct", sfr_name).replace("#data", f"#0x{data_val:02X}")
-        elif "rel" in mnem:
-            if "#data" in mnem:
-                data_val = operands[0] if operands else 0
-                rel = operands[1] if len(operands) >= 2 else 0
-            else:
-                sfr = operands[0] if operands else 0
-                sfr_name = SFR_NAMES.get(sfr, f"0x{sfr:02X}")
-                rel = operands[1] if len(operands) >= 2 else 0
-                instr = instr.replace("direct", sfr_name)
-                
-            if rel > 127:
-                rel = rel - 256
-            target = addr + length + rel
-            instr = instr.replace("rel", f"0x{target:04X}")
-            if "#data" in instr:
-                instr = instr.replace("#data", f"#0x{data_val:02X}")
+    length = _LENGTH[data[addr]]
+    chunk = bytes(data[addr:addr + length])
+    if len(chunk) < length:
+        # Truncated at the end of the binary - missing operands read as 0,
+        # and a 16-bit operand reads as 0 unless both of its bytes are there
+        if OP_KIND[chunk[0]] & (HAS_ADDR16 | HAS_DATA16):
+            chunk = chunk[:1]
+        chunk = chunk.ljust(length, b"\x00")
     
+    instr, length, disp = _decode(chunk)
+    if disp is not None:
+        instr = instr.format(tgt=f"{addr + disp:04X}")
     return instr, length
 
 def analyze_interrupt_vectors(data):
@@ -242,88 +328,95 @@ def analyze_interrupt_vectors(data):
             else:
                 print(f"{addr:04X}: {name:30s} -> 0x{opcode:02X}")
 
+def _write_lines(lines):
+    """Write a batch of output lines with a single stdout write"""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+
+def _find_all(data, pattern, end):
+    """Return every address where pattern starts and ends before end"""
+    found = []
+    addr = data.find(pattern, 0, end)
+    while addr >= 0:
+        found.append(addr)
+        addr = data.find(pattern, addr + 1, end)
+    return found
+
 def find_uart_operations(data):
     """Find UART-related operations (SBUF accesses)"""
     print("\n=== UART OPERATIONS (SBUF 0x99 accesses) ===")
-    uart_ops = []
+    end = len(data) - 1
     
-    for addr in range(len(data) - 2):
-        # Look for MOV operations with SBUF (0x99)
-        if data[addr] == 0xF5 and data[addr+1] == 0x99:  # MOV 0x99,A
-            uart_ops.append((addr, "UART_TX: MOV SBUF,A (transmit)"))
-        elif data[addr] == 0xE5 and data[addr+1] == 0x99:  # MOV A,0x99
-            uart_ops.append((addr, "UART_RX: MOV A,SBUF (receive)"))
-        # Check for SBUF comparisons
-        elif addr < len(data) - 3:
-            if data[addr] == 0x90 and data[addr+1] == 0x00 and data[addr+2] == 0x99:  # MOV DPTR,#0x0099
-                uart_ops.append((addr, "UART: Load DPTR with SBUF address"))
+    # Look for MOV operations with SBUF (0x99)
+    uart_ops = [(addr, "UART_TX: MOV SBUF,A (transmit)")
+                for addr in _find_all(data, b"\xF5\x99", end)]  # MOV 0x99,A
+    uart_ops += [(addr, "UART_RX: MOV A,SBUF (receive)")
+                 for addr in _find_all(data, b"\xE5\x99", end)]  # MOV A,0x99
+    # Check for SBUF comparisons
+    uart_ops += [(addr, "UART: Load DPTR with SBUF address")
+                 for addr in _find_all(data, b"\x90\x00\x99", end)]  # MOV DPTR,#0x0099
+    uart_ops.sort()
     
-    for addr, desc in uart_ops[:20]:  # Show first 20
-        print(f"{addr:04X}: {desc}")
+    _write_lines([f"{addr:04X}: {desc}" for addr, desc in uart_ops[:20]])  # Show first 20
     
     return uart_ops
 
 def find_port_operations(data):
     """Find Port P1 operations (AY-3-8910 control)"""
     print("\n=== PORT P1 OPERATIONS (0x90 - AY-3-8910 bus) ===")
-    port_ops = []
+    end = len(data) - 1
     
-    for addr in range(len(data) - 2):
-        # Look for P1 (0x90) operations
-        if data[addr] == 0xF5 and data[addr+1] == 0x90:  # MOV P1,A
-            port_ops.append((addr, "AY_WRITE: MOV P1,A (write to AY-3-8910)"))
-        elif data[addr] == 0xE5 and data[addr+1] == 0x90:  # MOV A,P1
-            port_ops.append((addr, "AY_READ: MOV A,P1 (read from AY-3-8910)"))
-        elif data[addr] == 0x75 and data[addr+1] == 0x90:  # MOV P1,#data
-            value = data[addr+2] if addr+2 < len(data) else 0
-            port_ops.append((addr, f"AY_WRITE_IMM: MOV P1,#0x{value:02X}"))
+    # Look for P1 (0x90) operations
+    port_ops = [(addr, "AY_WRITE: MOV P1,A (write to AY-3-8910)")
+                for addr in _find_all(data, b"\xF5\x90", end)]  # MOV P1,A
+    port_ops += [(addr, "AY_READ: MOV A,P1 (read from AY-3-8910)")
+                 for addr in _find_all(data, b"\xE5\x90", end)]  # MOV A,P1
+    port_ops += [(addr, f"AY_WRITE_IMM: MOV P1,#0x{data[addr+2]:02X}")
+                 for addr in _find_all(data, b"\x75\x90", end)]  # MOV P1,#data
+    port_ops.sort()
     
-    for addr, desc in port_ops[:30]:  # Show first 30
-        print(f"{addr:04X}: {desc}")
+    _write_lines([f"{addr:04X}: {desc}" for addr, desc in port_ops[:30]])  # Show first 30
     
     return port_ops
 
 def disassemble_region(data, start, end, name):
     """Disassemble a region of code"""
     print(f"\n=== {name} ===")
-    addr = start
-    count = 0
     max_instructions = 50  # Limit output
     
-    while addr < end and addr < len(data) and count < max_instructions:
-        instr, length = disassemble_instruction(data, addr)
-        if instr:
-            # Get hex bytes
-            hex_bytes = " ".join(f"{data[addr+i]:02X}" for i in range(min(length, end-addr)))
-            print(f"{addr:04X}: {hex_bytes:12s} {instr}")
-            addr += length
-            count += 1
-        else:
-            break
+    # Decode the instruction boundaries in one pass; only the instructions
+    # actually printed go through the Python formatters
+    addrs, lengths = decode_all(np.frombuffer(data, dtype=np.uint8), start,
+                                min(end, len(data)), max_instructions, OP_LEN)
+    
+    lines = []
+    for addr, length in zip(addrs.tolist(), lengths.tolist()):
+        instr, _ = disassemble_instruction(data, addr)
+        # Get hex bytes
+        hex_bytes = " ".join(_HEX[data[addr+i]] for i in range(min(length, end-addr)))
+        lines.append(f"{addr:04X}: {hex_bytes:12s} {instr}")
+    _write_lines(lines)
 
 def analyze_command_patterns(data):
     """Analyze potential command byte patterns"""
     print("\n=== COMMAND PATTERN ANALYSIS ===")
     
     # Look for byte comparisons that might be command codes
-    commands = set()
+    a = np.frombuffer(data, dtype=np.uint8)
+    n = len(a)
+    
+    # CJNE A,#data,rel (0xB4)
+    cjne = a[:n-2] == 0xB4
+    # MOV A,#data followed by comparison or jump
+    mov = (a[:n-2] == 0x74) & _CMP_OP[a[2:]]
     
-    for addr in range(len(data) - 2):
-        # CJNE A,#data,rel (0xB4)
-        if data[addr] == 0xB4:
-            cmd = data[addr+1]
-            commands.add(cmd)
-        # MOV A,#data followed by comparison context
-        elif data[addr] == 0x74:
-            cmd = data[addr+1]
-            # Check if followed by comparison or jump
-            if addr + 2 < len(data) and data[addr+2] in [0xB4, 0x60, 0x70]:
-                commands.add(cmd)
+    # np.unique returns the distinct operand bytes already sorted
+    commands = np.unique(a[1:n-1][cjne | mov])
     
-    print(f"Found {len(commands)} potential command bytes:")
-    for cmd in sorted(commands):
-        if 0xA0 <= cmd <= 0xBF:  # Likely command range
-            print(f"  0x{cmd:02X} ({cmd})")
+    lines = [f"Found {len(commands)} potential command bytes:"]
+    for cmd in commands[(commands >= 0xA0) & (commands <= 0xBF)].tolist():  # Likely command range
+        lines.append(f"  0x{cmd:02X} ({cmd})")
+    _write_lines(lines)
 
 def main():
     filename = "/home/runner/work/Mephisto/Mephisto/sound_cpu_8051.bin"
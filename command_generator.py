@@ -6,12 +6,23 @@ This script helps generate command sequences to test the 8051 sound CPU
 and AY-3-8910 PSG system.
 """
 
+from functools import lru_cache
+
+# Two-digit hex text for every byte value
+_HEX = tuple(f"{i:02X}" for i in range(256))
+
 def format_bytes(byte_list):
-    """Format a list of bytes for display"""
-    hex_str = " ".join(f"{b:02X}" for b in byte_list)
+    """Format a sequence of bytes for display"""
+    hex_str = " ".join(_HEX[b] for b in byte_list)
     dec_str = " ".join(f"{b:3d}" for b in byte_list)
     return f"Hex: {hex_str}\nDec: {dec_str}"
 
+# Command frames; the variable bytes are patched in place per call
+_PLAY_NOTE = bytearray(b"\xB5\xA4\x00\x00\x00\x00\xB0")
+_SET_FREQ_LOW = bytearray(b"\xB6\xA2\x00\x00\xB0")
+_SET_FREQ_HIGH = bytearray(b"\xB5\xA3\x00\x00\xB0")
+_STOP_ALL = b"\xB5\xA6\xB0"
+
 def cmd_play_note(channel, freq_low, freq_high, amplitude):
     """
     Generate command to play a note
@@ -23,23 +34,31 @@ def cmd_play_note(channel, freq_low, freq_high, amplitude):
         amplitude: Volume (0-15)
     
     Returns:
-        List of bytes
+        Command bytes
     """
-    return [0xB5, 0xA4, channel & 0x0F, freq_low & 0xFF, 
-            freq_high & 0x0F, amplitude & 0x0F, 0xB0]
+    _PLAY_NOTE[2] = channel & 0x0F
+    _PLAY_NOTE[3] = freq_low & 0xFF
+    _PLAY_NOTE[4] = freq_high & 0x0F
+    _PLAY_NOTE[5] = amplitude & 0x0F
+    return bytes(_PLAY_NOTE)
 
 def cmd_set_freq_low(channel, value):
     """Generate command to set frequency low byte"""
-    return [0xB6, 0xA2, channel & 0x0F, value & 0xFF, 0xB0]
+    _SET_FREQ_LOW[2] = channel & 0x0F
+    _SET_FREQ_LOW[3] = value & 0xFF
+    return bytes(_SET_FREQ_LOW)
 
 def cmd_set_freq_high(channel, value):
     """Generate command to set frequency high byte"""
-    return [0xB5, 0xA3, channel & 0x0F, value & 0x0F, 0xB0]
+    _SET_FREQ_HIGH[2] = channel & 0x0F
+    _SET_FREQ_HIGH[3] = value & 0x0F
+    return bytes(_SET_FREQ_HIGH)
 
 def cmd_stop_all():
     """Generate command to stop all channels"""
-    return [0xB5, 0xA6, 0xB0]
+    return _STOP_ALL
 
+@lru_cache(maxsize=256)
 def freq_to_period(freq_hz, clock_freq=2000000):
     """Convert frequency in Hz to AY-3-8910 period value"""
     if freq_hz == 0:
@@ -50,6 +69,24 @@ def period_to_bytes(period):
     """Convert period to (low_byte, high_byte)"""
     return (period & 0xFF, (period >> 8) & 0x0F)
 
+# Note frequencies for octave 4 (middle octave)
+_OCTAVE4_FREQS = {
+    'C': 261.63, 'C#': 277.18, 'Db': 277.18,
+    'D': 293.66, 'D#': 311.13, 'Eb': 311.13,
+    'E': 329.63,
+    'F': 349.23, 'F#': 369.99, 'Gb': 369.99,
+    'G': 392.00, 'G#': 415.30, 'Ab': 415.30,
+    'A': 440.00, 'A#': 466.16, 'Bb': 466.16,
+    'B': 493.88,
+}
+
+# Every accepted note name ("A", "A0".."A9", ...) mapped to its frequency;
+# a bare note name means octave 4
+_NOTE_FREQS = dict(_OCTAVE4_FREQS)
+for _note, _base_freq in _OCTAVE4_FREQS.items():
+    for _octave in range(10):
+        _NOTE_FREQS[f"{_note}{_octave}"] = _base_freq * (2 ** (_octave - 4))
+
 def note_to_freq(note_name):
     """
     Convert note name to frequency
@@ -60,29 +97,11 @@ def note_to_freq(note_name):
     Returns:
         Frequency in Hz
     """
-    # Note frequencies for octave 4 (middle octave)
-    notes = {
-        'C': 261.63, 'C#': 277.18, 'Db': 277.18,
-        'D': 293.66, 'D#': 311.13, 'Eb': 311.13,
-        'E': 329.63,
-        'F': 349.23, 'F#': 369.99, 'Gb': 369.99,
-        'G': 392.00, 'G#': 415.30, 'Ab': 415.30,
-        'A': 440.00, 'A#': 466.16, 'Bb': 466.16,
-        'B': 493.88,
-    }
-    
-    # Parse note name
-    note = note_name[:-1] if note_name[-1].isdigit() else note_name
-    octave = int(note_name[-1]) if note_name[-1].isdigit() else 4
-    
-    if note not in notes:
-        raise ValueError(f"Unknown note: {note}")
-    
-    # Get base frequency and adjust for octave
-    base_freq = notes[note]
-    freq = base_freq * (2 ** (octave - 4))
-    
-    return freq
+    try:
+        return _NOTE_FREQS[note_name]
+    except KeyError:
+        note = note_name[:-1] if note_name[-1].isdigit() else note_name
+        raise ValueError(f"Unknown note: {note}") from None
 
 def generate_note_command(channel, note_name, amplitude=12):
     """
@@ -94,7 +113,7 @@ def generate_note_command(channel, note_name, amplitude=12):
         amplitude: Volume (0-15)
     
     Returns:
-        List of bytes
+        Command bytes
     """
     freq = note_to_freq(note_name)
     period = freq_to_period(freq)
@@ -159,9 +178,9 @@ def main():
         note = f"A{octave}"
         freq = note_to_freq(note)
         period = freq_to_period(freq)
-        cmd = generate_note_command(0, note, 12)
+        cmd = cmd_play_note(0, *period_to_bytes(period), 12)
         print(f"{note}: {freq:7.2f} Hz, Period: {period:4d}, "
-              f"Cmd: {' '.join(f'{b:02X}' for b in cmd)}")
+              f"Cmd: {' '.join(_HEX[b] for b in cmd)}")
     
     print("\n9. CHROMATIC SCALE (C4 to B4)")
     print("-" * 70)
@@ -202,16 +221,19 @@ def main():
     print("Note  | Freq (Hz) | Period | Low | High | Amplitude 12 Command")
     print("------+-----------+--------+-----+------+------------------------")
     
+    # Each note's period is computed once and the command is built from the
+    # same bytes; the rows are then written in a single call
+    rows = []
     for octave in range(3, 6):
         for note in ["C", "D", "E", "F", "G", "A", "B"]:
             note_name = f"{note}{octave}"
             freq = note_to_freq(note_name)
             period = freq_to_period(freq)
             low, high = period_to_bytes(period)
-            cmd = generate_note_command(0, note_name, 12)
-            cmd_str = " ".join(f"{b:02X}" for b in cmd)
-            print(f"{note_name:5s} | {freq:9.2f} | {period:6d} | "
-                  f"{low:3d} | {high:4d} | {cmd_str}")
+            cmd_str = " ".join(_HEX[b] for b in cmd_play_note(0, low, high, 12))
+            rows.append(f"{note_name:5s} | {freq:9.2f} | {period:6d} | "
+                        f"{low:3d} | {high:4d} | {cmd_str}")
+    print("\n".join(rows))
 
 
 if __name__ == "__main__":
@@ -8,13 +8,342 @@ Generator with real-time audio synthesis.
 
 import numpy as np
 import threading
-import queue
 import time
 
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    # Numba is optional - without it blocks are generated with NumPy
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Samples generated per call to the block generator
+BLOCK_SIZE = 512
+
+# Frames requested by each PyAudio stream callback
+FRAMES_PER_BUFFER = 1024
+
+# Galois-form taps of the noise LFSR polynomial x^17 + x^14 + 1
+_NOISE_TAPS = 0x12000
+
+# One channel's block in get_state_string()
+_CHANNEL_STATE_FORMAT = (
+    "Channel {name}:\n"
+    "  Period: {period:4d} (0x{period:03X})\n"
+    "  Frequency: {freq:7.2f} Hz\n"
+    "  Amplitude: {amp:2d} (0x{amp:02X})\n"
+    "  Tone: {tone}, Noise: {noise}"
+)
+
+
+def _build_lfsr_advance():
+    """
+    Build the noise LFSR advance table
+
+    The 17-bit LFSR is linear over GF(2), so the state k steps on from s is
+    the XOR of the states k steps on from each byte of s taken alone:
+    table[k, j, v] is the state k steps on from v << (8 * j).
+    """
+    table = np.empty((17, 3, 256), np.int64)
+    for j in range(3):
+        state = (np.arange(256, dtype=np.int64) << (8 * j)) & 0x1FFFF
+        for k in range(17):
+            table[k, j] = state
+            state = (state >> 1) ^ (-(state & 1) & _NOISE_TAPS)
+    return table
+
+
+# The noise LFSR steps at most 16 times per sample
+_LFSR_ADVANCE = _build_lfsr_advance()
+
+
+def _build_lfsr_jumps(levels):
+    """
+    Build the noise LFSR power-of-two jump table
+
+    table[j, b, v] is the state 2**j steps on from v << (8 * b), composed
+    from the one-step table by repeated squaring.
+    """
+    table = np.empty((levels, 3, 256), np.int64)
+    table[0] = _LFSR_ADVANCE[1]
+    for j in range(1, levels):
+        prev = table[j - 1]
+        table[j] = prev[0, prev & 0xFF] ^ prev[1, (prev >> 8) & 0xFF] ^ prev[2, prev >> 16]
+    return table
+
+
+# Enough jumps for the noise steps of a whole block
+_LFSR_JUMPS = _build_lfsr_jumps((16 * BLOCK_SIZE).bit_length())
+
+# Sub-step (1-based) at which each sample of a block ends
+_SAMPLE_ENDS = np.arange(16, 16 * BLOCK_SIZE + 1, 16)
+
+# Register 7 bit numbers: tone enables for A-C, then noise enables for A-C
+_MIXER_BITS = np.arange(6)
+
+# Output of the logarithmic DAC for each 4-bit level, in steps of 3 dB
+# (1.0 at level 15), scaled by 1/3 for the three-channel mix
+_VOLUME_TABLE = (2.0 ** (np.arange(16) / 2.0 - 7.5)) / 3.0
+_VOLUME_TABLE[0] = 0.0
+_VOLUME_TABLE = _VOLUME_TABLE.astype(np.float32)
+
+
+def _build_envelope_shapes():
+    """
+    Build the envelope level table and hold flags for the 16 shapes
+
+    A shape (register 13: CONT, ATT, ALT, HOLD) is 32 steps: the first
+    ramp, then a second segment that either repeats with the first or
+    holds its level once the envelope has run through it.
+    """
+    down = np.arange(15, -1, -1)
+    up = np.arange(16)
+    shapes = np.empty((16, 32), np.uint8)
+    holds = np.zeros(16, np.uint8)
+    for shape in range(16):
+        first = up if shape & 0x04 else down
+        if not shape & 0x08:
+            # Single ramp, then silence
+            second = np.zeros(16)
+            holds[shape] = 1
+        elif shape & 0x01:
+            # Hold the ramp's final level, inverted when alternating
+            second = np.full(16, first[-1] ^ (15 if shape & 0x02 else 0))
+            holds[shape] = 1
+        else:
+            # Repeating sawtooth, or triangle when alternating
+            second = first[::-1] if shape & 0x02 else first
+        shapes[shape, :16] = first
+        shapes[shape, 16:] = second
+    return shapes, holds
+
+
+_ENVELOPE_SHAPES, _ENVELOPE_HOLDS = _build_envelope_shapes()
+
+
+@njit(cache=True, nogil=True)
+def _advance_counter(counter, period):
+    """
+    Run a generator's down-counter through the 16 sub-steps of one sample
+
+    The counter expires first at sub-step counter (at least 1), then every
+    period sub-steps, reloading with the period each time. Returns the new
+    counter and the number of expiries.
+    """
+    first = max(counter, 1)
+    if first > 16:
+        return counter - 16, 0
+    expiries = 1 + (16 - first) // period
+    return first + expiries * period - 16, expiries
+
+
+# Compiled eagerly for this signature at import (or loaded from the cache),
+# so the first audio block never waits on the JIT; the GIL is released while
+# it runs so a producer thread does not stall the CPU emulation
+@njit("UniTuple(int64, 5)(float32[:], int64, int32[:], float32[:], uint8[:], "
+      "uint8[:], int32[:], int32[:], int64, int64, int64, int64, "
+      "uint8[:], int64, int64, int64, int64)",
+      cache=True, nogil=True, fastmath=True, boundscheck=False)
+def _generate_block(out, n, periods, gains, env_mask, enables,
+                    tone_cnt, tone_out, noise_cnt, noise_lfsr, noise_out,
+                    noise_period, env_shape, env_hold, env_period,
+                    env_cnt, env_pos):
+    """
+    Generate n mixed samples into out
+
+    gains holds each channel's output level while it sounds, replaced by the
+    envelope level for channels set in env_mask; enables is the decoded
+    mixer register. The tone counters and outputs are updated in place; the
+    noise and envelope state is returned as
+    (noise_cnt, noise_lfsr, noise_out, env_cnt, env_pos).
+    """
+    # Register values are fixed for the block, so keep them in locals
+    p0, p1, p2 = periods[0], periods[1], periods[2]
+    g0, g1, g2 = gains[0], gains[1], gains[2]
+    e0, e1, e2 = env_mask[0], env_mask[1], env_mask[2]
+    t0, t1, t2 = enables[0], enables[1], enables[2]
+    n0, n1, n2 = enables[3], enables[4], enables[5]
+    c0, c1, c2 = tone_cnt[0], tone_cnt[1], tone_cnt[2]
+    o0, o1, o2 = tone_out[0], tone_out[1], tone_out[2]
+
+    for s in range(n):
+        # Generators are updated at 1/16th of the clock frequency; only the
+        # parity of a tone counter's expiries matters to its output
+        c0, toggles = _advance_counter(c0, p0)
+        o0 ^= toggles & 1
+        c1, toggles = _advance_counter(c1, p1)
+        o1 ^= toggles & 1
+        c2, toggles = _advance_counter(c2, p2)
+        o2 ^= toggles & 1
+
+        noise_cnt, steps = _advance_counter(noise_cnt, noise_period)
+        if steps:
+            # 17-bit LFSR for white noise, advanced all steps at once
+            noise_lfsr = (_LFSR_ADVANCE[steps, 0, noise_lfsr & 0xFF]
+                          ^ _LFSR_ADVANCE[steps, 1, (noise_lfsr >> 8) & 0xFF]
+                          ^ _LFSR_ADVANCE[steps, 2, noise_lfsr >> 16])
+            noise_out = noise_lfsr & 1
+
+        # The envelope takes one step every 2 * env_period sub-steps
+        env_cnt, steps = _advance_counter(env_cnt, env_period)
+        if steps:
+            env_pos += steps
+            if env_pos >= 32:
+                env_pos = 31 if env_hold else env_pos & 31
+            env_gain = _VOLUME_TABLE[env_shape[env_pos]]
+            if e0:
+                g0 = env_gain
+            if e1:
+                g1 = env_gain
+            if e2:
+                g2 = env_gain
+
+        # Mix channels: a channel sounds while an enabled source is high
+        out[s] = (g0 * ((o0 & t0) | (noise_out & n0))
+                  + g1 * ((o1 & t1) | (noise_out & n1))
+                  + g2 * ((o2 & t2) | (noise_out & n2)))
+
+    tone_cnt[0], tone_cnt[1], tone_cnt[2] = c0, c1, c2
+    tone_out[0], tone_out[1], tone_out[2] = o0, o1, o2
+    return noise_cnt, noise_lfsr, noise_out, env_cnt, env_pos
+
+
+def _counter_expiries(counter, period, n):
+    """
+    _advance_counter() over n samples at once
+
+    Returns the counter's total expiries by the end of each sample and the
+    counter after the last one.
+    """
+    first = max(counter, 1)
+    ends = _SAMPLE_ENDS[:n]
+    expiries = np.where(ends >= first, (ends - first) // period + 1, 0)
+    return expiries, first + int(expiries[-1]) * period - 16 * n
+
+
+def _lfsr_after(lfsr, steps):
+    """Noise LFSR states steps (an array) steps on from lfsr"""
+    states = np.full(len(steps), lfsr, np.int64)
+    j = 0
+    while j < len(_LFSR_JUMPS) and (steps >> j).any():
+        jump = _LFSR_JUMPS[j]
+        jumped = (jump[0, states & 0xFF] ^ jump[1, (states >> 8) & 0xFF]
+                  ^ jump[2, states >> 16])
+        np.copyto(states, jumped, where=((steps >> j) & 1).astype(bool))
+        j += 1
+    return states
+
+
+def _generate_block_numpy(out, n, periods, gains, env_mask, enables,
+                          tone_cnt, tone_out, noise_cnt, noise_lfsr, noise_out,
+                          noise_period, env_shape, env_hold, env_period,
+                          env_cnt, env_pos):
+    """
+    _generate_block() with NumPy array operations, for when Numba is absent
+
+    Every generator is a down-counter reloaded with a fixed period, so its
+    expiries by the end of each sample have a closed form; tone outputs,
+    noise states and envelope positions follow from those counts for the
+    whole block at once. Produces the same samples and state.
+    """
+    levels = []
+    for ch in range(3):
+        expiries, tone_cnt[ch] = _counter_expiries(int(tone_cnt[ch]), int(periods[ch]), n)
+        levels.append(tone_out[ch] ^ (expiries & 1))
+        tone_out[ch] = levels[ch][-1]
+
+    steps, noise_cnt = _counter_expiries(noise_cnt, noise_period, n)
+    if steps[-1]:
+        lfsr = _lfsr_after(noise_lfsr, steps)
+        noise = np.where(steps > 0, lfsr & 1, noise_out)
+        noise_lfsr = int(lfsr[-1])
+        noise_out = int(noise[-1])
+    else:
+        noise = np.full(n, noise_out)
+
+    steps, env_cnt = _counter_expiries(env_cnt, env_period, n)
+    channel_gains = list(gains)
+    if steps[-1]:
+        positions = env_pos + steps
+        positions = np.minimum(positions, 31) if env_hold else positions & 31
+        env_gains = np.where(steps > 0, _VOLUME_TABLE[env_shape[positions]], 0)
+        for ch in range(3):
+            if env_mask[ch]:
+                channel_gains[ch] = np.where(steps > 0, env_gains, gains[ch])
+        env_pos = int(positions[-1])
+
+    # Mix channels: a channel sounds while an enabled source is high
+    out[:n] = (channel_gains[0] * ((levels[0] & enables[0]) | (noise & enables[3]))
+               + channel_gains[1] * ((levels[1] & enables[1]) | (noise & enables[4]))
+               + channel_gains[2] * ((levels[2] & enables[2]) | (noise & enables[5])))
+    return noise_cnt, noise_lfsr, noise_out, env_cnt, env_pos
+
+
+class AudioRingBuffer:
+    """
+    Single-producer/single-consumer ring buffer of float32 samples
+
+    The producer only advances the write index and the consumer only the
+    read index, so no lock is needed between the two threads.
+    """
+    
+    def __init__(self, capacity=4096):
+        """
+        Initialize ring buffer
+        
+        Args:
+            capacity: Number of samples held (rounded up to a power of two)
+        """
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.capacity = size
+        self._mask = size - 1
+        self._ring = np.zeros(size, np.float32)
+        self._w = 0
+        self._r = 0
+        
+    def available(self):
+        """Number of samples waiting to be read"""
+        return self._w - self._r
+        
+    def free(self):
+        """Number of samples that can be written without dropping any"""
+        return self.capacity - (self._w - self._r)
+        
+    def write(self, block):
+        """Append samples, dropping whatever does not fit; returns count written"""
+        w = self._w
+        n = min(len(block), self.capacity - (w - self._r))
+        pos = w & self._mask
+        first = min(n, self.capacity - pos)
+        np.copyto(self._ring[pos:pos + first], block[:first])
+        np.copyto(self._ring[:n - first], block[first:n])
+        self._w = w + n
+        return n
+        
+    def read_into(self, out):
+        """Move up to len(out) samples into out; returns count read"""
+        r = self._r
+        n = min(len(out), self._w - r)
+        pos = r & self._mask
+        first = min(n, self.capacity - pos)
+        np.copyto(out[:first], self._ring[pos:pos + first])
+        np.copyto(out[first:n], self._ring[:n - first])
+        self._r = r + n
+        return n
+
 
 class AY3910Audio:
     """AY-3-8910 sound chip emulator with audio output"""
     
+    CHANNEL_NAMES = ('A', 'B', 'C')
+    
     def __init__(self, clock_freq=2000000, sample_rate=44100):
         """
         Initialize AY-3-8910 audio emulator
@@ -25,34 +354,46 @@ class AY3910Audio:
         """
         self.clock_freq = clock_freq
         self.sample_rate = sample_rate
+        # Tone frequency is clock_freq / (16 * period)
+        self._clock_div16 = clock_freq / 16
         
         # AY-3-8910 registers (16 total)
-        self.registers = [0] * 16
+        self.registers = np.zeros(16, np.uint8)
         self.address_latch = 0
+        # Registers 0-5 viewed as the three little-endian tone periods, and
+        # registers 11-12 as the envelope period
+        self._tone_periods = self.registers[:6].view('<u2')
+        self._envelope_period = self.registers[11:13].view('<u2')
         
         # Tone generators (3 channels)
-        self.tone_counters = [0, 0, 0]
-        self.tone_outputs = [0, 0, 0]
+        self.tone_counters = np.zeros(3, np.int32)
+        self.tone_outputs = np.zeros(3, np.int32)
         
         # Noise generator
         self.noise_counter = 0
         self.noise_output = 0
         self.noise_lfsr = 1  # 17-bit LFSR
         
-        # Envelope generator
-        self.envelope_counter = 0
-        self.envelope_output = 0
-        self.envelope_step = 0
+        # Envelope generator (envelope_step indexes the 32-step shape)
+        self._restart_envelope()
         
         # Audio buffer
-        self.audio_buffer = queue.Queue(maxsize=4096)
+        self.audio_buffer = AudioRingBuffer(4096)
+        
+        # Per-block generator inputs, refreshed from the registers
+        self._periods = np.ones(3, np.int32)
+        self._gains = np.zeros(3, np.float32)
+        self._env_mask = np.zeros(3, np.uint8)
+        self._block = np.zeros(BLOCK_SIZE, np.float32)
+        # Register 7 decoded: tone enabled for A-C, then noise enabled for A-C
+        self._mixer_decoded = np.zeros(6, np.uint8)
         
-        # Clock divider for audio generation
-        self.clock_divider = int(clock_freq / sample_rate / 16)
+        # Clock divider for audio generation (at least one clock per sample)
+        self.clock_divider = max(int(clock_freq / sample_rate / 16), 1)
         self.clock_counter = 0
         
         # Initialize mixer to silence all channels
-        self.registers[7] = 0b00111111  # All channels disabled
+        self.set_mixer(0b00111111)  # All channels disabled
         
     def latch_address(self, address):
         """Latch register address"""
@@ -62,25 +403,35 @@ class AY3910Audio:
         """Write data to latched register"""
         if 0 <= self.address_latch < 16:
             self.registers[self.address_latch] = data & 0xFF
+            if self.address_latch == 7:
+                self._recompute_mixer()
+            elif self.address_latch == 13:
+                # Writing the shape restarts the envelope
+                self._restart_envelope()
             
+    def _restart_envelope(self):
+        """Start the envelope shape in register 13 over from its first step"""
+        # Step 0 lasts a full step, as long as the env_period of _generate()
+        self.envelope_counter = 2 * (int(self._envelope_period[0]) or 1)
+        self.envelope_step = 0
+        self.envelope_output = int(_ENVELOPE_SHAPES[int(self.registers[13]) & 0x0F, 0])
+        
     def read_data(self):
         """Read data from latched register"""
         if 0 <= self.address_latch < 16:
-            return self.registers[self.address_latch]
+            return int(self.registers[self.address_latch])
         return 0xFF
         
     def set_channel_frequency(self, channel, period):
         """Set frequency period for a channel (12-bit value)"""
         if 0 <= channel <= 2:
-            reg_base = channel * 2
-            self.registers[reg_base] = period & 0xFF
-            self.registers[reg_base + 1] = (period >> 8) & 0x0F
+            self._tone_periods[channel] = period & 0x0FFF
             
     def get_channel_frequency(self, channel):
         """Get frequency period for a channel"""
         if 0 <= channel <= 2:
-            reg_base = channel * 2
-            return self.registers[reg_base] | (self.registers[reg_base + 1] << 8)
+            # Only the low 4 bits of the coarse tune register are used
+            return int(self._tone_periods[channel]) & 0x0FFF
         return 0
         
     def set_channel_amplitude(self, channel, amplitude):
@@ -91,72 +442,53 @@ class AY3910Audio:
     def get_channel_amplitude(self, channel):
         """Get amplitude for a channel"""
         if 0 <= channel <= 2:
-            return self.registers[8 + channel]
+            return int(self.registers[8 + channel])
         return 0
         
     def set_mixer(self, mixer_value):
         """Set mixer control register"""
         self.registers[7] = mixer_value & 0xFF
+        self._recompute_mixer()
         
     def enable_channel_tone(self, channel, enable=True):
         """Enable or disable tone for a channel"""
         if 0 <= channel <= 2:
             if enable:
-                self.registers[7] &= ~(1 << channel)
+                self.registers[7] &= 0xFF ^ (1 << channel)
             else:
                 self.registers[7] |= (1 << channel)
+            self._recompute_mixer()
                 
     def enable_channel_noise(self, channel, enable=True):
         """Enable or disable noise for a channel"""
         if 0 <= channel <= 2:
             if enable:
-                self.registers[7] &= ~(1 << (3 + channel))
+                self.registers[7] &= 0xFF ^ (1 << (3 + channel))
             else:
                 self.registers[7] |= (1 << (3 + channel))
+            self._recompute_mixer()
+                
+    def _recompute_mixer(self):
+        """Decode register 7 into the cached tone/noise enable flags"""
+        # A clear bit enables the source
+        self._mixer_decoded[:] = ~(int(self.registers[7]) >> _MIXER_BITS) & 1
                 
     def frequency_to_period(self, freq_hz):
         """Convert frequency in Hz to period value"""
         if freq_hz == 0:
             return 0
-        return int(self.clock_freq / (16 * freq_hz))
+        return int(self._clock_div16 / freq_hz)
         
     def period_to_frequency(self, period):
         """Convert period value to frequency in Hz"""
         if period == 0:
             return 0
-        return self.clock_freq / (16 * period)
+        return self._clock_div16 / period
         
-    def update_tone_generator(self, channel):
-        """Update tone generator for a channel"""
-        period = self.get_channel_frequency(channel)
-        if period == 0:
-            period = 1
-            
-        self.tone_counters[channel] -= 1
-        if self.tone_counters[channel] <= 0:
-            self.tone_counters[channel] = period
-            self.tone_outputs[channel] ^= 1
-            
-    def update_noise_generator(self):
-        """Update noise generator"""
-        noise_period = self.registers[6] & 0x1F
-        if noise_period == 0:
-            noise_period = 1
-            
-        self.noise_counter -= 1
-        if self.noise_counter <= 0:
-            self.noise_counter = noise_period
-            # 17-bit LFSR for white noise
-            bit = ((self.noise_lfsr >> 0) ^ (self.noise_lfsr >> 3)) & 1
-            self.noise_lfsr = ((self.noise_lfsr >> 1) | (bit << 16)) & 0x1FFFF
-            self.noise_output = bit
-            
     def get_channel_output(self, channel):
         """Get output level for a channel"""
-        # Check if tone is enabled
-        tone_enabled = (self.registers[7] & (1 << channel)) == 0
-        # Check if noise is enabled
-        noise_enabled = (self.registers[7] & (1 << (3 + channel))) == 0
+        tone_enabled = self._mixer_decoded[channel]
+        noise_enabled = self._mixer_decoded[3 + channel]
         
         # Combine tone and noise
         output = 0
@@ -165,102 +497,171 @@ class AY3910Audio:
         if noise_enabled and self.noise_output:
             output = 1
             
-        if not tone_enabled and not noise_enabled:
-            output = 0
-            
-        # Get amplitude
-        amp_reg = self.registers[8 + channel]
+        return output * self._channel_level(channel)
+        
+    def _channel_level(self, channel):
+        """Get the 4-bit amplitude currently applied to a channel"""
+        amp_reg = int(self.registers[8 + channel])
         if amp_reg & 0x10:
             # Envelope mode
-            amplitude = self.envelope_output
-        else:
-            # Fixed amplitude
-            amplitude = amp_reg & 0x0F
-            
-        return output * amplitude
+            return self.envelope_output
+        # Fixed amplitude
+        return amp_reg & 0x0F
+        
+    def _prepare_block_state(self):
+        """Copy the register-derived generator inputs into the block arrays"""
+        # Only the low 12 bits of each period are used; 0 behaves like 1
+        np.bitwise_and(self._tone_periods, 0x0FFF, out=self._periods)
+        np.maximum(self._periods, 1, out=self._periods)
+        # Channels in envelope mode take the envelope level, the rest their
+        # fixed 4-bit amplitude
+        amp_regs = self.registers[8:11]
+        np.bitwise_and(amp_regs, 0x10, out=self._env_mask)
+        levels = np.where(self._env_mask, self.envelope_output, amp_regs & 0x0F)
+        np.take(_VOLUME_TABLE, levels, out=self._gains)
+        return int(self.registers[6] & 0x1F) or 1
+        
+    def _generate(self, out, n):
+        """Generate n samples into out with the block generator"""
+        noise_period = self._prepare_block_state()
+        shape = int(self.registers[13]) & 0x0F
+        # One envelope step lasts twice as long as a tone period of the same value
+        env_period = 2 * (int(self._envelope_period[0]) or 1)
+        generate_block = _generate_block if HAVE_NUMBA else _generate_block_numpy
+        (self.noise_counter, self.noise_lfsr, self.noise_output,
+         self.envelope_counter, self.envelope_step) = generate_block(
+            out, n, self._periods, self._gains, self._env_mask,
+            self._mixer_decoded, self.tone_counters, self.tone_outputs,
+            self.noise_counter, self.noise_lfsr, self.noise_output,
+            noise_period, _ENVELOPE_SHAPES[shape], _ENVELOPE_HOLDS[shape],
+            env_period, self.envelope_counter, self.envelope_step)
+        self.envelope_output = int(_ENVELOPE_SHAPES[shape, self.envelope_step])
         
     def generate_sample(self):
         """Generate one audio sample"""
-        # Update generators at 1/16th of clock frequency
-        for _ in range(16):
-            for ch in range(3):
-                self.update_tone_generator(ch)
-            self.update_noise_generator()
-            
-        # Mix channels
-        sample = 0.0
-        for ch in range(3):
-            level = self.get_channel_output(ch)
-            sample += level / 15.0  # Normalize to 0-1 range
-            
-        # Scale to 3 channels and apply volume
-        sample = sample / 3.0
-        
-        return sample
+        self._generate(self._block, 1)
+        return float(self._block[0])
         
     def clock(self):
         """Clock the sound chip and generate audio samples"""
-        self.clock_counter += 1
-        if self.clock_counter >= self.clock_divider:
-            self.clock_counter = 0
-            sample = self.generate_sample()
-            
-            # Add to audio buffer if not full
-            if not self.audio_buffer.full():
-                self.audio_buffer.put(sample)
+        self.clock_n(1)
+        
+    def clock_n(self, ticks):
+        """Clock the sound chip ticks times, generating the samples due"""
+        total = self.clock_counter + ticks
+        self.clock_counter = total % self.clock_divider
+        num_samples = total // self.clock_divider
+        if num_samples:
+            self.clock_block(num_samples)
                 
+    def clock_block(self, num_samples):
+        """Generate num_samples audio samples in blocks of BLOCK_SIZE"""
+        while num_samples > 0:
+            n = min(num_samples, BLOCK_SIZE)
+            self._generate(self._block, n)
+            self.audio_buffer.write(self._block[:n])
+            num_samples -= n
+            
+    def read_into(self, out):
+        """Fill out with buffered audio samples, padding with silence"""
+        got = self.audio_buffer.read_into(out)
+        out[got:] = 0.0
+        return got
+        
     def get_audio_data(self, num_samples):
         """Get audio samples from buffer"""
-        samples = []
-        for _ in range(num_samples):
-            try:
-                samples.append(self.audio_buffer.get_nowait())
-            except queue.Empty:
-                # If buffer is empty, add silence
-                samples.append(0.0)
-        return np.array(samples, dtype=np.float32)
+        samples = np.empty(num_samples, dtype=np.float32)
+        # If buffer runs short, the rest is filled with silence
+        self.read_into(samples)
+        return samples
         
     def get_state_string(self):
         """Get human-readable state"""
-        lines = ["AY-3-8910 State:"]
-        lines.append("=" * 60)
-        
-        for ch in range(3):
-            ch_name = chr(ord('A') + ch)
+        channels = []
+        for ch, ch_name in enumerate(self.CHANNEL_NAMES):
             period = self.get_channel_frequency(ch)
             amp = self.get_channel_amplitude(ch)
             freq = self.period_to_frequency(period) if period > 0 else 0
             
-            tone_enabled = (self.registers[7] & (1 << ch)) == 0
-            noise_enabled = (self.registers[7] & (1 << (3 + ch))) == 0
+            tone_enabled = self._mixer_decoded[ch]
+            noise_enabled = self._mixer_decoded[3 + ch]
             
-            lines.append(f"Channel {ch_name}:")
-            lines.append(f"  Period: {period:4d} (0x{period:03X})")
-            lines.append(f"  Frequency: {freq:7.2f} Hz")
-            lines.append(f"  Amplitude: {amp:2d} (0x{amp:02X})")
-            lines.append(f"  Tone: {'ON' if tone_enabled else 'OFF'}, "
-                        f"Noise: {'ON' if noise_enabled else 'OFF'}")
+            channels.append(_CHANNEL_STATE_FORMAT.format(
+                name=ch_name, period=period, freq=freq, amp=amp,
+                tone='ON' if tone_enabled else 'OFF',
+                noise='ON' if noise_enabled else 'OFF'))
+        
+        return "\n".join(["AY-3-8910 State:", "=" * 60, *channels, "=" * 60])
+
+
+class BatchPacer:
+    """
+    Paces sample generation to the audio output
+
+    A batch of samples is due once the AY chip's audio buffer has room for
+    it. Without an audio device nothing drains the buffer, so batches are
+    then due on the wall clock instead, one per batch's playing time.
+    """
+    
+    def __init__(self, ay_chip, batch_samples, paced_by_audio=True):
+        """
+        Initialize pacer
+        
+        Args:
+            ay_chip: AY3910Audio instance whose buffer is filled
+            batch_samples: Samples generated per batch
+            paced_by_audio: Follow the audio buffer rather than the wall clock
+        """
+        self.buffer = ay_chip.audio_buffer
+        self.batch_samples = batch_samples
+        self.batch_seconds = batch_samples / ay_chip.sample_rate
+        # Check back about four times per batch played
+        self.interval = self.batch_seconds / 4
+        self.paced_by_audio = paced_by_audio
+        self.next_batch = time.monotonic()
         
-        lines.append("=" * 60)
-        return "\n".join(lines)
+    def room(self):
+        """
+        Samples that may be generated now
+        
+        Returns at least batch_samples once a batch is due; otherwise sleeps
+        a quarter of a batch and returns 0.
+        """
+        if self.paced_by_audio:
+            free = self.buffer.free()
+            if free >= self.batch_samples:
+                return free
+        elif time.monotonic() >= self.next_batch:
+            self.next_batch += self.batch_seconds
+            return self.batch_samples
+        time.sleep(self.interval)
+        return 0
 
 
 class AudioOutput:
     """Audio output handler using PyAudio"""
     
-    def __init__(self, ay_chip, sample_rate=44100):
+    def __init__(self, ay_chip, sample_rate=44100, producer=False):
         """
         Initialize audio output
         
         Args:
             ay_chip: AY3910Audio instance
             sample_rate: Audio sample rate
+            producer: Generate the AY chip's samples on a dedicated thread
+                instead of relying on the caller to clock the chip
         """
         self.ay_chip = ay_chip
         self.sample_rate = sample_rate
+        self.producer = producer
         self.running = False
         self.stream = None
         self.pyaudio_instance = None
+        self.producer_thread = None
+        
+        # Callback output buffer, reused for every callback
+        self._cb_buf = bytearray(4 * FRAMES_PER_BUFFER)
+        self._cb_view = np.frombuffer(self._cb_buf, dtype=np.float32)
         
     def start(self):
         """Start audio output"""
@@ -269,9 +670,13 @@ class AudioOutput:
             self.pyaudio_instance = pyaudio.PyAudio()
             
             def callback(in_data, frame_count, time_info, status):
+                if frame_count > len(self._cb_view):
+                    self._cb_buf = bytearray(4 * frame_count)
+                    self._cb_view = np.frombuffer(self._cb_buf, dtype=np.float32)
                 # Get audio data from AY chip
-                data = self.ay_chip.get_audio_data(frame_count)
-                return (data.tobytes(), pyaudio.paContinue)
+                self.ay_chip.read_into(self._cb_view[:frame_count])
+                data = memoryview(self._cb_buf)[:4 * frame_count]
+                return (bytes(data), pyaudio.paContinue)
             
             self.stream = self.pyaudio_instance.open(
                 format=pyaudio.paFloat32,
@@ -279,11 +684,16 @@ class AudioOutput:
                 rate=self.sample_rate,
                 output=True,
                 stream_callback=callback,
-                frames_per_buffer=1024
+                frames_per_buffer=FRAMES_PER_BUFFER
             )
             
             self.stream.start_stream()
             self.running = True
+            
+            if self.producer:
+                self.producer_thread = threading.Thread(target=self._produce,
+                                                        daemon=True)
+                self.producer_thread.start()
             print("Audio output started")
             
         except ImportError:
@@ -291,8 +701,21 @@ class AudioOutput:
             print("Install with: pip install pyaudio")
             self.running = False
             
+    def _produce(self):
+        """Keep the AY chip's audio buffer topped up (producer thread)"""
+        pacer = BatchPacer(self.ay_chip, BLOCK_SIZE)
+        while self.running:
+            free = pacer.room()
+            if free:
+                self.ay_chip.clock_block(free - free % BLOCK_SIZE)
+                
     def stop(self):
         """Stop audio output"""
+        self.running = False
+        if self.producer_thread:
+            self.producer_thread.join()
+            self.producer_thread = None
+        
         if self.stream:
             self.stream.stop_stream()
             self.stream.close()
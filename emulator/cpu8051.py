@@ -7,6 +7,897 @@ the sound_cpu_8051.bin firmware.
 """
 
 import struct
+from collections import deque
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    # Numba is optional - without it run() executes straight-line code as
+    # blocks compiled to Python functions, single-stepping the rest
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# SFR addresses; the SFRs live in iram[0x80:0x100] at their own addresses
+P0 = 0x80
+SP = 0x81
+DPL = 0x82
+DPH = 0x83
+PCON = 0x87
+TCON = 0x88
+TMOD = 0x89
+TL0 = 0x8A
+TL1 = 0x8B
+TH0 = 0x8C
+TH1 = 0x8D
+P1 = 0x90
+SCON = 0x98
+SBUF = 0x99
+P2 = 0xA0
+IE = 0xA8
+P3 = 0xB0
+IP = 0xB8
+PSW = 0xD0
+ACC = 0xE0
+B = 0xF0
+
+# Direct addresses whose writes have side effects beyond the store
+_WRITE_HOOKS = frozenset((P1, SBUF, IE, P3, PSW))
+
+# Instruction length in bytes, by opcode
+OP_SIZE = bytes((
+    1, 2, 3, 1, 1, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x00
+    3, 2, 3, 1, 1, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x10
+    3, 2, 1, 1, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x20
+    3, 2, 1, 1, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x30
+    2, 2, 2, 3, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x40
+    2, 2, 2, 3, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x50
+    2, 2, 2, 3, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x60
+    2, 2, 2, 1, 2, 3, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,  # 0x70
+    2, 2, 2, 1, 1, 3, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,  # 0x80
+    3, 2, 2, 1, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x90
+    2, 2, 2, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,  # 0xA0
+    2, 2, 2, 1, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3,  # 0xB0
+    2, 2, 2, 1, 1, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0xC0
+    2, 2, 2, 1, 1, 3, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2,  # 0xD0
+    1, 2, 1, 1, 1, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0xE0
+    1, 2, 1, 1, 1, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0xF0
+))
+
+# Machine cycles per instruction, by opcode
+CYCLES = bytes((
+    1, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x00
+    2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x10
+    2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x20
+    2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x30
+    2, 2, 1, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x40
+    2, 2, 1, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x50
+    2, 2, 1, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x60
+    2, 2, 2, 2, 1, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x70
+    2, 2, 2, 2, 4, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,  # 0x80
+    2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0x90
+    2, 2, 1, 2, 4, 0, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,  # 0xA0
+    2, 2, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,  # 0xB0
+    2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0xC0
+    2, 2, 1, 1, 1, 2, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2,  # 0xD0
+    2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0xE0
+    2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,  # 0xF0
+))
+
+# Relative branch offsets: each byte sign-extended to a Python int
+SEXT = [i if i < 0x80 else i - 0x100 for i in range(256)]
+
+# Byte address and mask of each bit address: 0x00-0x7F are the bits of
+# iram[0x20:0x30], 0x80-0xFF the bits of the bit-addressable SFRs
+BIT_BYTE = bytes(((b >> 3) | 0x20) if b < 0x80 else (0x80 + ((b >> 3) & 0x0F))
+                 for b in range(256))
+BIT_MASK = bytes(1 << (b & 0x07) for b in range(256))
+BIT_NMASK = bytes(~(1 << (b & 0x07)) & 0xFF for b in range(256))
+
+# The same tables as arrays for the compiled run loop
+_BIT_BYTE = np.frombuffer(BIT_BYTE, dtype=np.uint8)
+_BIT_MASK = np.frombuffer(BIT_MASK, dtype=np.uint8)
+_SEXT = np.array(SEXT, dtype=np.int64)
+
+
+def _arith_flags(subtract):
+    """
+    C and AC bits for ADDC (or SUBB) of every accumulator, operand and
+    carry, indexed by (acc << 9) | (data << 1) | carry
+    """
+    acc = np.arange(256).reshape(256, 1, 1)
+    data = np.arange(256).reshape(1, 256, 1)
+    carry = np.arange(2).reshape(1, 1, 2)
+    if subtract:
+        carry_out = acc - data - carry < 0
+        aux_carry = (acc & 0x0F) < (data & 0x0F) + carry
+    else:
+        carry_out = acc + data + carry > 0xFF
+        aux_carry = (acc & 0x0F) + (data & 0x0F) + carry > 0x0F
+    return ((carry_out << 7) | (aux_carry << 6)).astype(np.uint8).tobytes()
+
+
+ADD_FLAGS = _arith_flags(False)
+SUBB_FLAGS = _arith_flags(True)
+
+
+def _decimal_adjust():
+    """
+    DA A for every accumulator, CY and AC: the adjusted accumulator and the
+    CY bit to set, indexed by (acc << 2) | (psw >> 6)
+    """
+    acc = np.arange(256).reshape(256, 1)
+    flags = np.arange(4).reshape(1, 4)     # (CY << 1) | AC
+    adjust_low = ((acc & 0x0F) > 9) | ((flags & 0x01) != 0)
+    adjust_high = ((acc >> 4) > 9) | ((flags & 0x02) != 0)
+    result = (acc + 0x06 * adjust_low + 0x60 * adjust_high) & 0xFF
+    return (result.astype(np.uint8).tobytes(),
+            (adjust_high << 7).astype(np.uint8).tobytes())
+
+
+DA_ACC, DA_CARRY = _decimal_adjust()
+_DA_ACC = np.frombuffer(DA_ACC, dtype=np.uint8)
+_DA_CARRY = np.frombuffer(DA_CARRY, dtype=np.uint8)
+
+# Slots of the state vector shared with the compiled run loop
+_PC = 0
+_CYCLES = 1
+_IRQ = 2        # pending interrupts, as CPU8051.irq_pending
+_EA = 3         # interrupts enabled
+_STATUS = 4     # nonzero: stopped on an unimplemented opcode
+_NEVENTS = 5    # port/SBUF writes queued in the event buffer
+_RBANK = 6      # iram address of R0 in the selected register bank
+
+# Event buffer size in (address, value) pairs: two pushes for an interrupt plus at most two
+# writes from the instruction itself
+_MAX_EVENTS = 4
+
+# Cycles per compiled slice when run() has no limit; other threads get the
+# interpreter between slices
+_RUN_SLICE = 100000
+
+# Opcodes that end a compiled block: jumps, calls, returns and branches, plus
+# MOVC A,@A+PC, which reads pc
+_BLOCK_ENDS = frozenset(
+    list(range(0x01, 0x100, 0x10))      # AJMP, ACALL
+    + [0x02, 0x10, 0x12, 0x20, 0x22, 0x30, 0x32, 0x40, 0x50, 0x60, 0x70,
+       0x73, 0x80, 0x83, 0xD5]
+    + list(range(0xB4, 0xC0))           # CJNE
+    + list(range(0xD8, 0xE0)))          # DJNZ Rn
+
+# Most instructions in one compiled block
+_BLOCK_MAX = 32
+
+# Python source for instructions that compiled blocks inline instead of
+# calling the handler. {a} and {d} are the bytes after the opcode, {rn} the
+# register and {ri} the @Ri operand; rb holds the selected register bank.
+_INLINE = {
+    0x00: "pass",
+    0x04: "iram[0xE0] = (iram[0xE0] + 1) & 0xFF",
+    0x14: "iram[0xE0] = (iram[0xE0] - 1) & 0xFF",
+    0x44: "iram[0xE0] |= {a}",
+    0x45: "iram[0xE0] |= iram[{a}]",
+    0x54: "iram[0xE0] &= {a}",
+    0x55: "iram[0xE0] &= iram[{a}]",
+    0x64: "iram[0xE0] ^= {a}",
+    0x65: "iram[0xE0] ^= iram[{a}]",
+    0x74: "iram[0xE0] = {a}",
+    0x90: "iram[0x83] = {a}; iram[0x82] = {d}",
+    0xB3: "iram[0xD0] ^= 0x80",
+    0xC3: "iram[0xD0] &= 0x7F",
+    0xD3: "iram[0xD0] |= 0x80",
+    0xE4: "iram[0xE0] = 0",
+    0xE5: "iram[0xE0] = iram[{a}]",
+    0xF4: "iram[0xE0] ^= 0xFF",
+}
+for _n in range(8):
+    _INLINE[0x08 | _n] = "{rn} = ({rn} + 1) & 0xFF"
+    _INLINE[0x18 | _n] = "{rn} = ({rn} - 1) & 0xFF"
+    _INLINE[0x48 | _n] = "iram[0xE0] |= {rn}"
+    _INLINE[0x58 | _n] = "iram[0xE0] &= {rn}"
+    _INLINE[0x68 | _n] = "iram[0xE0] ^= {rn}"
+    _INLINE[0x78 | _n] = "{rn} = {a}"
+    _INLINE[0xA8 | _n] = "{rn} = iram[{a}]"
+    _INLINE[0xE8 | _n] = "iram[0xE0] = {rn}"
+    _INLINE[0xF8 | _n] = "{rn} = iram[0xE0]"
+for _n in range(2):
+    _INLINE[0x46 | _n] = "iram[0xE0] |= {ri}"
+    _INLINE[0x56 | _n] = "iram[0xE0] &= {ri}"
+    _INLINE[0x66 | _n] = "iram[0xE0] ^= {ri}"
+    _INLINE[0x76 | _n] = "{ri} = {a}"
+    _INLINE[0xE6 | _n] = "iram[0xE0] = {ri}"
+    _INLINE[0xF6 | _n] = "{ri} = iram[0xE0]"
+del _n
+
+# Instructions whose direct (or bit) destination is fixed by their operands
+_DIRECT_BYTE1 = frozenset(
+    [0x05, 0x15, 0x42, 0x43, 0x52, 0x53, 0x62, 0x63, 0x75, 0x86, 0x87,
+     0xC5, 0xD0, 0xD5, 0xF5] + list(range(0x88, 0x90)))
+_DIRECT_BIT = frozenset((0x92, 0xB2, 0xC2, 0xD2))
+
+
+def _direct_destination(opcode, byte1, byte2):
+    """The direct address an instruction writes, or None"""
+    if opcode in _DIRECT_BYTE1:
+        return byte1
+    if opcode == 0x85:
+        return byte2
+    if opcode in _DIRECT_BIT:
+        return BIT_BYTE[byte1]
+    return None
+
+
+def _inline_store(address, value):
+    """Python source storing value at a direct address"""
+    if address in _WRITE_HOOKS:
+        return f"write({address:#04x}, {value})"
+    return f"iram[{address:#04x}] = {value}"
+
+
+def _inline_source(opcode, byte1, byte2):
+    """Python source for one instruction, or None to call its handler"""
+    if opcode == 0x75:
+        return _inline_store(byte1, f"{byte2:#04x}")
+    if opcode == 0x85:
+        return _inline_store(byte2, f"iram[{byte1:#04x}]")
+    if 0x88 <= opcode <= 0x8F:
+        return _inline_store(byte1, f"iram[rb | {opcode & 7}]")
+    if opcode == 0xF5:
+        return _inline_store(byte1, "iram[0xE0]")
+    if opcode == 0xC2:
+        address = BIT_BYTE[byte1]
+        return _inline_store(address,
+                             f"iram[{address:#04x}] & {BIT_NMASK[byte1]:#04x}")
+    if opcode == 0xD2:
+        address = BIT_BYTE[byte1]
+        return _inline_store(address,
+                             f"iram[{address:#04x}] | {BIT_MASK[byte1]:#04x}")
+    template = _INLINE.get(opcode)
+    if template is None:
+        return None
+    return template.format(a=f"{byte1:#04x}", d=f"{byte2:#04x}",
+                           rn=f"iram[rb | {opcode & 7}]",
+                           ri=f"iram[iram[rb | {opcode & 1}]]")
+
+
+@njit(cache=True)
+def _write_direct(iram, state, events, addr, value):
+    """Write a direct address from the compiled run loop, queueing writes
+    that have Python callbacks"""
+    value &= 0xFF
+    iram[addr] = value
+    if addr < 0x80:
+        return
+    if addr == IE:
+        state[_EA] = value >> 7
+    elif addr == PSW:
+        state[_RBANK] = value & 0x18
+    elif addr == P1 or addr == P3 or addr == SBUF:
+        n = state[_NEVENTS]
+        events[2 * n] = addr
+        events[2 * n + 1] = value
+        state[_NEVENTS] = n + 1
+
+
+@njit(cache=True)
+def _dptr(iram):
+    """DPTR as an int64"""
+    return (np.int64(iram[DPH]) << 8) | iram[DPL]
+
+
+@njit(cache=True)
+def _fetch_word(rom, pc):
+    """Big-endian word at pc"""
+    return (np.int64(rom[pc]) << 8) | rom[(pc + 1) & 0xFFFF]
+
+
+@njit(cache=True)
+def _relative(pc, rel):
+    """Target of a relative jump"""
+    return (pc + _SEXT[rel]) & 0xFFFF
+
+
+@njit(cache=True)
+def _push(iram, state, events, value):
+    sp = (iram[SP] + 1) & 0xFF
+    iram[SP] = sp
+    _write_direct(iram, state, events, sp, value)
+
+
+@njit(cache=True)
+def _pop(iram):
+    sp = iram[SP]
+    value = np.int64(iram[sp])
+    iram[SP] = (sp - 1) & 0xFF
+    return value
+
+
+@njit(cache=True)
+def _add(iram, data, carry_in):
+    """ADD (carry_in 0) or ADDC A, data"""
+    acc = np.int64(iram[ACC])
+    result = acc + data + carry_in
+    carry = (result >> 8) & 0x01
+    aux_carry = 1 if (acc & 0x0F) + (data & 0x0F) + carry_in > 0x0F else 0
+    iram[PSW] = (iram[PSW] & 0x3B) | (carry << 7) | (aux_carry << 6)
+    iram[ACC] = result & 0xFF
+
+
+@njit(cache=True)
+def _subb(iram, data):
+    """SUBB A, data"""
+    acc = np.int64(iram[ACC])
+    old_carry = (iram[PSW] >> 7) & 0x01
+    result = acc - np.int64(data) - old_carry
+    carry = 1 if result < 0 else 0
+    aux_carry = 1 if (acc & 0x0F) < (data & 0x0F) + old_carry else 0
+    iram[PSW] = (iram[PSW] & 0x3B) | (carry << 7) | (aux_carry << 6)
+    iram[ACC] = result & 0xFF
+
+
+# Compiled eagerly for this signature at import (or loaded from the cache)
+@njit("void(uint8[:], uint8[:], uint8[:], int64[:], int64[:], int64)",
+      cache=True)
+def _run_kernel(iram, xram, rom, state, events, limit):
+    """
+    Execute instructions until the cycle count reaches limit
+
+    Mirrors CPU8051.step(): the serial interrupt is taken before an
+    instruction when it is pending and enabled. Returns early, with the
+    instruction completed, once a write to P1, P3 or SBUF has been queued
+    in events, or with state[_STATUS] set when an unimplemented opcode is
+    fetched.
+    """
+    pc = state[_PC]
+    cycles = state[_CYCLES]
+    while cycles < limit:
+        if state[_IRQ] & iram[IE] & 0x10 and state[_EA]:
+            state[_IRQ] &= ~0x10
+            _push(iram, state, events, pc & 0xFF)
+            _push(iram, state, events, (pc >> 8) & 0xFF)
+            pc = 0x0023
+
+        op = rom[pc]
+        pc = (pc + 1) & 0xFFFF
+        lo = op & 0x0F
+        hi = op >> 4
+
+        if lo >= 0x08:
+            # Register operand R0-R7 in the selected bank
+            r = state[_RBANK] | (op & 0x07)
+            if hi == 0x0:      # INC Rn
+                iram[r] = (iram[r] + 1) & 0xFF
+                cycles += 1
+            elif hi == 0x1:    # DEC Rn
+                iram[r] = (iram[r] - 1) & 0xFF
+                cycles += 1
+            elif hi == 0x2:    # ADD A, Rn
+                _add(iram, iram[r], 0)
+                cycles += 1
+            elif hi == 0x3:    # ADDC A, Rn
+                _add(iram, iram[r], (iram[PSW] >> 7) & 0x01)
+                cycles += 1
+            elif hi == 0x4:    # ORL A, Rn
+                iram[ACC] |= iram[r]
+                cycles += 1
+            elif hi == 0x5:    # ANL A, Rn
+                iram[ACC] &= iram[r]
+                cycles += 1
+            elif hi == 0x6:    # XRL A, Rn
+                iram[ACC] ^= iram[r]
+                cycles += 1
+            elif hi == 0x7:    # MOV Rn, #data
+                iram[r] = rom[pc]
+                pc = (pc + 1) & 0xFFFF
+                cycles += 1
+            elif hi == 0x8:    # MOV direct, Rn
+                dst = rom[pc]
+                pc = (pc + 1) & 0xFFFF
+                _write_direct(iram, state, events, dst, iram[r])
+                cycles += 2
+            elif hi == 0x9:    # SUBB A, Rn
+                _subb(iram, iram[r])
+                cycles += 1
+            elif hi == 0xA:    # MOV Rn, direct
+                src = rom[pc]
+                pc = (pc + 1) & 0xFFFF
+                iram[r] = iram[src]
+                cycles += 2
+            elif hi == 0xB:    # CJNE Rn, #data, rel
+                data = rom[pc]
+                rel = rom[(pc + 1) & 0xFFFF]
+                pc = (pc + 2) & 0xFFFF
+                value = iram[r]
+                if value != data:
+                    pc = _relative(pc, rel)
+                if value < data:
+                    iram[PSW] |= 0x80
+                else:
+                    iram[PSW] &= 0x7F
+                cycles += 2
+            elif hi == 0xC:    # XCH A, Rn
+                temp = iram[ACC]
+                iram[ACC] = iram[r]
+                iram[r] = temp
+                cycles += 1
+            elif hi == 0xD:    # DJNZ Rn, rel
+                rel = rom[pc]
+                pc = (pc + 1) & 0xFFFF
+                iram[r] = (iram[r] - 1) & 0xFF
+                if iram[r] != 0:
+                    pc = _relative(pc, rel)
+                cycles += 2
+            elif hi == 0xE:    # MOV A, Rn
+                iram[ACC] = iram[r]
+                cycles += 1
+            elif hi == 0xF:    # MOV Rn, A
+                iram[r] = iram[ACC]
+                cycles += 1
+
+        elif lo >= 0x06:
+            # Indirect operand @R0/@R1
+            addr = iram[state[_RBANK] | (op & 0x01)]
+            if hi == 0x0:      # INC @Ri
+                iram[addr] = (iram[addr] + 1) & 0xFF
+                cycles += 1
+            elif hi == 0x1:    # DEC @Ri
+                iram[addr] = (iram[addr] - 1) & 0xFF
+                cycles += 1
+            elif hi == 0x2:    # ADD A, @Ri
+                _add(iram, iram[addr], 0)
+                cycles += 1
+            elif hi == 0x3:    # ADDC A, @Ri
+                _add(iram, iram[addr], (iram[PSW] >> 7) & 0x01)
+                cycles += 1
+            elif hi == 0x4:    # ORL A, @Ri
+                iram[ACC] |= iram[addr]
+                cycles += 1
+            elif hi == 0x5:    # ANL A, @Ri
+                iram[ACC] &= iram[addr]
+                cycles += 1
+            elif hi == 0x6:    # XRL A, @Ri
+                iram[ACC] ^= iram[addr]
+                cycles += 1
+            elif hi == 0x7:    # MOV @Ri, #data
+                iram[addr] = rom[pc]
+                pc = (pc + 1) & 0xFFFF
+                cycles += 1
+            elif hi == 0x8:    # MOV direct, @Ri
+                dst = rom[pc]
+                pc = (pc + 1) & 0xFFFF
+                _write_direct(iram, state, events, dst, iram[addr])
+                cycles += 2
+            elif hi == 0x9:    # SUBB A, @Ri
+                _subb(iram, iram[addr])
+                cycles += 1
+            elif hi == 0xA:    # MOV @Ri, direct
+                src = rom[pc]
+                pc = (pc + 1) & 0xFFFF
+                iram[addr] = iram[src]
+                cycles += 2
+            elif hi == 0xB:    # CJNE @Ri, #data, rel
+                data = rom[pc]
+                rel = rom[(pc + 1) & 0xFFFF]
+                pc = (pc + 2) & 0xFFFF
+                value = iram[addr]
+                if value != data:
+                    pc = _relative(pc, rel)
+                if value < data:
+                    iram[PSW] |= 0x80
+                else:
+                    iram[PSW] &= 0x7F
+                cycles += 2
+            elif hi == 0xC:    # XCH A, @Ri
+                temp = iram[ACC]
+                iram[ACC] = iram[addr]
+                iram[addr] = temp
+                cycles += 1
+            elif hi == 0xD:    # XCHD A, @Ri
+                acc = iram[ACC]
+                value = iram[addr]
+                iram[ACC] = (acc & 0xF0) | (value & 0x0F)
+                iram[addr] = (value & 0xF0) | (acc & 0x0F)
+                cycles += 1
+            elif hi == 0xE:    # MOV A, @Ri
+                iram[ACC] = iram[addr]
+                cycles += 1
+            elif hi == 0xF:    # MOV @Ri, A
+                iram[addr] = iram[ACC]
+                cycles += 1
+
+        elif lo == 0x01:
+            # AJMP/ACALL addr11
+            addr11 = ((op & 0xE0) << 3) | rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            if hi & 0x01:
+                _push(iram, state, events, pc & 0xFF)
+                _push(iram, state, events, (pc >> 8) & 0xFF)
+            pc = (pc & 0xF800) | addr11
+            cycles += 2
+
+        elif op == 0x00:       # NOP
+            cycles += 1
+        elif op == 0x02:       # LJMP addr16
+            pc = _fetch_word(rom, pc)
+            cycles += 2
+        elif op == 0x03:       # RR A
+            acc = iram[ACC]
+            iram[ACC] = ((acc >> 1) | (acc << 7)) & 0xFF
+            cycles += 1
+        elif op == 0x04:       # INC A
+            iram[ACC] = (iram[ACC] + 1) & 0xFF
+            cycles += 1
+        elif op == 0x05:       # INC direct
+            addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            value = iram[addr]
+            _write_direct(iram, state, events, addr, value + 1)
+            cycles += 1
+        elif op == 0x10 or op == 0x20 or op == 0x30:
+            # JBC/JB/JNB bit, rel
+            bit_addr = rom[pc]
+            rel = rom[(pc + 1) & 0xFFFF]
+            pc = (pc + 2) & 0xFFFF
+            byte_addr = _BIT_BYTE[bit_addr]
+            mask = np.int64(_BIT_MASK[bit_addr])
+            byte_val = iram[byte_addr]
+            if op == 0x30:
+                if not (byte_val & mask):
+                    pc = _relative(pc, rel)
+            elif byte_val & mask:
+                if op == 0x10:
+                    _write_direct(iram, state, events, byte_addr,
+                                  byte_val & ~mask)
+                pc = _relative(pc, rel)
+            cycles += 2
+        elif op == 0x12:       # LCALL addr16
+            addr = _fetch_word(rom, pc)
+            pc = (pc + 2) & 0xFFFF
+            _push(iram, state, events, pc & 0xFF)
+            _push(iram, state, events, (pc >> 8) & 0xFF)
+            pc = addr
+            cycles += 2
+        elif op == 0x13:       # RRC A
+            acc = iram[ACC]
+            carry = (iram[PSW] >> 7) & 0x01
+            iram[ACC] = ((acc >> 1) | (carry << 7)) & 0xFF
+            iram[PSW] = (iram[PSW] & 0x7F) | ((acc & 0x01) << 7)
+            cycles += 1
+        elif op == 0x14:       # DEC A
+            iram[ACC] = (iram[ACC] - 1) & 0xFF
+            cycles += 1
+        elif op == 0x15:       # DEC direct
+            addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            value = iram[addr]
+            _write_direct(iram, state, events, addr, value - 1)
+            cycles += 1
+        elif op == 0x22 or op == 0x32:
+            # RET/RETI
+            high = _pop(iram)
+            low = _pop(iram)
+            pc = (high << 8) | low
+            cycles += 2
+        elif op == 0x23:       # RL A
+            acc = iram[ACC]
+            iram[ACC] = ((acc << 1) | (acc >> 7)) & 0xFF
+            cycles += 1
+        elif op == 0x24 or op == 0x34:
+            # ADD/ADDC A, #data
+            data = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            _add(iram, data, (iram[PSW] >> 7) & 0x01 if op == 0x34 else 0)
+            cycles += 1
+        elif op == 0x25 or op == 0x35:
+            # ADD/ADDC A, direct
+            addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            data = iram[addr]
+            _add(iram, data, (iram[PSW] >> 7) & 0x01 if op == 0x35 else 0)
+            cycles += 1
+        elif op == 0x33:       # RLC A
+            acc = iram[ACC]
+            carry = (iram[PSW] >> 7) & 0x01
+            iram[ACC] = ((acc << 1) | carry) & 0xFF
+            iram[PSW] = (iram[PSW] & 0x7F) | (acc & 0x80)
+            cycles += 1
+        elif op == 0x40 or op == 0x50 or op == 0x60 or op == 0x70 or op == 0x80:
+            # JC/JNC/JZ/JNZ/SJMP rel
+            rel = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            if op == 0x40:
+                taken = (iram[PSW] & 0x80) != 0
+            elif op == 0x50:
+                taken = (iram[PSW] & 0x80) == 0
+            elif op == 0x60:
+                taken = iram[ACC] == 0
+            elif op == 0x70:
+                taken = iram[ACC] != 0
+            else:
+                taken = True
+            if taken:
+                pc = _relative(pc, rel)
+            cycles += 2
+        elif op == 0x42 or op == 0x52 or op == 0x62:
+            # ORL/ANL/XRL direct, A
+            addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            value = iram[addr]
+            if op == 0x42:
+                value |= iram[ACC]
+            elif op == 0x52:
+                value &= iram[ACC]
+            else:
+                value ^= iram[ACC]
+            _write_direct(iram, state, events, addr, value)
+            cycles += 1
+        elif op == 0x43 or op == 0x53 or op == 0x63:
+            # ORL/ANL/XRL direct, #data
+            addr = rom[pc]
+            data = rom[(pc + 1) & 0xFFFF]
+            pc = (pc + 2) & 0xFFFF
+            value = iram[addr]
+            if op == 0x43:
+                value |= data
+            elif op == 0x53:
+                value &= data
+            else:
+                value ^= data
+            _write_direct(iram, state, events, addr, value)
+            cycles += 2
+        elif op == 0x44 or op == 0x54 or op == 0x64:
+            # ORL/ANL/XRL A, #data
+            data = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            if op == 0x44:
+                iram[ACC] |= data
+            elif op == 0x54:
+                iram[ACC] &= data
+            else:
+                iram[ACC] ^= data
+            cycles += 1
+        elif op == 0x45 or op == 0x55 or op == 0x65:
+            # ORL/ANL/XRL A, direct
+            addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            data = iram[addr]
+            if op == 0x45:
+                iram[ACC] |= data
+            elif op == 0x55:
+                iram[ACC] &= data
+            else:
+                iram[ACC] ^= data
+            cycles += 1
+        elif op == 0x72 or op == 0x82 or op == 0xA0 or op == 0xB0:
+            # ORL/ANL C, bit and ORL/ANL C, /bit
+            bit_addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            byte_val = iram[_BIT_BYTE[bit_addr]]
+            bit_val = 1 if byte_val & _BIT_MASK[bit_addr] else 0
+            if op == 0xA0 or op == 0xB0:
+                bit_val ^= 1
+            carry = (iram[PSW] >> 7) & 0x01
+            if op == 0x72 or op == 0xA0:
+                carry |= bit_val
+            else:
+                carry &= bit_val
+            iram[PSW] = (iram[PSW] & 0x7F) | (carry << 7)
+            cycles += 2
+        elif op == 0x73:       # JMP @A+DPTR
+            pc = (_dptr(iram) + iram[ACC]) & 0xFFFF
+            cycles += 2
+        elif op == 0x74:       # MOV A, #data
+            iram[ACC] = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            cycles += 1
+        elif op == 0x75:       # MOV direct, #data
+            addr = rom[pc]
+            data = rom[(pc + 1) & 0xFFFF]
+            pc = (pc + 2) & 0xFFFF
+            _write_direct(iram, state, events, addr, data)
+            cycles += 2
+        elif op == 0x83:       # MOVC A, @A+PC
+            iram[ACC] = rom[(pc + iram[ACC]) & 0xFFFF]
+            cycles += 2
+        elif op == 0x84:       # DIV AB
+            if iram[B] == 0:
+                iram[PSW] |= 0x04
+            else:
+                acc = iram[ACC]
+                iram[ACC] = acc // iram[B]
+                iram[B] = acc % iram[B]
+                iram[PSW] &= 0xFB
+            iram[PSW] &= 0x7F
+            cycles += 4
+        elif op == 0x85:       # MOV direct, direct
+            src = rom[pc]
+            dst = rom[(pc + 1) & 0xFFFF]
+            pc = (pc + 2) & 0xFFFF
+            _write_direct(iram, state, events, dst,
+                          iram[src])
+            cycles += 2
+        elif op == 0x90:       # MOV DPTR, #data16
+            iram[DPH] = rom[pc]
+            iram[DPL] = rom[(pc + 1) & 0xFFFF]
+            pc = (pc + 2) & 0xFFFF
+            cycles += 2
+        elif op == 0x92:       # MOV bit, C
+            bit_addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            byte_addr = _BIT_BYTE[bit_addr]
+            mask = np.int64(_BIT_MASK[bit_addr])
+            byte_val = iram[byte_addr]
+            if iram[PSW] & 0x80:
+                byte_val |= mask
+            else:
+                byte_val &= ~mask
+            _write_direct(iram, state, events, byte_addr, byte_val)
+            cycles += 2
+        elif op == 0x93:       # MOVC A, @A+DPTR
+            iram[ACC] = rom[(_dptr(iram) + iram[ACC]) & 0xFFFF]
+            cycles += 2
+        elif op == 0x94:       # SUBB A, #data
+            data = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            _subb(iram, data)
+            cycles += 1
+        elif op == 0x95:       # SUBB A, direct
+            addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            _subb(iram, iram[addr])
+            cycles += 1
+        elif op == 0xA2:       # MOV C, bit
+            bit_addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            byte_val = iram[_BIT_BYTE[bit_addr]]
+            bit_val = 1 if byte_val & _BIT_MASK[bit_addr] else 0
+            iram[PSW] = (iram[PSW] & 0x7F) | (bit_val << 7)
+            cycles += 1
+        elif op == 0xA3:       # INC DPTR
+            dptr = (_dptr(iram) + 1) & 0xFFFF
+            iram[DPH] = dptr >> 8
+            iram[DPL] = dptr & 0xFF
+            cycles += 2
+        elif op == 0xA4:       # MUL AB
+            result = iram[ACC] * iram[B]
+            iram[ACC] = result & 0xFF
+            iram[B] = (result >> 8) & 0xFF
+            if result > 255:
+                iram[PSW] |= 0x04
+            else:
+                iram[PSW] &= 0xFB
+            iram[PSW] &= 0x7F
+            cycles += 4
+        elif op == 0xB2 or op == 0xC2 or op == 0xD2:
+            # CPL/CLR/SETB bit
+            bit_addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            byte_addr = _BIT_BYTE[bit_addr]
+            mask = np.int64(_BIT_MASK[bit_addr])
+            byte_val = iram[byte_addr]
+            if op == 0xB2:
+                byte_val ^= mask
+            elif op == 0xC2:
+                byte_val &= ~mask
+            else:
+                byte_val |= mask
+            _write_direct(iram, state, events, byte_addr, byte_val)
+            cycles += 1
+        elif op == 0xB3:       # CPL C
+            iram[PSW] ^= 0x80
+            cycles += 1
+        elif op == 0xB4 or op == 0xB5:
+            # CJNE A, #data, rel and CJNE A, direct, rel
+            data = rom[pc]
+            rel = rom[(pc + 1) & 0xFFFF]
+            pc = (pc + 2) & 0xFFFF
+            if op == 0xB5:
+                data = iram[data]
+            acc = iram[ACC]
+            if acc != data:
+                pc = _relative(pc, rel)
+            if acc < data:
+                iram[PSW] |= 0x80
+            else:
+                iram[PSW] &= 0x7F
+            cycles += 2
+        elif op == 0xC0:       # PUSH direct
+            addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            _push(iram, state, events, iram[addr])
+            cycles += 2
+        elif op == 0xC3:       # CLR C
+            iram[PSW] &= 0x7F
+            cycles += 1
+        elif op == 0xC4:       # SWAP A
+            acc = iram[ACC]
+            iram[ACC] = ((acc & 0x0F) << 4) | ((acc & 0xF0) >> 4)
+            cycles += 1
+        elif op == 0xC5:       # XCH A, direct
+            addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            temp = iram[ACC]
+            iram[ACC] = iram[addr]
+            _write_direct(iram, state, events, addr, temp)
+            cycles += 1
+        elif op == 0xD0:       # POP direct
+            addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            _write_direct(iram, state, events, addr, _pop(iram))
+            cycles += 2
+        elif op == 0xD3:       # SETB C
+            iram[PSW] |= 0x80
+            cycles += 1
+        elif op == 0xD4:       # DA A
+            index = (np.int64(iram[ACC]) << 2) | (iram[PSW] >> 6)
+            iram[ACC] = _DA_ACC[index]
+            iram[PSW] |= _DA_CARRY[index]
+            cycles += 1
+        elif op == 0xD5:       # DJNZ direct, rel
+            addr = rom[pc]
+            rel = rom[(pc + 1) & 0xFFFF]
+            pc = (pc + 2) & 0xFFFF
+            value = (iram[addr] - 1) & 0xFF
+            _write_direct(iram, state, events, addr, value)
+            if value != 0:
+                pc = _relative(pc, rel)
+            cycles += 2
+        elif op == 0xE0:       # MOVX A, @DPTR
+            iram[ACC] = xram[_dptr(iram)]
+            cycles += 2
+        elif op == 0xE2 or op == 0xE3:
+            # MOVX A, @Ri
+            iram[ACC] = xram[iram[state[_RBANK] | (op & 0x01)]]
+            cycles += 2
+        elif op == 0xE4:       # CLR A
+            iram[ACC] = 0
+            cycles += 1
+        elif op == 0xE5:       # MOV A, direct
+            addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            iram[ACC] = iram[addr]
+            cycles += 1
+        elif op == 0xF0:       # MOVX @DPTR, A
+            xram[_dptr(iram)] = iram[ACC]
+            cycles += 2
+        elif op == 0xF2 or op == 0xF3:
+            # MOVX @Ri, A
+            xram[iram[state[_RBANK] | (op & 0x01)]] = iram[ACC]
+            cycles += 2
+        elif op == 0xF4:       # CPL A
+            iram[ACC] ^= 0xFF
+            cycles += 1
+        elif op == 0xF5:       # MOV direct, A
+            addr = rom[pc]
+            pc = (pc + 1) & 0xFFFF
+            _write_direct(iram, state, events, addr, iram[ACC])
+            cycles += 1
+        else:
+            state[_STATUS] = 1
+            break
+
+        if state[_NEVENTS]:
+            break
+
+    state[_PC] = pc
+    state[_CYCLES] = cycles
+
+
+def _sfr_property(addr, doc):
+    """Attribute access to the SFR at addr"""
+    def get(self):
+        return self.iram[addr]
+
+    def set(self, value):
+        self.iram[addr] = value & 0xFF
+
+    return property(get, set, doc=doc)
 
 
 class CPU8051:
@@ -22,1166 +913,1399 @@ class CPU8051:
         # ROM/Program memory (up to 64KB)
         self.rom = bytearray(65536)
         
-        # CPU registers
-        self.pc = 0x0000  # Program counter
-        self.sp = 0x07    # Stack pointer (starts at 0x07)
-        self.psw = 0x00   # Program Status Word
-        self.acc = 0x00   # Accumulator
-        self.b = 0x00     # B register
-        self.dptr = 0x0000  # Data pointer (DPH:DPL)
+        # Program counter; the other registers are SFRs in iram
+        self.pc = 0x0000
+
+        # iram address of R0 in the bank selected by PSW RS1:RS0
+        self._rbank = 0
+        self.iram[SP] = 0x07    # Stack pointer (starts at 0x07)
         
-        # Special Function Registers (SFR) - memory mapped at 0x80-0xFF
-        self.P0 = 0xFF  # Port 0
-        self.P1 = 0xFF  # Port 1
-        self.P2 = 0xFF  # Port 2
-        self.P3 = 0xFF  # Port 3
-        self.TCON = 0x00  # Timer control
-        self.TMOD = 0x00  # Timer mode
-        self.TL0 = 0x00   # Timer 0 low
-        self.TH0 = 0x00   # Timer 0 high
-        self.TL1 = 0x00   # Timer 1 low
-        self.TH1 = 0x00   # Timer 1 high
-        self.SCON = 0x00  # Serial control
-        self.SBUF = 0x00  # Serial buffer
-        self.IE = 0x00    # Interrupt enable
-        self.IP = 0x00    # Interrupt priority
+        # Ports idle high
+        self.iram[P0] = self.iram[P1] = self.iram[P2] = self.iram[P3] = 0xFF
         
         # Interrupt handling
-        self.interrupt_pending = [False] * 6
+        # Pending interrupts, one bit per source at its IE enable bit
+        # position (0x10: serial)
+        self.irq_pending = 0
         self.interrupt_enabled = False
         
+        # UART receiver: bytes from uart_receive() wait here and reach SBUF
+        # one serial frame apart, at uart_rx_ready cycles at the earliest
+        self.uart_rx_queue = deque()
+        self.uart_rx_ready = 0
+        # Set when a byte may be due or an interrupt may be pending, so the
+        # run loops only look at the UART and interrupts when it is set
+        self._int_needs_check = False
+        
         # Peripheral interfaces
         self.uart_rx_callback = None
         self.uart_tx_callback = None
-        self.port_write_callbacks = {}
+        # Port write callbacks indexed by SFR address (P1 and P3 are called)
+        self.port_write_callbacks = [None] * 256
         
         # Execution state
         self.running = True
         self.cycle_count = 0
+
+        # Opcode -> handler table; each handler is called with its opcode
+        # and the two bytes after it, with pc already past the instruction.
+        # The caller adds the instruction's CYCLES to cycle_count.
+        self.dispatch = self._build_dispatch()
+
+        # Instructions decoded on first execution, indexed by address
+        self.decoded = [None] * 0x10000
+
+        # The plain Python run loop's view of the ROM: decoded entries whose
+        # handler runs a whole block of straight-line code (opcode None), or
+        # the single decoded instruction where no block is worth it
+        self.blocks = [None] * 0x10000
+
+        # State handed to the compiled run loop: uint8 views of the memories
+        # plus the registers outside iram and queued port writes as arrays
+        self._iram_array = np.frombuffer(self.iram, dtype=np.uint8)
+        self._xram_array = np.frombuffer(self.xram, dtype=np.uint8)
+        self._rom_array = np.frombuffer(self.rom, dtype=np.uint8)
+        self._state = np.zeros(7, dtype=np.int64)
+        self._events = np.zeros(2 * _MAX_EVENTS, dtype=np.int64)
+
+    # SFRs by name
+    P0 = _sfr_property(P0, "Port 0")
+    P1 = _sfr_property(P1, "Port 1")
+    P2 = _sfr_property(P2, "Port 2")
+    P3 = _sfr_property(P3, "Port 3")
+    TCON = _sfr_property(TCON, "Timer control")
+    TMOD = _sfr_property(TMOD, "Timer mode")
+    TL0 = _sfr_property(TL0, "Timer 0 low")
+    TH0 = _sfr_property(TH0, "Timer 0 high")
+    TL1 = _sfr_property(TL1, "Timer 1 low")
+    TH1 = _sfr_property(TH1, "Timer 1 high")
+    SCON = _sfr_property(SCON, "Serial control")
+    SBUF = _sfr_property(SBUF, "Serial buffer")
+    IE = _sfr_property(IE, "Interrupt enable")
+    IP = _sfr_property(IP, "Interrupt priority")
+    sp = _sfr_property(SP, "Stack pointer")
+    acc = _sfr_property(ACC, "Accumulator")
+    b = _sfr_property(B, "B register")
+
+    @property
+    def psw(self):
+        """Program Status Word"""
+        return self.iram[PSW]
+
+    @psw.setter
+    def psw(self, value):
+        self.iram[PSW] = value & 0xFF
+        self._rbank = value & 0x18
+
+    @property
+    def dptr(self):
+        """Data pointer (DPH:DPL)"""
+        return (self.iram[DPH] << 8) | self.iram[DPL]
+
+    @dptr.setter
+    def dptr(self, value):
+        self.iram[DPH] = (value >> 8) & 0xFF
+        self.iram[DPL] = value & 0xFF
         
     def load_rom(self, data, offset=0):
         """Load binary data into ROM"""
-        for i, byte in enumerate(data):
-            self.rom[offset + i] = byte
-            
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data)
+        end = offset + len(data)
+        if end > len(self.rom):
+            raise ValueError(f"ROM data ends at 0x{end:X}, past the 64KB ROM")
+        self.rom[offset:end] = data
+        self.decoded = [None] * 0x10000
+        self.blocks = [None] * 0x10000
+
+    def _decode(self, pc):
+        """
+        Decode the instruction at pc into (handler, opcode, byte1, byte2,
+        next_pc, cycles) and cache it
+        """
+        rom = self.rom
+        op = rom[pc]
+        entry = (self.dispatch[op], op, rom[(pc + 1) & 0xFFFF],
+                 rom[(pc + 2) & 0xFFFF], (pc + OP_SIZE[op]) & 0xFFFF,
+                 CYCLES[op])
+        self.decoded[pc] = entry
+        return entry
+
+    def _compile_block(self, pc):
+        """
+        Compile the straight-line code at pc into one Python function and
+        cache it as a decoded entry (block, None, 0, 0, next_pc, cycles),
+        or cache the decoded instruction when the block would be just that
+
+        A block stops before a jump, call, return or branch and after any
+        write to a port, SBUF, IE or PSW. Common moves and logic are inlined;
+        everything else calls its handler.
+        """
+        rom = self.rom
+        lines = ["rb = cpu._rbank"]
+        handlers = {}
+        start = pc
+        count = cycles = 0
+        while count < _BLOCK_MAX:
+            op = rom[pc]
+            if op in _BLOCK_ENDS or self.dispatch[op] == self._op_unimplemented:
+                break
+            byte1 = rom[(pc + 1) & 0xFFFF]
+            byte2 = rom[(pc + 2) & 0xFFFF]
+            source = _inline_source(op, byte1, byte2)
+            if source is None:
+                name = f"h{len(handlers)}"
+                handlers[name] = self.dispatch[op]
+                lines.append(f"{name}({op:#04x}, {byte1:#04x}, {byte2:#04x})")
+                lines.append("rb = cpu._rbank")
+            else:
+                lines.append(source)
+            count += 1
+            cycles += CYCLES[op]
+            pc = (pc + OP_SIZE[op]) & 0xFFFF
+            if _direct_destination(op, byte1, byte2) in _WRITE_HOOKS:
+                break
+        if count < 2:
+            entry = self.decoded[start] or self._decode(start)
+            self.blocks[start] = entry
+            return entry
+        names = ["iram", "write", "cpu", *handlers]
+        source = (f"def block(opcode, byte1, byte2, "
+                  f"{', '.join(f'{n}={n}' for n in names)}):\n"
+                  + "".join(f"    {line}\n" for line in lines))
+        namespace = dict(handlers, iram=self.iram, write=self.write_direct,
+                         cpu=self)
+        exec(compile(source, f"<block 0x{start:04X}>", "exec"), namespace)
+        entry = (namespace["block"], None, 0, 0, pc, cycles)
+        self.blocks[start] = entry
+        return entry
+
     def reset(self):
         """Reset the CPU to initial state"""
         self.pc = 0x0000
-        self.sp = 0x07
-        self.psw = 0x00
-        self.acc = 0x00
-        self.b = 0x00
-        self.dptr = 0x0000
-        self.IE = 0x00
+        iram = self.iram
+        iram[SP] = 0x07
+        iram[PSW] = 0x00
+        self._rbank = 0
+        iram[ACC] = 0x00
+        iram[B] = 0x00
+        iram[DPL] = iram[DPH] = 0x00
+        iram[IE] = 0x00
         self.running = True
-        
-    def read_sfr(self, addr):
-        """Read Special Function Register"""
-        if addr == 0x80:  # P0
-            return self.P0
-        elif addr == 0x81:  # SP
-            return self.sp
-        elif addr == 0x82:  # DPL
-            return self.dptr & 0xFF
-        elif addr == 0x83:  # DPH
-            return (self.dptr >> 8) & 0xFF
-        elif addr == 0x87:  # PCON
-            return 0x00
-        elif addr == 0x88:  # TCON
-            return self.TCON
-        elif addr == 0x89:  # TMOD
-            return self.TMOD
-        elif addr == 0x8A:  # TL0
-            return self.TL0
-        elif addr == 0x8B:  # TL1
-            return self.TL1
-        elif addr == 0x8C:  # TH0
-            return self.TH0
-        elif addr == 0x8D:  # TH1
-            return self.TH1
-        elif addr == 0x90:  # P1
-            return self.P1
-        elif addr == 0x98:  # SCON
-            return self.SCON
-        elif addr == 0x99:  # SBUF
-            return self.SBUF
-        elif addr == 0xA0:  # P2
-            return self.P2
-        elif addr == 0xA8:  # IE
-            return self.IE
-        elif addr == 0xB0:  # P3
-            return self.P3
-        elif addr == 0xB8:  # IP
-            return self.IP
-        elif addr == 0xD0:  # PSW
-            return self.psw
-        elif addr == 0xE0:  # ACC
-            return self.acc
-        elif addr == 0xF0:  # B
-            return self.b
-        else:
-            return self.iram[addr]
-            
-    def write_sfr(self, addr, value):
-        """Write Special Function Register"""
-        value = value & 0xFF
-        
-        if addr == 0x80:  # P0
-            self.P0 = value
-        elif addr == 0x81:  # SP
-            self.sp = value
-        elif addr == 0x82:  # DPL
-            self.dptr = (self.dptr & 0xFF00) | value
-        elif addr == 0x83:  # DPH
-            self.dptr = (self.dptr & 0x00FF) | (value << 8)
-        elif addr == 0x88:  # TCON
-            self.TCON = value
-        elif addr == 0x89:  # TMOD
-            self.TMOD = value
-        elif addr == 0x8A:  # TL0
-            self.TL0 = value
-        elif addr == 0x8B:  # TL1
-            self.TL1 = value
-        elif addr == 0x8C:  # TH0
-            self.TH0 = value
-        elif addr == 0x8D:  # TH1
-            self.TH1 = value
-        elif addr == 0x90:  # P1
-            self.P1 = value
-            if 0x90 in self.port_write_callbacks:
-                self.port_write_callbacks[0x90](value)
-        elif addr == 0x98:  # SCON
-            self.SCON = value
-        elif addr == 0x99:  # SBUF
-            self.SBUF = value
-            if self.uart_tx_callback:
-                self.uart_tx_callback(value)
-        elif addr == 0xA0:  # P2
-            self.P2 = value
-        elif addr == 0xA8:  # IE
-            self.IE = value
-            self.interrupt_enabled = (value & 0x80) != 0
-        elif addr == 0xB0:  # P3
-            self.P3 = value
-            if 0xB0 in self.port_write_callbacks:
-                self.port_write_callbacks[0xB0](value)
-        elif addr == 0xB8:  # IP
-            self.IP = value
-        elif addr == 0xD0:  # PSW
-            self.psw = value
-        elif addr == 0xE0:  # ACC
-            self.acc = value
-        elif addr == 0xF0:  # B
-            self.b = value
-        else:
-            self.iram[addr] = value
             
     def read_direct(self, addr):
         """Read direct address (internal RAM or SFR)"""
-        if addr >= 0x80:
-            return self.read_sfr(addr)
         return self.iram[addr]
         
     def write_direct(self, addr, value):
         """Write direct address (internal RAM or SFR)"""
-        if addr >= 0x80:
-            self.write_sfr(addr, value)
+        value &= 0xFF
+        self.iram[addr] = value
+        if addr in _WRITE_HOOKS:
+            self._write_hook(addr, value)
+
+    def _write_hook(self, addr, value):
+        """Side effects of writing a port, SBUF, IE or PSW"""
+        if addr == PSW:
+            self._rbank = value & 0x18
+        elif addr == IE:
+            self.interrupt_enabled = (value & 0x80) != 0
+        elif addr == SBUF:
+            if self.uart_tx_callback:
+                self.uart_tx_callback(value)
         else:
-            self.iram[addr] = value & 0xFF
+            callback = self.port_write_callbacks[addr]
+            if callback is not None:
+                callback(value)
             
-    def fetch_byte(self):
-        """Fetch next byte from program memory"""
-        byte = self.rom[self.pc]
-        self.pc = (self.pc + 1) & 0xFFFF
-        return byte
-        
-    def fetch_word(self):
-        """Fetch next word (16-bit) from program memory"""
-        high = self.fetch_byte()
-        low = self.fetch_byte()
-        return (high << 8) | low
-        
     def push(self, value):
         """Push byte onto stack"""
-        self.sp = (self.sp + 1) & 0xFF
-        self.write_direct(self.sp, value)
+        sp = (self.iram[SP] + 1) & 0xFF
+        self.iram[SP] = sp
+        self.write_direct(sp, value)
         
     def pop(self):
         """Pop byte from stack"""
-        value = self.read_direct(self.sp)
-        self.sp = (self.sp - 1) & 0xFF
+        iram = self.iram
+        sp = iram[SP]
+        value = iram[sp]
+        iram[SP] = (sp - 1) & 0xFF
         return value
         
     def uart_receive(self, byte):
-        """Receive byte via UART"""
-        self.SBUF = byte & 0xFF
+        """
+        Receive byte via UART
+
+        The byte is queued and reaches SBUF before the next instruction
+        the CPU thread executes, or one frame after the previous byte.
+        Safe to call from another thread.
+        """
+        self.uart_rx_queue.append(byte & 0xFF)
+        self._int_needs_check = True
+
+    def _uart_deliver(self, cycle_count):
+        """Move the next queued byte into SBUF and raise RI"""
+        iram = self.iram
+        iram[SBUF] = self.uart_rx_queue.popleft()
         # Set RI (receive interrupt) flag in SCON
-        self.SCON |= 0x01
+        iram[SCON] |= 0x01
         # Trigger UART interrupt if enabled
-        if self.IE & 0x10:  # ES (serial interrupt enable)
-            self.interrupt_pending[4] = True
+        if iram[IE] & 0x10:  # ES (serial interrupt enable)
+            self.irq_pending |= 0x10
+        # Serial mode 1 clocked by timer 1 in auto-reload mode: a 10-bit
+        # frame takes 32 timer overflows per bit, 16 with SMOD set
+        bit_cycles = 32 * (256 - iram[TH1])
+        if iram[PCON] & 0x80:
+            bit_cycles //= 2
+        self.uart_rx_ready = cycle_count + 10 * bit_cycles
+
+    def _service_interrupts(self, cycle_count):
+        """
+        Deliver a due UART byte and take a pending serial interrupt
+
+        The flag is cleared before looking and set again while a byte is
+        still queued or an interrupt is still pending, so a byte queued by
+        another thread in between is not missed.
+        """
+        self._int_needs_check = False
+        if self.uart_rx_queue and cycle_count >= self.uart_rx_ready:
+            self._uart_deliver(cycle_count)
+
+        # Priority: EXT0 > TIMER0 > EXT1 > TIMER1 > SERIAL
+        # For this firmware, we mainly care about UART (serial) interrupt
+        if self.irq_pending and self.interrupt_enabled:
+            if self.irq_pending & self.iram[IE] & 0x10:  # Serial interrupt
+                self.irq_pending &= ~0x10
+                # Call interrupt handler at 0x0023
+                self.push(self.pc & 0xFF)
+                self.push((self.pc >> 8) & 0xFF)
+                self.pc = 0x0023
+
+        if self.uart_rx_queue or self.irq_pending:
+            self._int_needs_check = True
             
+    def _build_dispatch(self):
+        """Build the 256-entry opcode -> handler table"""
+        dispatch = [self._op_unimplemented] * 256
+
+        # AJMP/ACALL carry address bits 8-10 in the top three opcode bits
+        for op in range(0x01, 0x100, 0x20):
+            dispatch[op] = self._op_ajmp
+            dispatch[op + 0x10] = self._op_acall
+
+        for op, handler in (
+            (0x00, self._op_nop),
+            (0x02, self._op_ljmp),
+            (0x03, self._op_rr_a),
+            (0x04, self._op_inc_a),
+            (0x05, self._op_inc_direct),
+            (0x10, self._op_jbc),
+            (0x12, self._op_lcall),
+            (0x13, self._op_rrc_a),
+            (0x14, self._op_dec_a),
+            (0x15, self._op_dec_direct),
+            (0x20, self._op_jb),
+            (0x22, self._op_ret),
+            (0x23, self._op_rl_a),
+            (0x24, self._op_add_imm),
+            (0x25, self._op_add_direct),
+            (0x30, self._op_jnb),
+            (0x32, self._op_reti),
+            (0x33, self._op_rlc_a),
+            (0x34, self._op_addc_imm),
+            (0x35, self._op_addc_direct),
+            (0x40, self._op_jc),
+            (0x42, self._op_orl_direct_a),
+            (0x43, self._op_orl_direct_imm),
+            (0x44, self._op_orl_imm),
+            (0x45, self._op_orl_direct),
+            (0x50, self._op_jnc),
+            (0x52, self._op_anl_direct_a),
+            (0x53, self._op_anl_direct_imm),
+            (0x54, self._op_anl_imm),
+            (0x55, self._op_anl_direct),
+            (0x60, self._op_jz),
+            (0x62, self._op_xrl_direct_a),
+            (0x63, self._op_xrl_direct_imm),
+            (0x64, self._op_xrl_imm),
+            (0x65, self._op_xrl_direct),
+            (0x70, self._op_jnz),
+            (0x72, self._op_orl_c_bit),
+            (0x73, self._op_jmp_a_dptr),
+            (0x74, self._op_mov_a_imm),
+            (0x75, self._op_mov_direct_imm),
+            (0x80, self._op_sjmp),
+            (0x82, self._op_anl_c_bit),
+            (0x83, self._op_movc_a_pc),
+            (0x84, self._op_div_ab),
+            (0x85, self._op_mov_direct_direct),
+            (0x90, self._op_mov_dptr_imm),
+            (0x92, self._op_mov_bit_c),
+            (0x93, self._op_movc_a_dptr),
+            (0x94, self._op_subb_imm),
+            (0x95, self._op_subb_direct),
+            (0xA0, self._op_orl_c_nbit),
+            (0xA2, self._op_mov_c_bit),
+            (0xA3, self._op_inc_dptr),
+            (0xA4, self._op_mul_ab),
+            (0xB0, self._op_anl_c_nbit),
+            (0xB2, self._op_cpl_bit),
+            (0xB3, self._op_cpl_c),
+            (0xB4, self._op_cjne_a_imm),
+            (0xB5, self._op_cjne_a_direct),
+            (0xC0, self._op_push),
+            (0xC2, self._op_clr_bit),
+            (0xC3, self._op_clr_c),
+            (0xC4, self._op_swap_a),
+            (0xC5, self._op_xch_direct),
+            (0xD0, self._op_pop),
+            (0xD2, self._op_setb_bit),
+            (0xD3, self._op_setb_c),
+            (0xD4, self._op_da_a),
+            (0xD5, self._op_djnz_direct),
+            (0xE0, self._op_movx_a_dptr),
+            (0xE4, self._op_clr_a),
+            (0xE5, self._op_mov_a_direct),
+            (0xF0, self._op_movx_dptr_a),
+            (0xF4, self._op_cpl_a),
+            (0xF5, self._op_mov_direct_a),
+        ):
+            dispatch[op] = handler
+
+        # @R0/@R1 pairs: one handler per register
+        for op, at_r0, at_r1 in (
+            (0x06, self._op_inc_at_r0, self._op_inc_at_r1),
+            (0x16, self._op_dec_at_r0, self._op_dec_at_r1),
+            (0x26, self._op_add_at_r0, self._op_add_at_r1),
+            (0x36, self._op_addc_at_r0, self._op_addc_at_r1),
+            (0x46, self._op_orl_at_r0, self._op_orl_at_r1),
+            (0x56, self._op_anl_at_r0, self._op_anl_at_r1),
+            (0x66, self._op_xrl_at_r0, self._op_xrl_at_r1),
+            (0x76, self._op_mov_at_r0_imm, self._op_mov_at_r1_imm),
+            (0x86, self._op_mov_direct_at_r0, self._op_mov_direct_at_r1),
+            (0x96, self._op_subb_at_r0, self._op_subb_at_r1),
+            (0xA6, self._op_mov_at_r0_direct, self._op_mov_at_r1_direct),
+            (0xB6, self._op_cjne_at_r0, self._op_cjne_at_r1),
+            (0xC6, self._op_xch_at_r0, self._op_xch_at_r1),
+            (0xD6, self._op_xchd_at_r0, self._op_xchd_at_r1),
+            (0xE2, self._op_movx_a_at_r0, self._op_movx_a_at_r1),
+            (0xE6, self._op_mov_a_at_r0, self._op_mov_a_at_r1),
+            (0xF2, self._op_movx_at_r0_a, self._op_movx_at_r1_a),
+            (0xF6, self._op_mov_at_r0_a, self._op_mov_at_r1_a),
+        ):
+            dispatch[op] = at_r0
+            dispatch[op + 1] = at_r1
+
+        # R0-R7 ranges: the handler picks the register from bits 0-2
+        for op, handler in (
+            (0x08, self._op_inc_rn),
+            (0x18, self._op_dec_rn),
+            (0x28, self._op_add_rn),
+            (0x38, self._op_addc_rn),
+            (0x48, self._op_orl_rn),
+            (0x58, self._op_anl_rn),
+            (0x68, self._op_xrl_rn),
+            (0x78, self._op_mov_rn_imm),
+            (0x88, self._op_mov_direct_rn),
+            (0x98, self._op_subb_rn),
+            (0xA8, self._op_mov_rn_direct),
+        ):
+            dispatch[op:op + 8] = [handler] * 8
+
+        # The hottest R0-R7 ranges get a handler per register with the
+        # register number bound in
+        for op, make_handler in (
+            (0xB8, self._make_cjne_rn),
+            (0xC8, self._make_xch_rn),
+            (0xD8, self._make_djnz_rn),
+            (0xE8, self._make_mov_a_rn),
+            (0xF8, self._make_mov_rn_a),
+        ):
+            for n in range(8):
+                dispatch[op | n] = make_handler(n)
+
+        return tuple(dispatch)
+
     def execute_instruction(self):
         """Execute one instruction"""
-        opcode = self.fetch_byte()
-        
-        # NOP
-        if opcode == 0x00:
-            self.cycle_count += 1
-            
-        # AJMP addr11
-        elif (opcode & 0x1F) == 0x01:
-            addr11 = ((opcode & 0xE0) << 3) | self.fetch_byte()
-            self.pc = (self.pc & 0xF800) | addr11
-            self.cycle_count += 2
-            
-        # LJMP addr16
-        elif opcode == 0x02:
-            addr = self.fetch_word()
-            self.pc = addr
-            self.cycle_count += 2
-            
-        # RR A
-        elif opcode == 0x03:
-            carry = self.acc & 0x01
-            self.acc = ((self.acc >> 1) | (carry << 7)) & 0xFF
-            self.cycle_count += 1
-            
-        # INC A
-        elif opcode == 0x04:
-            self.acc = (self.acc + 1) & 0xFF
-            self.cycle_count += 1
-            
-        # INC direct
-        elif opcode == 0x05:
-            addr = self.fetch_byte()
-            value = self.read_direct(addr)
-            self.write_direct(addr, (value + 1) & 0xFF)
-            self.cycle_count += 1
-            
-        # INC @R0 or INC @R1
-        elif opcode in [0x06, 0x07]:
-            r = opcode & 0x01
-            addr = self.iram[r]
-            value = self.iram[addr]
-            self.iram[addr] = (value + 1) & 0xFF
-            self.cycle_count += 1
-            
-        # INC R0-R7
-        elif 0x08 <= opcode <= 0x0F:
-            r = opcode & 0x07
-            self.iram[r] = (self.iram[r] + 1) & 0xFF
-            self.cycle_count += 1
-            
-        # JBC bit, rel
-        elif opcode == 0x10:
-            bit_addr = self.fetch_byte()
-            rel = self.fetch_byte()
-            # Read bit
-            byte_addr = (bit_addr >> 3) | 0x20 if bit_addr < 0x80 else 0x80 + ((bit_addr >> 3) & 0x0F)
-            bit_pos = bit_addr & 0x07
-            byte_val = self.read_direct(byte_addr)
-            if byte_val & (1 << bit_pos):
-                # Clear bit
-                self.write_direct(byte_addr, byte_val & ~(1 << bit_pos))
-                # Jump
-                if rel & 0x80:
-                    self.pc = (self.pc - (256 - rel)) & 0xFFFF
-                else:
-                    self.pc = (self.pc + rel) & 0xFFFF
-            self.cycle_count += 2
-            
-        # ACALL addr11
-        elif (opcode & 0x1F) == 0x11:
-            addr11 = ((opcode & 0xE0) << 3) | self.fetch_byte()
-            self.push(self.pc & 0xFF)
-            self.push((self.pc >> 8) & 0xFF)
-            self.pc = (self.pc & 0xF800) | addr11
-            self.cycle_count += 2
-            
-        # LCALL addr16
-        elif opcode == 0x12:
-            addr = self.fetch_word()
-            self.push(self.pc & 0xFF)
-            self.push((self.pc >> 8) & 0xFF)
-            self.pc = addr
-            self.cycle_count += 2
-            
-        # RRC A
-        elif opcode == 0x13:
-            carry = (self.psw >> 7) & 0x01
-            new_carry = self.acc & 0x01
-            self.acc = ((self.acc >> 1) | (carry << 7)) & 0xFF
-            self.psw = (self.psw & 0x7F) | (new_carry << 7)
-            self.cycle_count += 1
-            
-        # DEC A
-        elif opcode == 0x14:
-            self.acc = (self.acc - 1) & 0xFF
-            self.cycle_count += 1
-            
-        # DEC direct
-        elif opcode == 0x15:
-            addr = self.fetch_byte()
-            value = self.read_direct(addr)
-            self.write_direct(addr, (value - 1) & 0xFF)
-            self.cycle_count += 1
-            
-        # DEC @R0 or DEC @R1
-        elif opcode in [0x16, 0x17]:
-            r = opcode & 0x01
-            addr = self.iram[r]
-            value = self.iram[addr]
-            self.iram[addr] = (value - 1) & 0xFF
-            self.cycle_count += 1
-            
-        # DEC R0-R7
-        elif 0x18 <= opcode <= 0x1F:
-            r = opcode & 0x07
-            self.iram[r] = (self.iram[r] - 1) & 0xFF
-            self.cycle_count += 1
-            
-        # JB bit, rel
-        elif opcode == 0x20:
-            bit_addr = self.fetch_byte()
-            rel = self.fetch_byte()
-            # Read bit
-            byte_addr = (bit_addr >> 3) | 0x20 if bit_addr < 0x80 else 0x80 + ((bit_addr >> 3) & 0x0F)
-            bit_pos = bit_addr & 0x07
-            byte_val = self.read_direct(byte_addr)
-            if byte_val & (1 << bit_pos):
-                if rel & 0x80:
-                    self.pc = (self.pc - (256 - rel)) & 0xFFFF
-                else:
-                    self.pc = (self.pc + rel) & 0xFFFF
-            self.cycle_count += 2
-            
-        # RET
-        elif opcode == 0x22:
+        pc = self.pc
+        entry = self.decoded[pc] or self._decode(pc)
+        handler, opcode, byte1, byte2, self.pc, cycles = entry
+        handler(opcode, byte1, byte2)
+        self.cycle_count += cycles
+
+    def _op_unimplemented(self, opcode, byte1, byte2):
+        print(f"Unimplemented opcode: 0x{opcode:02X} at PC=0x{self.pc-1:04X}")
+        self.running = False
+
+    def _op_nop(self, opcode, byte1, byte2):
+        """NOP"""
+
+    def _op_ajmp(self, opcode, byte1, byte2):
+        """AJMP addr11"""
+        addr11 = ((opcode & 0xE0) << 3) | byte1
+        self.pc = (self.pc & 0xF800) | addr11
+
+    def _op_ljmp(self, opcode, byte1, byte2):
+        """LJMP addr16"""
+        addr = (byte1 << 8) | byte2
+        self.pc = addr
+
+    def _op_rr_a(self, opcode, byte1, byte2):
+        """RR A"""
+        iram = self.iram
+        carry = iram[ACC] & 0x01
+        iram[ACC] = ((iram[ACC] >> 1) | (carry << 7)) & 0xFF
+
+    def _op_inc_a(self, opcode, byte1, byte2):
+        """INC A"""
+        self.iram[ACC] = (self.iram[ACC] + 1) & 0xFF
+
+    def _op_inc_direct(self, opcode, byte1, byte2):
+        """INC direct"""
+        addr = byte1
+        value = self.iram[addr]
+        self.write_direct(addr, (value + 1) & 0xFF)
+
+    def _op_inc_at_r0(self, opcode, byte1, byte2):
+        """INC @R0"""
+        iram = self.iram
+        r = self._rbank
+        addr = iram[r]
+        value = iram[addr]
+        iram[addr] = (value + 1) & 0xFF
+
+    def _op_inc_at_r1(self, opcode, byte1, byte2):
+        """INC @R1"""
+        iram = self.iram
+        r = self._rbank | 1
+        addr = iram[r]
+        value = iram[addr]
+        iram[addr] = (value + 1) & 0xFF
+
+    def _op_inc_rn(self, opcode, byte1, byte2):
+        """INC R0-R7"""
+        r = self._rbank | (opcode & 0x07)
+        self.iram[r] = (self.iram[r] + 1) & 0xFF
+
+    def _op_jbc(self, opcode, byte1, byte2):
+        """JBC bit, rel"""
+        bit_addr = byte1
+        rel = byte2
+        # Read bit
+        byte_addr = BIT_BYTE[bit_addr]
+        byte_val = self.iram[byte_addr]
+        if byte_val & BIT_MASK[bit_addr]:
+            # Clear bit
+            self.write_direct(byte_addr, byte_val & BIT_NMASK[bit_addr])
+            # Jump
+            self.pc = (self.pc + SEXT[rel]) & 0xFFFF
+
+    def _op_acall(self, opcode, byte1, byte2):
+        """ACALL addr11"""
+        addr11 = ((opcode & 0xE0) << 3) | byte1
+        iram = self.iram
+        pc = self.pc
+        sp = iram[SP]
+        if sp < 0x7E:
+            # Stack in plain RAM: store the return address directly
+            iram[sp + 1] = pc & 0xFF
+            iram[sp + 2] = pc >> 8
+            iram[SP] = sp + 2
+        else:
+            self.push(pc & 0xFF)
+            self.push(pc >> 8)
+        self.pc = (pc & 0xF800) | addr11
+
+    def _op_lcall(self, opcode, byte1, byte2):
+        """LCALL addr16"""
+        addr = (byte1 << 8) | byte2
+        iram = self.iram
+        pc = self.pc
+        sp = iram[SP]
+        if sp < 0x7E:
+            # Stack in plain RAM: store the return address directly
+            iram[sp + 1] = pc & 0xFF
+            iram[sp + 2] = pc >> 8
+            iram[SP] = sp + 2
+        else:
+            self.push(pc & 0xFF)
+            self.push(pc >> 8)
+        self.pc = addr
+
+    def _op_rrc_a(self, opcode, byte1, byte2):
+        """RRC A"""
+        iram = self.iram
+        carry = iram[PSW] >> 7
+        new_carry = iram[ACC] & 0x01
+        iram[ACC] = ((iram[ACC] >> 1) | (carry << 7)) & 0xFF
+        iram[PSW] = (iram[PSW] & 0x7F) | (new_carry << 7)
+
+    def _op_dec_a(self, opcode, byte1, byte2):
+        """DEC A"""
+        self.iram[ACC] = (self.iram[ACC] - 1) & 0xFF
+
+    def _op_dec_direct(self, opcode, byte1, byte2):
+        """DEC direct"""
+        addr = byte1
+        value = self.iram[addr]
+        self.write_direct(addr, (value - 1) & 0xFF)
+
+    def _op_dec_at_r0(self, opcode, byte1, byte2):
+        """DEC @R0"""
+        iram = self.iram
+        r = self._rbank
+        addr = iram[r]
+        value = iram[addr]
+        iram[addr] = (value - 1) & 0xFF
+
+    def _op_dec_at_r1(self, opcode, byte1, byte2):
+        """DEC @R1"""
+        iram = self.iram
+        r = self._rbank | 1
+        addr = iram[r]
+        value = iram[addr]
+        iram[addr] = (value - 1) & 0xFF
+
+    def _op_dec_rn(self, opcode, byte1, byte2):
+        """DEC R0-R7"""
+        r = self._rbank | (opcode & 0x07)
+        self.iram[r] = (self.iram[r] - 1) & 0xFF
+
+    def _op_jb(self, opcode, byte1, byte2):
+        """JB bit, rel"""
+        bit_addr = byte1
+        rel = byte2
+        # Read bit
+        byte_addr = BIT_BYTE[bit_addr]
+        byte_val = self.iram[byte_addr]
+        if byte_val & BIT_MASK[bit_addr]:
+            self.pc = (self.pc + SEXT[rel]) & 0xFFFF
+
+    def _op_ret(self, opcode, byte1, byte2):
+        """RET"""
+        iram = self.iram
+        sp = iram[SP]
+        if 1 < sp < 0x80:
+            # Stack in plain RAM: load the return address directly
+            self.pc = (iram[sp] << 8) | iram[sp - 1]
+            iram[SP] = sp - 2
+        else:
             high = self.pop()
             low = self.pop()
             self.pc = (high << 8) | low
-            self.cycle_count += 2
-            
-        # RL A
-        elif opcode == 0x23:
-            carry = (self.acc >> 7) & 0x01
-            self.acc = ((self.acc << 1) | carry) & 0xFF
-            self.cycle_count += 1
-            
-        # ADD A, #data
-        elif opcode == 0x24:
-            data = self.fetch_byte()
-            result = self.acc + data
-            # Set carry (bit 7) and auxiliary carry (bit 6)
-            carry = (result >> 8) & 0x01
-            aux_carry = ((self.acc & 0x0F) + (data & 0x0F)) > 0x0F
-            self.psw = (self.psw & 0x3B) | (carry << 7) | (aux_carry << 6)
-            self.acc = result & 0xFF
-            self.cycle_count += 1
-            
-        # ADD A, direct
-        elif opcode == 0x25:
-            addr = self.fetch_byte()
-            data = self.read_direct(addr)
-            result = self.acc + data
-            # Set carry (bit 7) and auxiliary carry (bit 6)
-            carry = (result >> 8) & 0x01
-            aux_carry = ((self.acc & 0x0F) + (data & 0x0F)) > 0x0F
-            self.psw = (self.psw & 0x3B) | (carry << 7) | (aux_carry << 6)
-            self.acc = result & 0xFF
-            self.cycle_count += 1
-            
-        # ADD A, @R0 or ADD A, @R1
-        elif opcode in [0x26, 0x27]:
-            r = opcode & 0x01
-            addr = self.iram[r]
-            data = self.iram[addr]
-            result = self.acc + data
-            # Set carry (bit 7) and auxiliary carry (bit 6)
-            carry = (result >> 8) & 0x01
-            aux_carry = ((self.acc & 0x0F) + (data & 0x0F)) > 0x0F
-            self.psw = (self.psw & 0x3B) | (carry << 7) | (aux_carry << 6)
-            self.acc = result & 0xFF
-            self.cycle_count += 1
-            
-        # ADD A, R0-R7
-        elif 0x28 <= opcode <= 0x2F:
-            r = opcode & 0x07
-            data = self.iram[r]
-            result = self.acc + data
-            # Set carry (bit 7) and auxiliary carry (bit 6)
-            carry = (result >> 8) & 0x01
-            aux_carry = ((self.acc & 0x0F) + (data & 0x0F)) > 0x0F
-            self.psw = (self.psw & 0x3B) | (carry << 7) | (aux_carry << 6)
-            self.acc = result & 0xFF
-            self.cycle_count += 1
-            
-        # JNB bit, rel
-        elif opcode == 0x30:
-            bit_addr = self.fetch_byte()
-            rel = self.fetch_byte()
-            # Read bit
-            byte_addr = (bit_addr >> 3) | 0x20 if bit_addr < 0x80 else 0x80 + ((bit_addr >> 3) & 0x0F)
-            bit_pos = bit_addr & 0x07
-            byte_val = self.read_direct(byte_addr)
-            if not (byte_val & (1 << bit_pos)):
-                if rel & 0x80:
-                    self.pc = (self.pc - (256 - rel)) & 0xFFFF
-                else:
-                    self.pc = (self.pc + rel) & 0xFFFF
-            self.cycle_count += 2
-            
-        # RETI
-        elif opcode == 0x32:
+
+    def _op_rl_a(self, opcode, byte1, byte2):
+        """RL A"""
+        iram = self.iram
+        carry = (iram[ACC] >> 7) & 0x01
+        iram[ACC] = ((iram[ACC] << 1) | carry) & 0xFF
+
+    def _add(self, data):
+        """ADD A, data"""
+        iram = self.iram
+        acc = iram[ACC]
+        # Set carry (bit 7) and auxiliary carry (bit 6)
+        iram[PSW] = (iram[PSW] & 0x3B) | ADD_FLAGS[(acc << 9) | (data << 1)]
+        iram[ACC] = (acc + data) & 0xFF
+
+    def _op_add_imm(self, opcode, byte1, byte2):
+        """ADD A, #data"""
+        self._add(byte1)
+
+    def _op_add_direct(self, opcode, byte1, byte2):
+        """ADD A, direct"""
+        self._add(self.iram[byte1])
+
+    def _op_add_at_r0(self, opcode, byte1, byte2):
+        """ADD A, @R0"""
+        self._add(self.iram[self.iram[self._rbank]])
+
+    def _op_add_at_r1(self, opcode, byte1, byte2):
+        """ADD A, @R1"""
+        self._add(self.iram[self.iram[self._rbank | 1]])
+
+    def _op_add_rn(self, opcode, byte1, byte2):
+        """ADD A, R0-R7"""
+        self._add(self.iram[self._rbank | (opcode & 0x07)])
+
+    def _op_jnb(self, opcode, byte1, byte2):
+        """JNB bit, rel"""
+        bit_addr = byte1
+        rel = byte2
+        # Read bit
+        byte_addr = BIT_BYTE[bit_addr]
+        byte_val = self.iram[byte_addr]
+        if not (byte_val & BIT_MASK[bit_addr]):
+            self.pc = (self.pc + SEXT[rel]) & 0xFFFF
+
+    def _op_reti(self, opcode, byte1, byte2):
+        """RETI"""
+        iram = self.iram
+        sp = iram[SP]
+        if 1 < sp < 0x80:
+            # Stack in plain RAM: load the return address directly
+            self.pc = (iram[sp] << 8) | iram[sp - 1]
+            iram[SP] = sp - 2
+        else:
             high = self.pop()
             low = self.pop()
             self.pc = (high << 8) | low
-            # Re-enable interrupts
-            self.cycle_count += 2
-            
-        # RLC A
-        elif opcode == 0x33:
-            carry = (self.psw >> 7) & 0x01
-            new_carry = (self.acc >> 7) & 0x01
-            self.acc = ((self.acc << 1) | carry) & 0xFF
-            self.psw = (self.psw & 0x7F) | (new_carry << 7)
-            self.cycle_count += 1
-            
-        # ADDC A, #data
-        elif opcode == 0x34:
-            data = self.fetch_byte()
-            old_carry = (self.psw >> 7) & 0x01
-            result = self.acc + data + old_carry
-            # Set carry (bit 7) and auxiliary carry (bit 6)
-            carry = (result >> 8) & 0x01
-            aux_carry = ((self.acc & 0x0F) + (data & 0x0F) + old_carry) > 0x0F
-            self.psw = (self.psw & 0x3B) | (carry << 7) | (aux_carry << 6)
-            self.acc = result & 0xFF
-            self.cycle_count += 1
-            
-        # ADDC A, direct
-        elif opcode == 0x35:
-            addr = self.fetch_byte()
-            data = self.read_direct(addr)
-            old_carry = (self.psw >> 7) & 0x01
-            result = self.acc + data + old_carry
-            # Set carry (bit 7) and auxiliary carry (bit 6)
-            carry = (result >> 8) & 0x01
-            aux_carry = ((self.acc & 0x0F) + (data & 0x0F) + old_carry) > 0x0F
-            self.psw = (self.psw & 0x3B) | (carry << 7) | (aux_carry << 6)
-            self.acc = result & 0xFF
-            self.cycle_count += 1
-            
-        # JC rel
-        elif opcode == 0x40:
-            rel = self.fetch_byte()
-            if self.psw & 0x80:
-                if rel & 0x80:
-                    self.pc = (self.pc - (256 - rel)) & 0xFFFF
-                else:
-                    self.pc = (self.pc + rel) & 0xFFFF
-            self.cycle_count += 2
-            
-        # ORL direct, A
-        elif opcode == 0x42:
-            addr = self.fetch_byte()
-            value = self.read_direct(addr)
-            self.write_direct(addr, value | self.acc)
-            self.cycle_count += 1
-            
-        # ORL direct, #data
-        elif opcode == 0x43:
-            addr = self.fetch_byte()
-            data = self.fetch_byte()
-            value = self.read_direct(addr)
-            self.write_direct(addr, value | data)
-            self.cycle_count += 2
-            
-        # ORL A, #data
-        elif opcode == 0x44:
-            data = self.fetch_byte()
-            self.acc |= data
-            self.cycle_count += 1
-            
-        # ORL A, direct
-        elif opcode == 0x45:
-            addr = self.fetch_byte()
-            self.acc |= self.read_direct(addr)
-            self.cycle_count += 1
-            
-        # ORL A, @R0 or ORL A, @R1
-        elif opcode in [0x46, 0x47]:
-            r = opcode & 0x01
-            addr = self.iram[r]
-            self.acc |= self.iram[addr]
-            self.cycle_count += 1
-            
-        # ORL A, R0-R7
-        elif 0x48 <= opcode <= 0x4F:
-            r = opcode & 0x07
-            self.acc |= self.iram[r]
-            self.cycle_count += 1
-            
-        # JNC rel
-        elif opcode == 0x50:
-            rel = self.fetch_byte()
-            if not (self.psw & 0x80):
-                if rel & 0x80:
-                    self.pc = (self.pc - (256 - rel)) & 0xFFFF
-                else:
-                    self.pc = (self.pc + rel) & 0xFFFF
-            self.cycle_count += 2
-            
-        # ANL direct, A
-        elif opcode == 0x52:
-            addr = self.fetch_byte()
-            value = self.read_direct(addr)
-            self.write_direct(addr, value & self.acc)
-            self.cycle_count += 1
-            
-        # ANL direct, #data
-        elif opcode == 0x53:
-            addr = self.fetch_byte()
-            data = self.fetch_byte()
-            value = self.read_direct(addr)
-            self.write_direct(addr, value & data)
-            self.cycle_count += 2
-            
-        # ANL A, #data
-        elif opcode == 0x54:
-            data = self.fetch_byte()
-            self.acc &= data
-            self.cycle_count += 1
-            
-        # ANL A, direct
-        elif opcode == 0x55:
-            addr = self.fetch_byte()
-            self.acc &= self.read_direct(addr)
-            self.cycle_count += 1
-            
-        # ANL A, @R0 or ANL A, @R1
-        elif opcode in [0x56, 0x57]:
-            r = opcode & 0x01
-            addr = self.iram[r]
-            self.acc &= self.iram[addr]
-            self.cycle_count += 1
-            
-        # ANL A, R0-R7
-        elif 0x58 <= opcode <= 0x5F:
-            r = opcode & 0x07
-            self.acc &= self.iram[r]
-            self.cycle_count += 1
-            
-        # JZ rel
-        elif opcode == 0x60:
-            rel = self.fetch_byte()
-            if self.acc == 0:
-                if rel & 0x80:
-                    self.pc = (self.pc - (256 - rel)) & 0xFFFF
-                else:
-                    self.pc = (self.pc + rel) & 0xFFFF
-            self.cycle_count += 2
-            
-        # XRL direct, A
-        elif opcode == 0x62:
-            addr = self.fetch_byte()
-            value = self.read_direct(addr)
-            self.write_direct(addr, value ^ self.acc)
-            self.cycle_count += 1
-            
-        # XRL direct, #data
-        elif opcode == 0x63:
-            addr = self.fetch_byte()
-            data = self.fetch_byte()
-            value = self.read_direct(addr)
-            self.write_direct(addr, value ^ data)
-            self.cycle_count += 2
-            
-        # XRL A, #data
-        elif opcode == 0x64:
-            data = self.fetch_byte()
-            self.acc ^= data
-            self.cycle_count += 1
-            
-        # XRL A, direct
-        elif opcode == 0x65:
-            addr = self.fetch_byte()
-            self.acc ^= self.read_direct(addr)
-            self.cycle_count += 1
-            
-        # XRL A, @R0 or XRL A, @R1
-        elif opcode in [0x66, 0x67]:
-            r = opcode & 0x01
-            addr = self.iram[r]
-            self.acc ^= self.iram[addr]
-            self.cycle_count += 1
-            
-        # XRL A, R0-R7
-        elif 0x68 <= opcode <= 0x6F:
-            r = opcode & 0x07
-            self.acc ^= self.iram[r]
-            self.cycle_count += 1
-            
-        # JNZ rel
-        elif opcode == 0x70:
-            rel = self.fetch_byte()
-            if self.acc != 0:
-                if rel & 0x80:
-                    self.pc = (self.pc - (256 - rel)) & 0xFFFF
-                else:
-                    self.pc = (self.pc + rel) & 0xFFFF
-            self.cycle_count += 2
-            
-        # ORL C, bit
-        elif opcode == 0x72:
-            bit_addr = self.fetch_byte()
-            # Read bit
-            byte_addr = (bit_addr >> 3) | 0x20 if bit_addr < 0x80 else 0x80 + ((bit_addr >> 3) & 0x0F)
-            bit_pos = bit_addr & 0x07
-            byte_val = self.read_direct(byte_addr)
-            bit_val = (byte_val >> bit_pos) & 0x01
-            carry = (self.psw >> 7) & 0x01
-            self.psw = (self.psw & 0x7F) | ((carry | bit_val) << 7)
-            self.cycle_count += 2
-            
-        # JMP @A+DPTR
-        elif opcode == 0x73:
-            self.pc = (self.dptr + self.acc) & 0xFFFF
-            self.cycle_count += 2
-            
-        # MOV A, #data
-        elif opcode == 0x74:
-            self.acc = self.fetch_byte()
-            self.cycle_count += 1
-            
-        # MOV direct, #data
-        elif opcode == 0x75:
-            addr = self.fetch_byte()
-            data = self.fetch_byte()
-            self.write_direct(addr, data)
-            self.cycle_count += 2
-            
-        # MOV @R0, #data or MOV @R1, #data
-        elif opcode in [0x76, 0x77]:
-            r = opcode & 0x01
-            data = self.fetch_byte()
-            addr = self.iram[r]
-            self.iram[addr] = data
-            self.cycle_count += 1
-            
-        # MOV R0-R7, #data
-        elif 0x78 <= opcode <= 0x7F:
-            r = opcode & 0x07
-            self.iram[r] = self.fetch_byte()
-            self.cycle_count += 1
-            
-        # SJMP rel
-        elif opcode == 0x80:
-            rel = self.fetch_byte()
-            if rel & 0x80:
-                self.pc = (self.pc - (256 - rel)) & 0xFFFF
-            else:
-                self.pc = (self.pc + rel) & 0xFFFF
-            self.cycle_count += 2
-            
-        # ANL C, bit
-        elif opcode == 0x82:
-            bit_addr = self.fetch_byte()
-            # Read bit
-            byte_addr = (bit_addr >> 3) | 0x20 if bit_addr < 0x80 else 0x80 + ((bit_addr >> 3) & 0x0F)
-            bit_pos = bit_addr & 0x07
-            byte_val = self.read_direct(byte_addr)
-            bit_val = (byte_val >> bit_pos) & 0x01
-            carry = (self.psw >> 7) & 0x01
-            self.psw = (self.psw & 0x7F) | ((carry & bit_val) << 7)
-            self.cycle_count += 2
-            
-        # MOVC A, @A+PC
-        elif opcode == 0x83:
-            addr = (self.pc + self.acc) & 0xFFFF
-            self.acc = self.rom[addr]
-            self.cycle_count += 2
-            
-        # DIV AB
-        elif opcode == 0x84:
-            if self.b == 0:
-                # Overflow
-                self.psw |= 0x04
-            else:
-                quotient = self.acc // self.b
-                remainder = self.acc % self.b
-                self.acc = quotient
-                self.b = remainder
-                self.psw &= 0xFB  # Clear OV
-            self.psw &= 0x7F  # Clear C
-            self.cycle_count += 4
-            
-        # MOV direct, direct
-        elif opcode == 0x85:
-            src = self.fetch_byte()
-            dst = self.fetch_byte()
-            self.write_direct(dst, self.read_direct(src))
-            self.cycle_count += 2
-            
-        # MOV direct, @R0 or MOV direct, @R1
-        elif opcode in [0x86, 0x87]:
-            r = opcode & 0x01
-            dst = self.fetch_byte()
-            addr = self.iram[r]
-            self.write_direct(dst, self.iram[addr])
-            self.cycle_count += 2
-            
-        # MOV direct, R0-R7
-        elif 0x88 <= opcode <= 0x8F:
-            r = opcode & 0x07
-            dst = self.fetch_byte()
-            self.write_direct(dst, self.iram[r])
-            self.cycle_count += 2
-            
-        # MOV DPTR, #data16
-        elif opcode == 0x90:
-            self.dptr = self.fetch_word()
-            self.cycle_count += 2
-            
-        # MOV bit, C
-        elif opcode == 0x92:
-            bit_addr = self.fetch_byte()
-            carry = (self.psw >> 7) & 0x01
-            # Write bit
-            byte_addr = (bit_addr >> 3) | 0x20 if bit_addr < 0x80 else 0x80 + ((bit_addr >> 3) & 0x0F)
-            bit_pos = bit_addr & 0x07
-            byte_val = self.read_direct(byte_addr)
-            if carry:
-                byte_val |= (1 << bit_pos)
-            else:
-                byte_val &= ~(1 << bit_pos)
-            self.write_direct(byte_addr, byte_val)
-            self.cycle_count += 2
-            
-        # MOVC A, @A+DPTR
-        elif opcode == 0x93:
-            addr = (self.dptr + self.acc) & 0xFFFF
-            self.acc = self.rom[addr]
-            self.cycle_count += 2
-            
-        # SUBB A, #data
-        elif opcode == 0x94:
-            data = self.fetch_byte()
-            old_carry = (self.psw >> 7) & 0x01
-            result = self.acc - data - old_carry
-            # Set carry (bit 7) and auxiliary carry (bit 6) for borrow
-            carry = 1 if result < 0 else 0
-            aux_carry = 1 if (self.acc & 0x0F) < ((data & 0x0F) + old_carry) else 0
-            self.psw = (self.psw & 0x3B) | (carry << 7) | (aux_carry << 6)
-            self.acc = result & 0xFF
-            self.cycle_count += 1
-            
-        # SUBB A, direct
-        elif opcode == 0x95:
-            addr = self.fetch_byte()
-            data = self.read_direct(addr)
-            old_carry = (self.psw >> 7) & 0x01
-            result = self.acc - data - old_carry
-            # Set carry (bit 7) and auxiliary carry (bit 6) for borrow
-            carry = 1 if result < 0 else 0
-            aux_carry = 1 if (self.acc & 0x0F) < ((data & 0x0F) + old_carry) else 0
-            self.psw = (self.psw & 0x3B) | (carry << 7) | (aux_carry << 6)
-            self.acc = result & 0xFF
-            self.cycle_count += 1
-            
-        # SUBB A, @R0 or SUBB A, @R1
-        elif opcode in [0x96, 0x97]:
-            r = opcode & 0x01
-            addr = self.iram[r]
-            data = self.iram[addr]
-            old_carry = (self.psw >> 7) & 0x01
-            result = self.acc - data - old_carry
-            # Set carry (bit 7) and auxiliary carry (bit 6) for borrow
-            carry = 1 if result < 0 else 0
-            aux_carry = 1 if (self.acc & 0x0F) < ((data & 0x0F) + old_carry) else 0
-            self.psw = (self.psw & 0x3B) | (carry << 7) | (aux_carry << 6)
-            self.acc = result & 0xFF
-            self.cycle_count += 1
-            
-        # SUBB A, R0-R7
-        elif 0x98 <= opcode <= 0x9F:
-            r = opcode & 0x07
-            data = self.iram[r]
-            old_carry = (self.psw >> 7) & 0x01
-            result = self.acc - data - old_carry
-            # Set carry (bit 7) and auxiliary carry (bit 6) for borrow
-            carry = 1 if result < 0 else 0
-            aux_carry = 1 if (self.acc & 0x0F) < ((data & 0x0F) + old_carry) else 0
-            self.psw = (self.psw & 0x3B) | (carry << 7) | (aux_carry << 6)
-            self.acc = result & 0xFF
-            self.cycle_count += 1
-            
-        # ORL C, /bit
-        elif opcode == 0xA0:
-            bit_addr = self.fetch_byte()
-            # Read bit
-            byte_addr = (bit_addr >> 3) | 0x20 if bit_addr < 0x80 else 0x80 + ((bit_addr >> 3) & 0x0F)
-            bit_pos = bit_addr & 0x07
-            byte_val = self.read_direct(byte_addr)
-            bit_val = ((byte_val >> bit_pos) & 0x01) ^ 1  # Complement
-            carry = (self.psw >> 7) & 0x01
-            self.psw = (self.psw & 0x7F) | ((carry | bit_val) << 7)
-            self.cycle_count += 2
-            
-        # MOV C, bit
-        elif opcode == 0xA2:
-            bit_addr = self.fetch_byte()
-            # Read bit
-            byte_addr = (bit_addr >> 3) | 0x20 if bit_addr < 0x80 else 0x80 + ((bit_addr >> 3) & 0x0F)
-            bit_pos = bit_addr & 0x07
-            byte_val = self.read_direct(byte_addr)
-            bit_val = (byte_val >> bit_pos) & 0x01
-            self.psw = (self.psw & 0x7F) | (bit_val << 7)
-            self.cycle_count += 1
-            
-        # INC DPTR
-        elif opcode == 0xA3:
-            self.dptr = (self.dptr + 1) & 0xFFFF
-            self.cycle_count += 2
-            
-        # MUL AB
-        elif opcode == 0xA4:
-            result = self.acc * self.b
-            self.acc = result & 0xFF
-            self.b = (result >> 8) & 0xFF
-            if result > 255:
-                self.psw |= 0x04  # Set OV
-            else:
-                self.psw &= 0xFB  # Clear OV
-            self.psw &= 0x7F  # Clear C
-            self.cycle_count += 4
-            
-        # MOV @R0, direct or MOV @R1, direct
-        elif opcode in [0xA6, 0xA7]:
-            r = opcode & 0x01
-            src = self.fetch_byte()
-            addr = self.iram[r]
-            self.iram[addr] = self.read_direct(src)
-            self.cycle_count += 2
-            
-        # MOV R0-R7, direct
-        elif 0xA8 <= opcode <= 0xAF:
-            r = opcode & 0x07
-            src = self.fetch_byte()
-            self.iram[r] = self.read_direct(src)
-            self.cycle_count += 2
-            
-        # ANL C, /bit
-        elif opcode == 0xB0:
-            bit_addr = self.fetch_byte()
-            # Read bit
-            byte_addr = (bit_addr >> 3) | 0x20 if bit_addr < 0x80 else 0x80 + ((bit_addr >> 3) & 0x0F)
-            bit_pos = bit_addr & 0x07
-            byte_val = self.read_direct(byte_addr)
-            bit_val = ((byte_val >> bit_pos) & 0x01) ^ 1  # Complement
-            carry = (self.psw >> 7) & 0x01
-            self.psw = (self.psw & 0x7F) | ((carry & bit_val) << 7)
-            self.cycle_count += 2
-            
-        # CPL bit
-        elif opcode == 0xB2:
-            bit_addr = self.fetch_byte()
-            # Toggle bit
-            byte_addr = (bit_addr >> 3) | 0x20 if bit_addr < 0x80 else 0x80 + ((bit_addr >> 3) & 0x0F)
-            bit_pos = bit_addr & 0x07
-            byte_val = self.read_direct(byte_addr)
-            byte_val ^= (1 << bit_pos)
-            self.write_direct(byte_addr, byte_val)
-            self.cycle_count += 1
-            
-        # CPL C
-        elif opcode == 0xB3:
-            self.psw ^= 0x80
-            self.cycle_count += 1
-            
-        # CJNE A, #data, rel
-        elif opcode == 0xB4:
-            data = self.fetch_byte()
-            rel = self.fetch_byte()
-            if self.acc != data:
-                if rel & 0x80:
-                    self.pc = (self.pc - (256 - rel)) & 0xFFFF
-                else:
-                    self.pc = (self.pc + rel) & 0xFFFF
-            if self.acc < data:
-                self.psw |= 0x80
-            else:
-                self.psw &= 0x7F
-            self.cycle_count += 2
-            
-        # CJNE A, direct, rel
-        elif opcode == 0xB5:
-            addr = self.fetch_byte()
-            data = self.read_direct(addr)
-            rel = self.fetch_byte()
-            if self.acc != data:
-                if rel & 0x80:
-                    self.pc = (self.pc - (256 - rel)) & 0xFFFF
-                else:
-                    self.pc = (self.pc + rel) & 0xFFFF
-            if self.acc < data:
-                self.psw |= 0x80
-            else:
-                self.psw &= 0x7F
-            self.cycle_count += 2
-            
-        # CJNE @R0, #data, rel or CJNE @R1, #data, rel
-        elif opcode in [0xB6, 0xB7]:
-            r = opcode & 0x01
-            data = self.fetch_byte()
-            rel = self.fetch_byte()
-            addr = self.iram[r]
-            value = self.iram[addr]
-            if value != data:
-                if rel & 0x80:
-                    self.pc = (self.pc - (256 - rel)) & 0xFFFF
-                else:
-                    self.pc = (self.pc + rel) & 0xFFFF
-            if value < data:
-                self.psw |= 0x80
-            else:
-                self.psw &= 0x7F
-            self.cycle_count += 2
-            
-        # CJNE R0-R7, #data, rel
-        elif 0xB8 <= opcode <= 0xBF:
-            r = opcode & 0x07
-            data = self.fetch_byte()
-            rel = self.fetch_byte()
-            value = self.iram[r]
-            if value != data:
-                if rel & 0x80:
-                    self.pc = (self.pc - (256 - rel)) & 0xFFFF
-                else:
-                    self.pc = (self.pc + rel) & 0xFFFF
-            if value < data:
-                self.psw |= 0x80
-            else:
-                self.psw &= 0x7F
-            self.cycle_count += 2
-            
-        # PUSH direct
-        elif opcode == 0xC0:
-            addr = self.fetch_byte()
-            self.push(self.read_direct(addr))
-            self.cycle_count += 2
-            
-        # CLR bit
-        elif opcode == 0xC2:
-            bit_addr = self.fetch_byte()
-            # Clear bit
-            byte_addr = (bit_addr >> 3) | 0x20 if bit_addr < 0x80 else 0x80 + ((bit_addr >> 3) & 0x0F)
-            bit_pos = bit_addr & 0x07
-            byte_val = self.read_direct(byte_addr)
-            self.write_direct(byte_addr, byte_val & ~(1 << bit_pos))
-            self.cycle_count += 1
-            
-        # CLR C
-        elif opcode == 0xC3:
-            self.psw &= 0x7F
-            self.cycle_count += 1
-            
-        # SWAP A
-        elif opcode == 0xC4:
-            self.acc = ((self.acc & 0x0F) << 4) | ((self.acc & 0xF0) >> 4)
-            self.cycle_count += 1
-            
-        # XCH A, direct
-        elif opcode == 0xC5:
-            addr = self.fetch_byte()
-            temp = self.acc
-            self.acc = self.read_direct(addr)
-            self.write_direct(addr, temp)
-            self.cycle_count += 1
-            
-        # XCH A, @R0 or XCH A, @R1
-        elif opcode in [0xC6, 0xC7]:
-            r = opcode & 0x01
-            addr = self.iram[r]
-            temp = self.acc
-            self.acc = self.iram[addr]
-            self.iram[addr] = temp
-            self.cycle_count += 1
-            
-        # XCH A, R0-R7
-        elif 0xC8 <= opcode <= 0xCF:
-            r = opcode & 0x07
-            temp = self.acc
-            self.acc = self.iram[r]
-            self.iram[r] = temp
-            self.cycle_count += 1
-            
-        # POP direct
-        elif opcode == 0xD0:
-            addr = self.fetch_byte()
-            self.write_direct(addr, self.pop())
-            self.cycle_count += 2
-            
-        # SETB bit
-        elif opcode == 0xD2:
-            bit_addr = self.fetch_byte()
-            # Set bit
-            byte_addr = (bit_addr >> 3) | 0x20 if bit_addr < 0x80 else 0x80 + ((bit_addr >> 3) & 0x0F)
-            bit_pos = bit_addr & 0x07
-            byte_val = self.read_direct(byte_addr)
-            self.write_direct(byte_addr, byte_val | (1 << bit_pos))
-            self.cycle_count += 1
-            
-        # SETB C
-        elif opcode == 0xD3:
-            self.psw |= 0x80
-            self.cycle_count += 1
-            
-        # DA A
-        elif opcode == 0xD4:
-            lower = self.acc & 0x0F
-            upper = (self.acc >> 4) & 0x0F
-            carry = (self.psw >> 7) & 0x01
-            
-            if lower > 9 or (self.psw & 0x40):
-                self.acc = (self.acc + 6) & 0xFF
-                
-            if upper > 9 or carry:
-                self.acc = (self.acc + 0x60) & 0xFF
-                self.psw |= 0x80
-            self.cycle_count += 1
-            
-        # DJNZ direct, rel
-        elif opcode == 0xD5:
-            addr = self.fetch_byte()
-            rel = self.fetch_byte()
-            value = (self.read_direct(addr) - 1) & 0xFF
-            self.write_direct(addr, value)
-            if value != 0:
-                if rel & 0x80:
-                    self.pc = (self.pc - (256 - rel)) & 0xFFFF
-                else:
-                    self.pc = (self.pc + rel) & 0xFFFF
-            self.cycle_count += 2
-            
-        # XCHD A, @R0 or XCHD A, @R1
-        elif opcode in [0xD6, 0xD7]:
-            r = opcode & 0x01
-            addr = self.iram[r]
-            temp = self.acc & 0x0F
-            self.acc = (self.acc & 0xF0) | (self.iram[addr] & 0x0F)
-            self.iram[addr] = (self.iram[addr] & 0xF0) | temp
-            self.cycle_count += 1
-            
-        # DJNZ R0-R7, rel
-        elif 0xD8 <= opcode <= 0xDF:
-            r = opcode & 0x07
-            rel = self.fetch_byte()
-            self.iram[r] = (self.iram[r] - 1) & 0xFF
-            if self.iram[r] != 0:
-                if rel & 0x80:
-                    self.pc = (self.pc - (256 - rel)) & 0xFFFF
-                else:
-                    self.pc = (self.pc + rel) & 0xFFFF
-            self.cycle_count += 2
-            
-        # MOVX A, @DPTR
-        elif opcode == 0xE0:
-            self.acc = self.xram[self.dptr]
-            self.cycle_count += 2
-            
-        # MOVX A, @R0 or MOVX A, @R1
-        elif opcode in [0xE2, 0xE3]:
-            r = opcode & 0x01
-            addr = self.iram[r]
-            self.acc = self.xram[addr]
-            self.cycle_count += 2
-            
-        # CLR A
-        elif opcode == 0xE4:
-            self.acc = 0
-            self.cycle_count += 1
-            
-        # MOV A, direct
-        elif opcode == 0xE5:
-            addr = self.fetch_byte()
-            self.acc = self.read_direct(addr)
-            self.cycle_count += 1
-            
-        # MOV A, @R0 or MOV A, @R1
-        elif opcode in [0xE6, 0xE7]:
-            r = opcode & 0x01
-            addr = self.iram[r]
-            self.acc = self.iram[addr]
-            self.cycle_count += 1
-            
-        # MOV A, R0-R7
-        elif 0xE8 <= opcode <= 0xEF:
-            r = opcode & 0x07
-            self.acc = self.iram[r]
-            self.cycle_count += 1
-            
-        # MOVX @DPTR, A
-        elif opcode == 0xF0:
-            self.xram[self.dptr] = self.acc
-            self.cycle_count += 2
-            
-        # MOVX @R0, A or MOVX @R1, A
-        elif opcode in [0xF2, 0xF3]:
-            r = opcode & 0x01
-            addr = self.iram[r]
-            self.xram[addr] = self.acc
-            self.cycle_count += 2
-            
-        # CPL A
-        elif opcode == 0xF4:
-            self.acc = self.acc ^ 0xFF
-            self.cycle_count += 1
-            
-        # MOV direct, A
-        elif opcode == 0xF5:
-            addr = self.fetch_byte()
-            self.write_direct(addr, self.acc)
-            self.cycle_count += 1
-            
-        # MOV @R0, A or MOV @R1, A
-        elif opcode in [0xF6, 0xF7]:
-            r = opcode & 0x01
-            addr = self.iram[r]
-            self.iram[addr] = self.acc
-            self.cycle_count += 1
-            
-        # MOV R0-R7, A
-        elif 0xF8 <= opcode <= 0xFF:
-            r = opcode & 0x07
-            self.iram[r] = self.acc
-            self.cycle_count += 1
-            
+        # Re-enable interrupts
+
+    def _op_rlc_a(self, opcode, byte1, byte2):
+        """RLC A"""
+        iram = self.iram
+        carry = iram[PSW] >> 7
+        new_carry = iram[ACC] >> 7
+        iram[ACC] = ((iram[ACC] << 1) | carry) & 0xFF
+        iram[PSW] = (iram[PSW] & 0x7F) | (new_carry << 7)
+
+    def _addc(self, data):
+        """ADDC A, data"""
+        iram = self.iram
+        acc = iram[ACC]
+        psw = iram[PSW]
+        old_carry = psw >> 7
+        # Set carry (bit 7) and auxiliary carry (bit 6)
+        iram[PSW] = (psw & 0x3B) | ADD_FLAGS[(acc << 9) | (data << 1) | old_carry]
+        iram[ACC] = (acc + data + old_carry) & 0xFF
+
+    def _op_addc_imm(self, opcode, byte1, byte2):
+        """ADDC A, #data"""
+        self._addc(byte1)
+
+    def _op_addc_direct(self, opcode, byte1, byte2):
+        """ADDC A, direct"""
+        self._addc(self.iram[byte1])
+
+    def _op_addc_at_r0(self, opcode, byte1, byte2):
+        """ADDC A, @R0"""
+        self._addc(self.iram[self.iram[self._rbank]])
+
+    def _op_addc_at_r1(self, opcode, byte1, byte2):
+        """ADDC A, @R1"""
+        self._addc(self.iram[self.iram[self._rbank | 1]])
+
+    def _op_addc_rn(self, opcode, byte1, byte2):
+        """ADDC A, R0-R7"""
+        self._addc(self.iram[self._rbank | (opcode & 0x07)])
+
+    def _op_jc(self, opcode, byte1, byte2):
+        """JC rel"""
+        rel = byte1
+        if self.iram[PSW] & 0x80:
+            self.pc = (self.pc + SEXT[rel]) & 0xFFFF
+
+    def _op_orl_direct_a(self, opcode, byte1, byte2):
+        """ORL direct, A"""
+        addr = byte1
+        value = self.iram[addr]
+        self.write_direct(addr, value | self.iram[ACC])
+
+    def _op_orl_direct_imm(self, opcode, byte1, byte2):
+        """ORL direct, #data"""
+        addr = byte1
+        data = byte2
+        value = self.iram[addr]
+        self.write_direct(addr, value | data)
+
+    def _op_orl_imm(self, opcode, byte1, byte2):
+        """ORL A, #data"""
+        self.iram[ACC] |= byte1
+
+    def _op_orl_direct(self, opcode, byte1, byte2):
+        """ORL A, direct"""
+        self.iram[ACC] |= self.iram[byte1]
+
+    def _op_orl_at_r0(self, opcode, byte1, byte2):
+        """ORL A, @R0"""
+        iram = self.iram
+        iram[ACC] |= iram[iram[self._rbank]]
+
+    def _op_orl_at_r1(self, opcode, byte1, byte2):
+        """ORL A, @R1"""
+        iram = self.iram
+        iram[ACC] |= iram[iram[self._rbank | 1]]
+
+    def _op_orl_rn(self, opcode, byte1, byte2):
+        """ORL A, R0-R7"""
+        self.iram[ACC] |= self.iram[self._rbank | (opcode & 0x07)]
+
+    def _op_jnc(self, opcode, byte1, byte2):
+        """JNC rel"""
+        rel = byte1
+        if not (self.iram[PSW] & 0x80):
+            self.pc = (self.pc + SEXT[rel]) & 0xFFFF
+
+    def _op_anl_direct_a(self, opcode, byte1, byte2):
+        """ANL direct, A"""
+        addr = byte1
+        value = self.iram[addr]
+        self.write_direct(addr, value & self.iram[ACC])
+
+    def _op_anl_direct_imm(self, opcode, byte1, byte2):
+        """ANL direct, #data"""
+        addr = byte1
+        data = byte2
+        value = self.iram[addr]
+        self.write_direct(addr, value & data)
+
+    def _op_anl_imm(self, opcode, byte1, byte2):
+        """ANL A, #data"""
+        self.iram[ACC] &= byte1
+
+    def _op_anl_direct(self, opcode, byte1, byte2):
+        """ANL A, direct"""
+        self.iram[ACC] &= self.iram[byte1]
+
+    def _op_anl_at_r0(self, opcode, byte1, byte2):
+        """ANL A, @R0"""
+        iram = self.iram
+        iram[ACC] &= iram[iram[self._rbank]]
+
+    def _op_anl_at_r1(self, opcode, byte1, byte2):
+        """ANL A, @R1"""
+        iram = self.iram
+        iram[ACC] &= iram[iram[self._rbank | 1]]
+
+    def _op_anl_rn(self, opcode, byte1, byte2):
+        """ANL A, R0-R7"""
+        self.iram[ACC] &= self.iram[self._rbank | (opcode & 0x07)]
+
+    def _op_jz(self, opcode, byte1, byte2):
+        """JZ rel"""
+        rel = byte1
+        if self.iram[ACC] == 0:
+            self.pc = (self.pc + SEXT[rel]) & 0xFFFF
+
+    def _op_xrl_direct_a(self, opcode, byte1, byte2):
+        """XRL direct, A"""
+        addr = byte1
+        value = self.iram[addr]
+        self.write_direct(addr, value ^ self.iram[ACC])
+
+    def _op_xrl_direct_imm(self, opcode, byte1, byte2):
+        """XRL direct, #data"""
+        addr = byte1
+        data = byte2
+        value = self.iram[addr]
+        self.write_direct(addr, value ^ data)
+
+    def _op_xrl_imm(self, opcode, byte1, byte2):
+        """XRL A, #data"""
+        self.iram[ACC] ^= byte1
+
+    def _op_xrl_direct(self, opcode, byte1, byte2):
+        """XRL A, direct"""
+        self.iram[ACC] ^= self.iram[byte1]
+
+    def _op_xrl_at_r0(self, opcode, byte1, byte2):
+        """XRL A, @R0"""
+        iram = self.iram
+        iram[ACC] ^= iram[iram[self._rbank]]
+
+    def _op_xrl_at_r1(self, opcode, byte1, byte2):
+        """XRL A, @R1"""
+        iram = self.iram
+        iram[ACC] ^= iram[iram[self._rbank | 1]]
+
+    def _op_xrl_rn(self, opcode, byte1, byte2):
+        """XRL A, R0-R7"""
+        self.iram[ACC] ^= self.iram[self._rbank | (opcode & 0x07)]
+
+    def _op_jnz(self, opcode, byte1, byte2):
+        """JNZ rel"""
+        rel = byte1
+        if self.iram[ACC] != 0:
+            self.pc = (self.pc + SEXT[rel]) & 0xFFFF
+
+    def _op_orl_c_bit(self, opcode, byte1, byte2):
+        """ORL C, bit"""
+        bit_addr = byte1
+        # Read bit
+        byte_addr = BIT_BYTE[bit_addr]
+        byte_val = self.iram[byte_addr]
+        if byte_val & BIT_MASK[bit_addr]:
+            self.iram[PSW] |= 0x80
+
+    def _op_jmp_a_dptr(self, opcode, byte1, byte2):
+        """JMP @A+DPTR"""
+        self.pc = (self.dptr + self.iram[ACC]) & 0xFFFF
+
+    def _op_mov_a_imm(self, opcode, byte1, byte2):
+        """MOV A, #data"""
+        self.iram[ACC] = byte1
+
+    def _op_mov_direct_imm(self, opcode, byte1, byte2):
+        """MOV direct, #data"""
+        addr = byte1
+        data = byte2
+        self.write_direct(addr, data)
+
+    def _op_mov_at_r0_imm(self, opcode, byte1, byte2):
+        """MOV @R0, #data"""
+        r = self._rbank
+        data = byte1
+        addr = self.iram[r]
+        self.iram[addr] = data
+
+    def _op_mov_at_r1_imm(self, opcode, byte1, byte2):
+        """MOV @R1, #data"""
+        r = self._rbank | 1
+        data = byte1
+        addr = self.iram[r]
+        self.iram[addr] = data
+
+    def _op_mov_rn_imm(self, opcode, byte1, byte2):
+        """MOV R0-R7, #data"""
+        r = self._rbank | (opcode & 0x07)
+        self.iram[r] = byte1
+
+    def _op_sjmp(self, opcode, byte1, byte2):
+        """SJMP rel"""
+        rel = byte1
+        self.pc = (self.pc + SEXT[rel]) & 0xFFFF
+
+    def _op_anl_c_bit(self, opcode, byte1, byte2):
+        """ANL C, bit"""
+        bit_addr = byte1
+        # Read bit
+        byte_addr = BIT_BYTE[bit_addr]
+        byte_val = self.iram[byte_addr]
+        if not (byte_val & BIT_MASK[bit_addr]):
+            self.iram[PSW] &= 0x7F
+
+    def _op_movc_a_pc(self, opcode, byte1, byte2):
+        """MOVC A, @A+PC"""
+        addr = (self.pc + self.iram[ACC]) & 0xFFFF
+        self.iram[ACC] = self.rom[addr]
+
+    def _op_div_ab(self, opcode, byte1, byte2):
+        """DIV AB"""
+        iram = self.iram
+        divisor = iram[B]
+        if divisor == 0:
+            # Overflow; clear C, set OV
+            iram[PSW] = (iram[PSW] & 0x7F) | 0x04
         else:
-            print(f"Unimplemented opcode: 0x{opcode:02X} at PC=0x{self.pc-1:04X}")
-            self.running = False
-            
+            iram[ACC], iram[B] = divmod(iram[ACC], divisor)
+            iram[PSW] &= 0x7B  # Clear C and OV
+
+    def _op_mov_direct_direct(self, opcode, byte1, byte2):
+        """MOV direct, direct"""
+        src = byte1
+        dst = byte2
+        self.write_direct(dst, self.iram[src])
+
+    def _op_mov_direct_at_r0(self, opcode, byte1, byte2):
+        """MOV direct, @R0"""
+        r = self._rbank
+        dst = byte1
+        addr = self.iram[r]
+        self.write_direct(dst, self.iram[addr])
+
+    def _op_mov_direct_at_r1(self, opcode, byte1, byte2):
+        """MOV direct, @R1"""
+        r = self._rbank | 1
+        dst = byte1
+        addr = self.iram[r]
+        self.write_direct(dst, self.iram[addr])
+
+    def _op_mov_direct_rn(self, opcode, byte1, byte2):
+        """MOV direct, R0-R7"""
+        r = self._rbank | (opcode & 0x07)
+        dst = byte1
+        self.write_direct(dst, self.iram[r])
+
+    def _op_mov_dptr_imm(self, opcode, byte1, byte2):
+        """MOV DPTR, #data16"""
+        self.dptr = (byte1 << 8) | byte2
+
+    def _op_mov_bit_c(self, opcode, byte1, byte2):
+        """MOV bit, C"""
+        bit_addr = byte1
+        # Write bit
+        byte_addr = BIT_BYTE[bit_addr]
+        byte_val = self.iram[byte_addr]
+        if self.iram[PSW] & 0x80:
+            byte_val |= BIT_MASK[bit_addr]
+        else:
+            byte_val &= BIT_NMASK[bit_addr]
+        self.write_direct(byte_addr, byte_val)
+
+    def _op_movc_a_dptr(self, opcode, byte1, byte2):
+        """MOVC A, @A+DPTR"""
+        addr = (self.dptr + self.iram[ACC]) & 0xFFFF
+        self.iram[ACC] = self.rom[addr]
+
+    def _subb(self, data):
+        """SUBB A, data"""
+        iram = self.iram
+        acc = iram[ACC]
+        psw = iram[PSW]
+        old_carry = psw >> 7
+        # Set carry (bit 7) and auxiliary carry (bit 6) for borrow
+        iram[PSW] = (psw & 0x3B) | SUBB_FLAGS[(acc << 9) | (data << 1) | old_carry]
+        iram[ACC] = (acc - data - old_carry) & 0xFF
+
+    def _op_subb_imm(self, opcode, byte1, byte2):
+        """SUBB A, #data"""
+        self._subb(byte1)
+
+    def _op_subb_direct(self, opcode, byte1, byte2):
+        """SUBB A, direct"""
+        self._subb(self.iram[byte1])
+
+    def _op_subb_at_r0(self, opcode, byte1, byte2):
+        """SUBB A, @R0"""
+        self._subb(self.iram[self.iram[self._rbank]])
+
+    def _op_subb_at_r1(self, opcode, byte1, byte2):
+        """SUBB A, @R1"""
+        self._subb(self.iram[self.iram[self._rbank | 1]])
+
+    def _op_subb_rn(self, opcode, byte1, byte2):
+        """SUBB A, R0-R7"""
+        self._subb(self.iram[self._rbank | (opcode & 0x07)])
+
+    def _op_orl_c_nbit(self, opcode, byte1, byte2):
+        """ORL C, /bit"""
+        bit_addr = byte1
+        # Read bit
+        byte_addr = BIT_BYTE[bit_addr]
+        byte_val = self.iram[byte_addr]
+        if not (byte_val & BIT_MASK[bit_addr]):
+            self.iram[PSW] |= 0x80
+
+    def _op_mov_c_bit(self, opcode, byte1, byte2):
+        """MOV C, bit"""
+        iram = self.iram
+        bit_addr = byte1
+        # Read bit
+        byte_addr = BIT_BYTE[bit_addr]
+        byte_val = iram[byte_addr]
+        bit_val = 1 if byte_val & BIT_MASK[bit_addr] else 0
+        iram[PSW] = (iram[PSW] & 0x7F) | (bit_val << 7)
+
+    def _op_inc_dptr(self, opcode, byte1, byte2):
+        """INC DPTR"""
+        self.dptr = (self.dptr + 1) & 0xFFFF
+
+    def _op_mul_ab(self, opcode, byte1, byte2):
+        """MUL AB"""
+        iram = self.iram
+        result = iram[ACC] * iram[B]
+        iram[ACC] = result & 0xFF
+        iram[B] = result >> 8
+        # Clear C; OV set when the product needs B
+        iram[PSW] = (iram[PSW] & 0x7B) | (0x04 if result & 0xFF00 else 0)
+
+    def _op_mov_at_r0_direct(self, opcode, byte1, byte2):
+        """MOV @R0, direct"""
+        iram = self.iram
+        r = self._rbank
+        src = byte1
+        addr = iram[r]
+        iram[addr] = iram[src]
+
+    def _op_mov_at_r1_direct(self, opcode, byte1, byte2):
+        """MOV @R1, direct"""
+        iram = self.iram
+        r = self._rbank | 1
+        src = byte1
+        addr = iram[r]
+        iram[addr] = iram[src]
+
+    def _op_mov_rn_direct(self, opcode, byte1, byte2):
+        """MOV R0-R7, direct"""
+        r = self._rbank | (opcode & 0x07)
+        src = byte1
+        self.iram[r] = self.iram[src]
+
+    def _op_anl_c_nbit(self, opcode, byte1, byte2):
+        """ANL C, /bit"""
+        bit_addr = byte1
+        # Read bit
+        byte_addr = BIT_BYTE[bit_addr]
+        byte_val = self.iram[byte_addr]
+        if byte_val & BIT_MASK[bit_addr]:
+            self.iram[PSW] &= 0x7F
+
+    def _op_cpl_bit(self, opcode, byte1, byte2):
+        """CPL bit"""
+        bit_addr = byte1
+        # Toggle bit
+        byte_addr = BIT_BYTE[bit_addr]
+        byte_val = self.iram[byte_addr]
+        byte_val ^= BIT_MASK[bit_addr]
+        self.write_direct(byte_addr, byte_val)
+
+    def _op_cpl_c(self, opcode, byte1, byte2):
+        """CPL C"""
+        self.iram[PSW] ^= 0x80
+
+    def _cjne(self, value, data, rel):
+        """CJNE value, data, rel"""
+        if value != data:
+            self.pc = (self.pc + SEXT[rel]) & 0xFFFF
+        if value < data:
+            self.iram[PSW] |= 0x80
+        else:
+            self.iram[PSW] &= 0x7F
+
+    def _op_cjne_a_imm(self, opcode, byte1, byte2):
+        """CJNE A, #data, rel"""
+        data = byte1
+        rel = byte2
+        self._cjne(self.iram[ACC], data, rel)
+
+    def _op_cjne_a_direct(self, opcode, byte1, byte2):
+        """CJNE A, direct, rel"""
+        addr = byte1
+        data = self.iram[addr]
+        rel = byte2
+        self._cjne(self.iram[ACC], data, rel)
+
+    def _op_cjne_at_r0(self, opcode, byte1, byte2):
+        """CJNE @R0, #data, rel"""
+        r = self._rbank
+        data = byte1
+        rel = byte2
+        self._cjne(self.iram[self.iram[r]], data, rel)
+
+    def _op_cjne_at_r1(self, opcode, byte1, byte2):
+        """CJNE @R1, #data, rel"""
+        r = self._rbank | 1
+        data = byte1
+        rel = byte2
+        self._cjne(self.iram[self.iram[r]], data, rel)
+
+    def _make_cjne_rn(self, n):
+        """CJNE Rn, #data, rel handler for register n"""
+        iram = self.iram
+        cjne = self._cjne
+
+        def op_cjne_rn(opcode, byte1, byte2):
+            cjne(iram[self._rbank | n], byte1, byte2)
+        return op_cjne_rn
+
+    def _op_push(self, opcode, byte1, byte2):
+        """PUSH direct"""
+        addr = byte1
+        self.push(self.iram[addr])
+
+    def _op_clr_bit(self, opcode, byte1, byte2):
+        """CLR bit"""
+        bit_addr = byte1
+        # Clear bit
+        byte_addr = BIT_BYTE[bit_addr]
+        byte_val = self.iram[byte_addr]
+        self.write_direct(byte_addr, byte_val & BIT_NMASK[bit_addr])
+
+    def _op_clr_c(self, opcode, byte1, byte2):
+        """CLR C"""
+        self.iram[PSW] &= 0x7F
+
+    def _op_swap_a(self, opcode, byte1, byte2):
+        """SWAP A"""
+        iram = self.iram
+        iram[ACC] = ((iram[ACC] & 0x0F) << 4) | ((iram[ACC] & 0xF0) >> 4)
+
+    def _op_xch_direct(self, opcode, byte1, byte2):
+        """XCH A, direct"""
+        iram = self.iram
+        addr = byte1
+        temp = iram[ACC]
+        iram[ACC] = iram[addr]
+        self.write_direct(addr, temp)
+
+    def _op_xch_at_r0(self, opcode, byte1, byte2):
+        """XCH A, @R0"""
+        iram = self.iram
+        r = self._rbank
+        addr = iram[r]
+        temp = iram[ACC]
+        iram[ACC] = iram[addr]
+        iram[addr] = temp
+
+    def _op_xch_at_r1(self, opcode, byte1, byte2):
+        """XCH A, @R1"""
+        iram = self.iram
+        r = self._rbank | 1
+        addr = iram[r]
+        temp = iram[ACC]
+        iram[ACC] = iram[addr]
+        iram[addr] = temp
+
+    def _make_xch_rn(self, n):
+        """XCH A, Rn handler for register n"""
+        iram = self.iram
+
+        def op_xch_rn(opcode, byte1, byte2):
+            r = self._rbank | n
+            iram[ACC], iram[r] = iram[r], iram[ACC]
+        return op_xch_rn
+
+    def _op_pop(self, opcode, byte1, byte2):
+        """POP direct"""
+        addr = byte1
+        self.write_direct(addr, self.pop())
+
+    def _op_setb_bit(self, opcode, byte1, byte2):
+        """SETB bit"""
+        bit_addr = byte1
+        # Set bit
+        byte_addr = BIT_BYTE[bit_addr]
+        byte_val = self.iram[byte_addr]
+        self.write_direct(byte_addr, byte_val | BIT_MASK[bit_addr])
+
+    def _op_setb_c(self, opcode, byte1, byte2):
+        """SETB C"""
+        self.iram[PSW] |= 0x80
+
+    def _op_da_a(self, opcode, byte1, byte2):
+        """DA A"""
+        iram = self.iram
+        index = (iram[ACC] << 2) | (iram[PSW] >> 6)
+        iram[ACC] = DA_ACC[index]
+        iram[PSW] |= DA_CARRY[index]
+
+    def _op_djnz_direct(self, opcode, byte1, byte2):
+        """DJNZ direct, rel"""
+        addr = byte1
+        rel = byte2
+        value = (self.iram[addr] - 1) & 0xFF
+        self.write_direct(addr, value)
+        if value != 0:
+            self.pc = (self.pc + SEXT[rel]) & 0xFFFF
+
+    def _op_xchd_at_r0(self, opcode, byte1, byte2):
+        """XCHD A, @R0"""
+        iram = self.iram
+        r = self._rbank
+        addr = iram[r]
+        acc = iram[ACC]
+        value = iram[addr]
+        iram[ACC] = (acc & 0xF0) | (value & 0x0F)
+        iram[addr] = (value & 0xF0) | (acc & 0x0F)
+
+    def _op_xchd_at_r1(self, opcode, byte1, byte2):
+        """XCHD A, @R1"""
+        iram = self.iram
+        r = self._rbank | 1
+        addr = iram[r]
+        acc = iram[ACC]
+        value = iram[addr]
+        iram[ACC] = (acc & 0xF0) | (value & 0x0F)
+        iram[addr] = (value & 0xF0) | (acc & 0x0F)
+
+    def _make_djnz_rn(self, n):
+        """DJNZ Rn, rel handler for register n"""
+        iram = self.iram
+
+        def op_djnz_rn(opcode, byte1, byte2):
+            r = self._rbank | n
+            value = (iram[r] - 1) & 0xFF
+            iram[r] = value
+            if value:
+                self.pc = (self.pc + SEXT[byte1]) & 0xFFFF
+        return op_djnz_rn
+
+    def _op_movx_a_dptr(self, opcode, byte1, byte2):
+        """MOVX A, @DPTR"""
+        self.iram[ACC] = self.xram[self.dptr]
+
+    def _op_movx_a_at_r0(self, opcode, byte1, byte2):
+        """MOVX A, @R0"""
+        addr = self.iram[self._rbank]
+        self.iram[ACC] = self.xram[addr]
+
+    def _op_movx_a_at_r1(self, opcode, byte1, byte2):
+        """MOVX A, @R1"""
+        addr = self.iram[self._rbank | 1]
+        self.iram[ACC] = self.xram[addr]
+
+    def _op_clr_a(self, opcode, byte1, byte2):
+        """CLR A"""
+        self.iram[ACC] = 0
+
+    def _op_mov_a_direct(self, opcode, byte1, byte2):
+        """MOV A, direct"""
+        addr = byte1
+        self.iram[ACC] = self.iram[addr]
+
+    def _op_mov_a_at_r0(self, opcode, byte1, byte2):
+        """MOV A, @R0"""
+        iram = self.iram
+        addr = iram[self._rbank]
+        iram[ACC] = iram[addr]
+
+    def _op_mov_a_at_r1(self, opcode, byte1, byte2):
+        """MOV A, @R1"""
+        iram = self.iram
+        addr = iram[self._rbank | 1]
+        iram[ACC] = iram[addr]
+
+    def _make_mov_a_rn(self, n):
+        """MOV A, Rn handler for register n"""
+        iram = self.iram
+
+        def op_mov_a_rn(opcode, byte1, byte2):
+            iram[ACC] = iram[self._rbank | n]
+        return op_mov_a_rn
+
+    def _op_movx_dptr_a(self, opcode, byte1, byte2):
+        """MOVX @DPTR, A"""
+        self.xram[self.dptr] = self.iram[ACC]
+
+    def _op_movx_at_r0_a(self, opcode, byte1, byte2):
+        """MOVX @R0, A"""
+        addr = self.iram[self._rbank]
+        self.xram[addr] = self.iram[ACC]
+
+    def _op_movx_at_r1_a(self, opcode, byte1, byte2):
+        """MOVX @R1, A"""
+        addr = self.iram[self._rbank | 1]
+        self.xram[addr] = self.iram[ACC]
+
+    def _op_cpl_a(self, opcode, byte1, byte2):
+        """CPL A"""
+        self.iram[ACC] = self.iram[ACC] ^ 0xFF
+
+    def _op_mov_direct_a(self, opcode, byte1, byte2):
+        """MOV direct, A"""
+        addr = byte1
+        self.write_direct(addr, self.iram[ACC])
+
+    def _op_mov_at_r0_a(self, opcode, byte1, byte2):
+        """MOV @R0, A"""
+        iram = self.iram
+        addr = iram[self._rbank]
+        iram[addr] = iram[ACC]
+
+    def _op_mov_at_r1_a(self, opcode, byte1, byte2):
+        """MOV @R1, A"""
+        iram = self.iram
+        addr = iram[self._rbank | 1]
+        iram[addr] = iram[ACC]
+
+    def _make_mov_rn_a(self, n):
+        """MOV Rn, A handler for register n"""
+        iram = self.iram
+
+        def op_mov_rn_a(opcode, byte1, byte2):
+            iram[self._rbank | n] = iram[ACC]
+        return op_mov_rn_a
+
     def step(self):
         """Execute one instruction and handle interrupts"""
-        # Check for interrupts
-        if self.interrupt_enabled:
-            # Priority: EXT0 > TIMER0 > EXT1 > TIMER1 > SERIAL
-            # For this firmware, we mainly care about UART (serial) interrupt
-            if self.interrupt_pending[4] and (self.IE & 0x10):  # Serial interrupt
-                self.interrupt_pending[4] = False
-                # Call interrupt handler at 0x0023
-                self.push(self.pc & 0xFF)
-                self.push((self.pc >> 8) & 0xFF)
-                self.pc = 0x0023
-                
+        if self._int_needs_check:
+            self._service_interrupts(self.cycle_count)
+
         # Execute one instruction
         self.execute_instruction()
         
     def run(self, max_cycles=None):
         """Run the CPU"""
+        if HAVE_NUMBA:
+            self._run_compiled(max_cycles)
+        else:
+            self._run_interpreted(max_cycles)
+
+    def _run_interpreted(self, max_cycles):
+        """
+        run() in plain Python
+
+        Inlines step() and execute_instruction(), with the decoded ROM
+        and the cycle count in locals. cycle_count is only brought up
+        to date when the loop exits. Straight-line code runs as compiled
+        blocks. Near max_cycles, a due UART byte or a pending interrupt the
+        loop falls back to single instructions, so the limit stays exact
+        and interrupts are taken at the same cycle as under step().
+        """
+        decoded = self.decoded
+        blocks = self.blocks
+        cycle_count = self.cycle_count
+        limit = cycle_count + max_cycles if max_cycles else None
+        try:
+            while self.running:
+                if self._int_needs_check:
+                    self._service_interrupts(cycle_count)
+                pc = self.pc
+                entry = blocks[pc] or self._compile_block(pc)
+                handler, opcode, byte1, byte2, self.pc, cycles = entry
+                # Run single instructions where a block would cross the
+                # cycle limit, a UART delivery or a pending interrupt, so
+                # these happen at the same cycle as under step()
+                if opcode is None and (
+                        (limit is not None and cycle_count + cycles > limit)
+                        or (self._int_needs_check
+                            and (self.irq_pending
+                                 or (self.uart_rx_queue
+                                     and cycle_count + cycles > self.uart_rx_ready)))):
+                    entry = decoded[pc] or self._decode(pc)
+                    handler, opcode, byte1, byte2, self.pc, cycles = entry
+                handler(opcode, byte1, byte2)
+                cycle_count += cycles
+                if limit is not None and cycle_count >= limit:
+                    break
+        finally:
+            self.cycle_count = cycle_count
+
+    def _store_state(self):
+        """Copy the registers outside iram into the compiled run loop's
+        state vector"""
+        state = self._state
+        state[_PC] = self.pc
+        state[_CYCLES] = self.cycle_count
+        state[_IRQ] = self.irq_pending
+        state[_EA] = self.interrupt_enabled
+        state[_RBANK] = self._rbank
+        state[_STATUS] = 0
+        state[_NEVENTS] = 0
+
+    def _load_state(self):
+        """Copy the registers outside iram back from the compiled run loop"""
+        state = self._state
+        self.pc = int(state[_PC])
+        self.cycle_count = int(state[_CYCLES])
+        self.irq_pending = int(state[_IRQ])
+        self.interrupt_enabled = bool(state[_EA])
+        self._rbank = int(state[_RBANK])
+        # The compiled loop may leave a byte queued or an interrupt pending
+        self._int_needs_check = True
+
+    def _run_compiled(self, max_cycles):
+        """
+        run() on the Numba-compiled loop
+
+        The loop hands back to Python for every write to P1, P3 or SBUF so
+        the callbacks run in program order, and for unimplemented opcodes.
+        """
         start_cycle = self.cycle_count
+        state = self._state
+        events = self._events
         while self.running:
-            self.step()
+            if max_cycles:
+                limit = start_cycle + max_cycles
+            else:
+                limit = self.cycle_count + _RUN_SLICE
+            if self.uart_rx_queue:
+                # Stop the slice where the next received byte arrives
+                if self.cycle_count >= self.uart_rx_ready:
+                    self._uart_deliver(self.cycle_count)
+                if self.uart_rx_queue:
+                    limit = min(limit, self.uart_rx_ready)
+            self._store_state()
+            _run_kernel(self._iram_array, self._xram_array, self._rom_array,
+                        state, events, limit)
+            self._load_state()
+
+            for i in range(0, 2 * int(state[_NEVENTS]), 2):
+                self._write_hook(int(events[i]), int(events[i + 1]))
+            if state[_STATUS]:
+                self._op_unimplemented(self.rom[(self.pc - 1) & 0xFFFF], 0, 0)
+
             if max_cycles and (self.cycle_count - start_cycle) >= max_cycles:
                 break
@@ -10,7 +10,12 @@ import sys
 import time
 import threading
 from cpu8051 import CPU8051
-from ay3910_audio import AY3910Audio, AudioOutput
+from ay3910_audio import AY3910Audio, AudioOutput, BatchPacer
+
+# Loop passes run per batch, each cycles_per_audio_sample CPU cycles and
+# 16 AY clocks. With the default clock_divider of 2 one batch generates
+# 512 samples.
+PASSES_PER_BATCH = 64
 
 
 class AutomaticDemo:
@@ -32,15 +37,18 @@ class AutomaticDemo:
         self.cpu.port_write_callbacks[0x90] = self.port1_write
         self.cpu.port_write_callbacks[0xB0] = self.port3_write
         
-        # AY control state
+        # AY control state: data bus and (BDIR << 2) | (BC2 << 1) | BC1
         self.ay_data = 0
-        self.ay_bc1 = 0
-        self.ay_bc2 = 0
-        self.ay_bdir = 0
+        self.ay_control = 0
+        # Bus operation for each control code: read, write, latch address
+        self.ay_operations = (None, None, None, self.ay_read,
+                              None, None, self.ay_write, self.ay_latch)
         
         # Control
         self.running = False
         self.cpu_thread = None
+        # time.monotonic() at which the current note ends
+        self.note_deadline = None
         
     def port1_write(self, value):
         """Handle Port 1 writes"""
@@ -49,32 +57,49 @@ class AutomaticDemo:
         
     def port3_write(self, value):
         """Handle Port 3 writes"""
-        self.ay_bc1 = (value >> 0) & 0x01
-        self.ay_bdir = (value >> 4) & 0x01
-        self.ay_bc2 = (value >> 5) & 0x01
+        self.ay_control = ((value >> 2) & 0x04) | ((value >> 4) & 0x02) | (value & 0x01)
         self.update_ay_control()
         
     def update_ay_control(self):
         """Update AY chip based on control signals"""
-        if self.ay_bdir == 1 and self.ay_bc2 == 1 and self.ay_bc1 == 1:
-            self.ay_chip.latch_address(self.ay_data)
-        elif self.ay_bdir == 1 and self.ay_bc2 == 1 and self.ay_bc1 == 0:
-            self.ay_chip.write_data(self.ay_data)
-        elif self.ay_bdir == 0 and self.ay_bc2 == 1 and self.ay_bc1 == 1:
-            self.cpu.P1 = self.ay_chip.read_data()
+        operation = self.ay_operations[self.ay_control]
+        if operation is not None:
+            operation()
+            
+    def ay_latch(self):
+        """Latch the AY register address"""
+        self.ay_chip.latch_address(self.ay_data)
+        
+    def ay_write(self):
+        """Write data to the AY register"""
+        self.ay_chip.write_data(self.ay_data)
+        
+    def ay_read(self):
+        """Read the AY register onto Port 1"""
+        self.cpu.P1 = self.ay_chip.read_data()
             
     def cpu_loop(self):
-        """CPU execution loop"""
+        """
+        CPU execution loop
+        
+        A batch runs when the BatchPacer says one is due: once the audio
+        buffer has room for its samples, or on the wall clock when there is
+        no audio device to drain the buffer.
+        """
         cycles_per_audio_sample = int(self.ay_chip.clock_freq / self.ay_chip.sample_rate / 16)
+        cpu_cycles_per_batch = cycles_per_audio_sample * PASSES_PER_BATCH
+        ay_clocks_per_batch = 16 * PASSES_PER_BATCH
+        run_cpu = self.cpu.run
+        clock_ay = self.ay_chip.clock_n
+        
+        batch_samples = -(-ay_clocks_per_batch // self.ay_chip.clock_divider)
+        pacer = BatchPacer(self.ay_chip, batch_samples,
+                           self.audio_output.is_running())
         
         while self.running:
-            for _ in range(cycles_per_audio_sample):
-                if not self.running:
-                    break
-                self.cpu.step()
-                
-            for _ in range(16):
-                self.ay_chip.clock()
+            if pacer.room():
+                run_cpu(cpu_cycles_per_batch)
+                clock_ay(ay_clocks_per_batch)
                 
     def send_command(self, command_bytes):
         """Send a UART command"""
@@ -90,7 +115,15 @@ class AutomaticDemo:
         # Send NOTE command
         cmd = [0xB5, 0xA4, channel, period_low, period_high, amplitude, 0xB0]
         self.send_command(cmd)
-        time.sleep(duration)
+        
+        # Sleep until the note's deadline rather than for its duration, so
+        # time spent sending commands doesn't add up from note to note
+        if self.note_deadline is None:
+            self.note_deadline = time.monotonic()
+        self.note_deadline += duration
+        delay = self.note_deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
         
     def stop_all(self):
         """Stop all channels"""
@@ -136,6 +169,7 @@ class AutomaticDemo:
         
         print("Playing C major scale...")
         print()
+        self.note_deadline = time.monotonic()
         
         for name, freq, duration in notes:
             print(f"  Playing {name} ({freq} Hz) for {duration}s")
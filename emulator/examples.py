@@ -7,7 +7,7 @@ This shows how to use the emulator components in your own code.
 
 import time
 from cpu8051 import CPU8051
-from ay3910_audio import AY3910Audio, AudioOutput
+from ay3910_audio import AY3910Audio, AudioOutput, BatchPacer
 
 
 def example_1_simple_tone():
@@ -17,7 +17,7 @@ def example_1_simple_tone():
     
     # Create AY chip and audio output
     ay = AY3910Audio(clock_freq=2000000, sample_rate=44100)
-    audio = AudioOutput(ay, sample_rate=44100)
+    audio = AudioOutput(ay, sample_rate=44100, producer=True)
     
     # Start audio
     audio.start()
@@ -33,11 +33,7 @@ def example_1_simple_tone():
     print(f"Playing A440 for 2 seconds...")
     print(ay.get_state_string())
     
-    # Generate audio for 2 seconds
-    for _ in range(44100 * 2 // 16):
-        for _ in range(16):
-            ay.clock()
-    
+    # Audio is generated on the output's producer thread
     time.sleep(2)
     
     # Stop
@@ -55,7 +51,7 @@ def example_2_chord():
     
     # Create AY chip and audio output
     ay = AY3910Audio(clock_freq=2000000, sample_rate=44100)
-    audio = AudioOutput(ay, sample_rate=44100)
+    audio = AudioOutput(ay, sample_rate=44100, producer=True)
     
     # Start audio
     audio.start()
@@ -78,11 +74,7 @@ def example_2_chord():
     
     print("\nPlaying chord for 2 seconds...")
     
-    # Generate audio for 2 seconds
-    for _ in range(44100 * 2 // 16):
-        for _ in range(16):
-            ay.clock()
-    
+    # Audio is generated on the output's producer thread
     time.sleep(2)
     
     # Stop
@@ -105,6 +97,7 @@ def example_3_with_cpu():
     # Create components
     cpu = CPU8051()
     ay = AY3910Audio(clock_freq=2000000, sample_rate=44100)
+    # The CPU thread clocks the AY chip itself, in step with the CPU
     audio = AudioOutput(ay, sample_rate=44100)
     
     # Load ROM
@@ -118,23 +111,21 @@ def example_3_with_cpu():
     
     # Setup port callbacks
     ay_data = [0]
-    ay_control = {'bc1': 0, 'bc2': 0, 'bdir': 0}
+    ay_control = [0]  # (BDIR << 2) | (BC2 << 1) | BC1
     
     def port1_write(value):
         ay_data[0] = value
         update_ay()
         
     def port3_write(value):
-        ay_control['bc1'] = (value >> 0) & 0x01
-        ay_control['bdir'] = (value >> 4) & 0x01
-        ay_control['bc2'] = (value >> 5) & 0x01
+        # P3.0 = BC1, P3.4 = BDIR, P3.5 = BC2
+        ay_control[0] = ((value >> 2) & 0x04) | ((value >> 4) & 0x02) | (value & 0x01)
         update_ay()
         
     def update_ay():
-        bdir, bc2, bc1 = ay_control['bdir'], ay_control['bc2'], ay_control['bc1']
-        if bdir == 1 and bc2 == 1 and bc1 == 1:
+        if ay_control[0] == 0b111:
             ay.latch_address(ay_data[0])
-        elif bdir == 1 and bc2 == 1 and bc1 == 0:
+        elif ay_control[0] == 0b110:
             ay.write_data(ay_data[0])
     
     cpu.port_write_callbacks[0x90] = port1_write
@@ -149,12 +140,17 @@ def example_3_with_cpu():
     running = [True]
     
     def cpu_loop():
-        cycles_per_sample = int(2000000 / 44100 / 16)
+        # Each batch runs the CPU for 64 passes of cycles_per_audio_sample
+        # cycles and clocks the AY chip 16 times per pass; the pacer lets a
+        # batch run once the audio buffer has room for its samples
+        cycles_per_audio_sample = int(ay.clock_freq / ay.sample_rate / 16)
+        cpu_cycles = cycles_per_audio_sample * 64
+        ay_clocks = 16 * 64
+        pacer = BatchPacer(ay, -(-ay_clocks // ay.clock_divider), audio.is_running())
         while running[0]:
-            for _ in range(cycles_per_sample):
-                cpu.step()
-            for _ in range(16):
-                ay.clock()
+            if pacer.room():
+                cpu.run(cpu_cycles)
+                ay.clock_n(ay_clocks)
     
     thread = threading.Thread(target=cpu_loop, daemon=True)
     thread.start()
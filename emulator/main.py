@@ -7,11 +7,18 @@ providing UART input via stdin for real-time music playback.
 """
 
 import sys
-import threading
 import time
 import select
 from cpu8051 import CPU8051
-from ay3910_audio import AY3910Audio, AudioOutput
+from ay3910_audio import AY3910Audio, AudioOutput, BatchPacer
+
+# Loop passes run per batch, each cycles_per_audio_sample CPU cycles and
+# 16 AY clocks. With the default clock_divider of 2 one batch generates
+# 512 samples.
+PASSES_PER_BATCH = 64
+
+# Bytes stripped from stdin lines before hex parsing: all but hex digits and spaces
+_NON_HEX = bytes(c for c in range(256) if chr(c) not in '0123456789ABCDEFabcdef ')
 
 
 class SoundSystem:
@@ -40,16 +47,23 @@ class SoundSystem:
         self.cpu.port_write_callbacks[0x90] = self.port1_write
         self.cpu.port_write_callbacks[0xB0] = self.port3_write
         
-        # AY-3-8910 control state
+        # AY-3-8910 control state: the data bus and the bus control lines
+        # as (BDIR << 2) | (BC2 << 1) | BC1
         self.ay_data = 0
-        self.ay_bc1 = 0
-        self.ay_bc2 = 0
-        self.ay_bdir = 0
+        self.ay_control = 0
+        
+        # AY-3-8910 control modes:
+        # BDIR BC2 BC1 | Function
+        # ─────────────────────
+        #  0   1   0   | Inactive
+        #  0   1   1   | Read from PSG
+        #  1   1   0   | Write to PSG
+        #  1   1   1   | Latch address
+        self.ay_operations = (None, None, None, self.ay_read,
+                              None, None, self.ay_write, self.ay_latch)
         
         # Control flags
         self.running = False
-        self.cpu_thread = None
-        self.stdin_thread = None
         
     def port1_write(self, value):
         """Handle Port 1 writes (data bus to AY-3-8910)"""
@@ -59,88 +73,100 @@ class SoundSystem:
     def port3_write(self, value):
         """Handle Port 3 writes (control signals to AY-3-8910)"""
         # P3.0 = BC1, P3.4 = BDIR, P3.5 = BC2
-        self.ay_bc1 = (value >> 0) & 0x01
-        self.ay_bdir = (value >> 4) & 0x01
-        self.ay_bc2 = (value >> 5) & 0x01
+        self.ay_control = ((value >> 2) & 0x04) | ((value >> 4) & 0x02) | (value & 0x01)
         self.update_ay_control()
         
     def update_ay_control(self):
         """Update AY-3-8910 based on control signals"""
-        # AY-3-8910 control modes:
-        # BDIR BC2 BC1 | Function
-        # ─────────────────────
-        #  0   1   0   | Inactive
-        #  0   1   1   | Read from PSG
-        #  1   1   0   | Write to PSG
-        #  1   1   1   | Latch address
+        operation = self.ay_operations[self.ay_control]
+        if operation is not None:
+            operation()
+            
+    def ay_latch(self):
+        """Latch the register address on the data bus"""
+        self.ay_chip.latch_address(self.ay_data)
+        
+    def ay_write(self):
+        """Write the data bus to the latched register"""
+        self.ay_chip.write_data(self.ay_data)
         
-        if self.ay_bdir == 1 and self.ay_bc2 == 1 and self.ay_bc1 == 1:
-            # Latch address
-            self.ay_chip.latch_address(self.ay_data)
-        elif self.ay_bdir == 1 and self.ay_bc2 == 1 and self.ay_bc1 == 0:
-            # Write data
-            self.ay_chip.write_data(self.ay_data)
-        elif self.ay_bdir == 0 and self.ay_bc2 == 1 and self.ay_bc1 == 1:
-            # Read data (update P1)
-            self.cpu.P1 = self.ay_chip.read_data()
+    def ay_read(self):
+        """Read the latched register onto Port 1"""
+        self.cpu.P1 = self.ay_chip.read_data()
             
-    def cpu_loop(self):
-        """Main CPU execution loop"""
+    def run_loop(self):
+        """
+        Main emulation loop: CPU, AY-3-8910 and stdin on one thread
+
+        Each batch runs the CPU and then clocks the AY chip for the same
+        span, and every pass polls stdin without blocking, so no other
+        Python thread contends for the GIL. Only the audio output runs on a
+        thread of its own. A BatchPacer keeps emulation at real time: a
+        batch runs once the audio buffer has room for its samples, or on
+        the wall clock when there is no audio device to drain the buffer.
+        """
         cycles_per_audio_sample = int(self.ay_chip.clock_freq / self.ay_chip.sample_rate / 16)
+        cpu_cycles_per_batch = cycles_per_audio_sample * PASSES_PER_BATCH
+        ay_clocks_per_batch = 16 * PASSES_PER_BATCH
+        run_cpu = self.cpu.run
+        clock_ay = self.ay_chip.clock_n
         
-        while self.running:
-            # Execute CPU cycles
-            for _ in range(cycles_per_audio_sample):
-                if not self.running:
-                    break
-                self.cpu.step()
-                
-            # Clock the AY chip to generate audio
-            for _ in range(16):
-                self.ay_chip.clock()
-                
-    def stdin_loop(self):
-        """Read UART input from stdin"""
-        print("UART input ready (stdin)")
-        print("Paste hex bytes (e.g., B5 A4 00 DD 01 0F B0) or type 'q' to quit")
-        print()
+        batch_samples = -(-ay_clocks_per_batch // self.ay_chip.clock_divider)
+        pacer = BatchPacer(self.ay_chip, batch_samples,
+                           self.audio_output.is_running())
+        
+        stdin = [sys.stdin]
         
         while self.running:
-            # Check if input is available (non-blocking)
-            if sys.stdin in select.select([sys.stdin], [], [], 0.1)[0]:
-                line = sys.stdin.readline().strip()
+            if pacer.room():
+                # Execute CPU cycles for a batch of audio samples in one run()
+                run_cpu(cpu_cycles_per_batch)
                 
+                # Clock the AY chip to generate the batch's audio in one call
+                clock_ay(ay_clocks_per_batch)
+            
+            # Check if input is available (non-blocking)
+            if stdin and select.select(stdin, [], [], 0)[0]:
+                line = sys.stdin.readline()
                 if not line:
+                    # End of input: keep playing without polling stdin
+                    stdin = []
                     continue
-                    
-                # Check for quit command
-                if line.lower() in ['q', 'quit', 'exit']:
-                    print("Quitting...")
-                    self.running = False
-                    break
-                    
-                # Check for status command
-                if line.lower() in ['s', 'status', 'state']:
-                    print()
-                    print(self.ay_chip.get_state_string())
-                    print()
-                    continue
-                    
-                # Parse hex bytes
-                try:
-                    # Remove any non-hex characters
-                    hex_str = ''.join(c for c in line if c in '0123456789ABCDEFabcdef ')
-                    bytes_data = bytes.fromhex(hex_str)
-                    
-                    # Send to UART
-                    for byte in bytes_data:
-                        self.cpu.uart_receive(byte)
-                        
-                    print(f"Sent {len(bytes_data)} bytes to UART")
-                    
-                except ValueError as e:
-                    print(f"Error parsing hex: {e}")
-                    print("Format: B5 A4 00 DD 01 0F B0")
+                self.handle_input(line.strip())
+                
+    def handle_input(self, line):
+        """Handle one line of stdin: a command or hex bytes for the UART"""
+        if not line:
+            return
+            
+        # Check for quit command
+        if line.lower() in ['q', 'quit', 'exit']:
+            print("Quitting...")
+            self.running = False
+            return
+            
+        # Check for status command
+        if line.lower() in ['s', 'status', 'state']:
+            print()
+            print(self.ay_chip.get_state_string())
+            print()
+            return
+            
+        # Parse hex bytes
+        try:
+            # Remove any non-hex characters
+            hex_str = line.encode('ascii', 'ignore').translate(None, _NON_HEX).decode('ascii')
+            bytes_data = bytes.fromhex(hex_str)
+            
+            # Send to UART
+            for byte in bytes_data:
+                self.cpu.uart_receive(byte)
+                
+            print(f"Sent {len(bytes_data)} bytes to UART")
+            
+        except ValueError as e:
+            print(f"Error parsing hex: {e}")
+            print("Format: B5 A4 00 DD 01 0F B0")
                     
     def start(self):
         """Start the emulator"""
@@ -156,22 +182,17 @@ class SoundSystem:
         self.audio_output.start()
         time.sleep(0.5)  # Give audio time to start
         
-        # Start threads
         self.running = True
         
-        self.cpu_thread = threading.Thread(target=self.cpu_loop, daemon=True)
-        self.cpu_thread.start()
-        
-        self.stdin_thread = threading.Thread(target=self.stdin_loop, daemon=True)
-        self.stdin_thread.start()
-        
         print("System started!")
         print()
+        print("UART input ready (stdin)")
+        print("Paste hex bytes (e.g., B5 A4 00 DD 01 0F B0) or type 'q' to quit")
+        print()
         
-        # Wait for threads
+        # Run until quit
         try:
-            while self.running:
-                time.sleep(0.1)
+            self.run_loop()
         except KeyboardInterrupt:
             print("\nInterrupted by user")
             
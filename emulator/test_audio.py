@@ -4,9 +4,27 @@ Test the emulator with pre-programmed music sequences
 """
 
 import sys
-import time
 from cpu8051 import CPU8051
-from ay3910_audio import AY3910Audio, AudioOutput
+from ay3910_audio import AY3910Audio, AudioOutput, BatchPacer, BLOCK_SIZE
+
+
+def play(ay_chip, generate, seconds):
+    """
+    Generate seconds of audio as the output drains the chip's buffer
+    
+    Pacing follows the audio device rather than the wall clock. Without
+    audio (generate false) nothing would consume the samples, so this
+    returns at once.
+    """
+    if not generate:
+        return
+    pacer = BatchPacer(ay_chip, BLOCK_SIZE)
+    remaining = int(ay_chip.sample_rate * seconds)
+    while remaining > 0:
+        n = min(pacer.room(), remaining)
+        if n:
+            ay_chip.clock_block(n)
+            remaining -= n
 
 
 def test_basic():
@@ -22,10 +40,12 @@ def test_basic():
     
     # Start audio
     audio.start()
-    if not audio.is_running():
+    # Without an audio device the generated samples would go nowhere
+    generate = audio.is_running()
+    if not generate:
         print("Audio not available - test will continue without sound")
     
-    time.sleep(0.5)
+    play(ay_chip, generate, 0.5)
     
     # Test 1: Play Middle C
     print("Test 1: Playing Middle C (262 Hz) for 1 second...")
@@ -33,14 +53,10 @@ def test_basic():
     ay_chip.set_channel_amplitude(0, 15)
     ay_chip.enable_channel_tone(0, True)
     
-    # Generate audio for 1 second
-    samples_per_sec = 44100
-    for _ in range(samples_per_sec // 16):
-        for _ in range(16):
-            ay_chip.clock()
-    
     print(ay_chip.get_state_string())
-    time.sleep(1)
+    
+    # Generate audio for 1 second
+    play(ay_chip, generate, 1)
     
     # Test 2: Play A440
     print("\nTest 2: Playing A440 for 1 second...")
@@ -48,12 +64,8 @@ def test_basic():
     ay_chip.set_channel_amplitude(1, 12)
     ay_chip.enable_channel_tone(1, True)
     
-    for _ in range(samples_per_sec // 16):
-        for _ in range(16):
-            ay_chip.clock()
-    
     print(ay_chip.get_state_string())
-    time.sleep(1)
+    play(ay_chip, generate, 1)
     
     # Test 3: Play C Major Chord
     print("\nTest 3: Playing C Major Chord (C-E-G) for 2 seconds...")
@@ -69,12 +81,8 @@ def test_basic():
     ay_chip.set_channel_amplitude(2, 10)
     ay_chip.enable_channel_tone(2, True)
     
-    for _ in range(samples_per_sec * 2 // 16):
-        for _ in range(16):
-            ay_chip.clock()
-    
     print(ay_chip.get_state_string())
-    time.sleep(2)
+    play(ay_chip, generate, 2)
     
     # Test 4: Silence
     print("\nTest 4: Silence all channels...")
@@ -83,7 +91,7 @@ def test_basic():
     ay_chip.set_channel_amplitude(2, 0)
     
     print(ay_chip.get_state_string())
-    time.sleep(0.5)
+    play(ay_chip, generate, 0.5)
     
     # Stop audio
     audio.stop()
@@ -105,10 +113,12 @@ def test_melody():
     
     # Start audio
     audio.start()
-    if not audio.is_running():
+    # Without an audio device the generated samples would go nowhere
+    generate = audio.is_running()
+    if not generate:
         print("Audio not available - test will continue without sound")
     
-    time.sleep(0.5)
+    play(ay_chip, generate, 0.5)
     
     # Define a simple melody: C D E F G A B C
     notes = [
@@ -125,7 +135,6 @@ def test_melody():
     print("Playing C major scale...")
     print()
     
-    samples_per_sec = 44100
     note_duration = 0.5  # seconds
     
     for name, freq_hz, period in notes:
@@ -137,22 +146,15 @@ def test_melody():
         ay_chip.enable_channel_tone(0, True)
         
         # Generate audio
-        for _ in range(int(samples_per_sec * note_duration) // 16):
-            for _ in range(16):
-                ay_chip.clock()
-        
-        time.sleep(note_duration)
+        play(ay_chip, generate, note_duration)
         
         # Brief silence between notes
         ay_chip.set_channel_amplitude(0, 0)
-        for _ in range(int(samples_per_sec * 0.05) // 16):
-            for _ in range(16):
-                ay_chip.clock()
-        time.sleep(0.05)
+        play(ay_chip, generate, 0.05)
     
     # Final silence
     ay_chip.set_channel_amplitude(0, 0)
-    time.sleep(0.5)
+    play(ay_chip, generate, 0.5)
     
     # Stop audio
     audio.stop()
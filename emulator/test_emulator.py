@@ -3,15 +3,33 @@
 Simple test without audio hardware - validates emulator functionality
 """
 
+import random
 import sys
 import os
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from cpu8051 import CPU8051
+import numpy as np
+
+import ay3910_audio
+from cpu8051 import CPU8051, HAVE_NUMBA
 from ay3910_audio import AY3910Audio
 
+_rom_data = None
+
+
+def read_rom():
+    """Read the firmware image (from disk on the first call only)"""
+    global _rom_data
+    if _rom_data is None:
+        rom_file = os.path.join(os.path.dirname(__file__), "..", "sound_cpu_8051.bin")
+        if not os.path.exists(rom_file):
+            rom_file = "sound_cpu_8051.bin"
+        with open(rom_file, 'rb') as f:
+            _rom_data = f.read()
+    return _rom_data
+
 
 def test_cpu():
     """Test basic CPU functionality"""
@@ -23,12 +41,7 @@ def test_cpu():
     
     # Test 1: Load ROM
     print("\n1. Loading ROM...")
-    # Find ROM file
-    rom_file = os.path.join(os.path.dirname(__file__), "..", "sound_cpu_8051.bin")
-    if not os.path.exists(rom_file):
-        rom_file = "sound_cpu_8051.bin"
-    with open(rom_file, 'rb') as f:
-        rom_data = f.read()
+    rom_data = read_rom()
     cpu.load_rom(rom_data)
     print(f"   Loaded {len(rom_data)} bytes")
     
@@ -40,15 +53,18 @@ def test_cpu():
     
     # Test 3: Execute a few instructions
     print("\n3. Executing initial instructions...")
+    step = cpu.step
     for i in range(10):
         opcode = cpu.rom[cpu.pc]
         pc_before = cpu.pc
-        cpu.step()
+        step()
         print(f"   PC: 0x{pc_before:04X} -> 0x{cpu.pc:04X}, Opcode: 0x{opcode:02X}")
     
     # Test 4: UART receive
     print("\n4. Testing UART receive...")
     cpu.uart_receive(0xB5)
+    # The byte reaches SBUF before the next instruction
+    cpu.step()
     print(f"   Sent 0xB5 to UART")
     print(f"   SBUF = 0x{cpu.SBUF:02X}")
     print(f"   SCON = 0x{cpu.SCON:02X}")
@@ -57,6 +73,68 @@ def test_cpu():
     return True
 
 
+def _run_path(rom, path, cycles, uart_bytes=()):
+    """Run rom for the given cycles via one execution path and return its final state"""
+    cpu = CPU8051()
+    cpu.load_rom(rom)
+    cpu.reset()
+    port_writes = []
+    cpu.port_write_callbacks[0x90] = lambda value: port_writes.append(('P1', value))
+    cpu.port_write_callbacks[0xB0] = lambda value: port_writes.append(('P3', value))
+    if uart_bytes:
+        # Enable the serial interrupt with the fastest baud rate so several
+        # bytes arrive within the run
+        cpu.write_direct(0xA8, 0x90)
+        cpu.write_direct(0x8D, 0xFF)
+        for byte in uart_bytes:
+            cpu.uart_receive(byte)
+
+    run = {"interpreted": cpu._run_interpreted, "compiled": cpu._run_compiled}.get(path)
+    target = 0
+    while target < cycles:
+        # Re-enter in slices so resuming mid-block is exercised too
+        target += 500
+        if run is None:
+            while cpu.running and cpu.cycle_count < target:
+                cpu.step()
+        elif cpu.running and cpu.cycle_count < target:
+            run(target - cpu.cycle_count)
+    return (cpu.pc, cpu.cycle_count, bytes(cpu.iram), bytes(cpu.xram), port_writes)
+
+
+def test_run_paths():
+    """Test that step(), the interpreted and the compiled run loop agree"""
+    print("\n" + "=" * 60)
+    print("Testing CPU Execution Paths")
+    print("=" * 60)
+
+    # run() only takes the compiled path when Numba is installed
+    paths = ("interpreted", "compiled") if HAVE_NUMBA else ("interpreted",)
+    cases = [(seed, ()) for seed in (1, 2, 11)]
+    cases.append((0, (0xB5, 0xA4, 0x00, 0xDD, 0x01, 0x0F, 0xB0)))
+    for i, (seed, uart_bytes) in enumerate(cases, 1):
+        rng = random.Random(seed)
+        # 0xA5 is the one reserved opcode and would stop the CPU early
+        rom = bytes(rng.randrange(256) for _ in range(65536)).replace(b"\xa5", b"\x00")
+        label = f"random ROM (seed {seed})"
+        if uart_bytes:
+            label += f" with {len(uart_bytes)} queued UART bytes"
+        print(f"\n{i}. Running {label}...")
+        expected = _run_path(rom, "step", 5000, uart_bytes)
+        for path in paths:
+            result = _run_path(rom, path, 5000, uart_bytes)
+            assert result[0] == expected[0], f"{path}: PC 0x{result[0]:04X} != 0x{expected[0]:04X}"
+            assert result[1] == expected[1], f"{path}: cycle count {result[1]} != {expected[1]}"
+            assert result[2] == expected[2], f"{path}: internal RAM differs"
+            assert result[3] == expected[3], f"{path}: external RAM differs"
+            assert result[4] == expected[4], f"{path}: port writes differ"
+        print(f"   PC = 0x{expected[0]:04X} after {expected[1]} cycles, "
+              f"{len(expected[4])} port writes - all paths agree")
+
+    print("\n✓ Execution path tests passed!")
+    return True
+
+
 def test_ay_chip():
     """Test AY-3-8910 functionality"""
     print("\n" + "=" * 60)
@@ -87,13 +165,46 @@ def test_ay_chip():
     
     # Test 4: Generate samples
     print("\n4. Generating audio samples...")
+    clock = ay.clock
     for _ in range(100):
-        ay.clock()
-    print(f"   Generated samples, buffer size: {ay.audio_buffer.qsize()}")
+        clock()
+    print(f"   Generated samples, buffer size: {ay.audio_buffer.available()}")
     
     # Test 5: Get state
     print("\n5. Getting chip state...")
     print(ay.get_state_string())
+
+    # Test 6: Block generators
+    print("\n6. Comparing the Numba and NumPy block generators...")
+    have_numba = ay3910_audio.HAVE_NUMBA
+    results = []
+    try:
+        for use_numba in (True, False):
+            ay3910_audio.HAVE_NUMBA = use_numba
+            chip = AY3910Audio(clock_freq=2000000, sample_rate=44100)
+            # Tone on A and B, noise on B and C, envelope on B and C
+            for reg, value in ((0, 0xDD), (1, 0x01), (2, 0x40), (3, 0x00),
+                               (6, 0x0B), (7, 0x0C), (8, 0x0F), (9, 0x10),
+                               (10, 0x10), (11, 0x30), (12, 0x00), (13, 0x0E)):
+                chip.latch_address(reg)
+                chip.write_data(value)
+            samples = []
+            for shape in (0x0E, 0x09):
+                # Writing the shape register restarts the envelope
+                chip.latch_address(13)
+                chip.write_data(shape)
+                chip.clock_block(3000)
+                samples.append(chip.get_audio_data(3000))
+            state = (list(chip.tone_counters), list(chip.tone_outputs),
+                     chip.noise_counter, chip.noise_lfsr, chip.noise_output,
+                     chip.envelope_counter, chip.envelope_step, chip.envelope_output)
+            results.append((np.concatenate(samples), state))
+    finally:
+        ay3910_audio.HAVE_NUMBA = have_numba
+    (numba_samples, numba_state), (numpy_samples, numpy_state) = results
+    assert np.array_equal(numba_samples, numpy_samples), "Block generator samples differ"
+    assert numba_state == numpy_state, "Block generator state differs"
+    print(f"   {len(numba_samples)} samples and generator state match")
     
     print("\n✓ AY-3-8910 tests passed!")
     return True
@@ -110,12 +221,7 @@ def test_integration():
     ay = AY3910Audio()
     
     # Load ROM
-    rom_file = os.path.join(os.path.dirname(__file__), "..", "sound_cpu_8051.bin")
-    if not os.path.exists(rom_file):
-        rom_file = "sound_cpu_8051.bin"
-    with open(rom_file, 'rb') as f:
-        rom_data = f.read()
-    cpu.load_rom(rom_data)
+    cpu.load_rom(read_rom())
     cpu.reset()
     
     # Setup port callbacks
@@ -130,10 +236,12 @@ def test_integration():
     cpu.port_write_callbacks[0x90] = port1_callback
     cpu.port_write_callbacks[0xB0] = port3_callback
     
+    step = cpu.step
+    
     print("\n1. Executing firmware initialization...")
     # Execute some instructions
     for _ in range(100):
-        cpu.step()
+        step()
     
     print(f"   Executed {cpu.cycle_count} cycles")
     print(f"   PC = 0x{cpu.pc:04X}")
@@ -145,7 +253,7 @@ def test_integration():
         cpu.uart_receive(byte)
         # Process interrupt and commands
         for _ in range(50):
-            cpu.step()
+            step()
     
     print(f"   Port writes detected: {len(port_writes)}")
     if port_writes:
@@ -164,6 +272,7 @@ def main():
     try:
         # Run tests
         test_cpu()
+        test_run_paths()
         test_ay_chip()
         test_integration()
         
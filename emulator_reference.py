@@ -19,9 +19,47 @@ Usage:
     state = emulator.get_ay_state()
 """
 
+import struct
+from functools import lru_cache
+
+
+# One channel's block in get_state_string()
+_CHANNEL_STATE_FORMAT = (
+    "Channel {name}:\n"
+    "  Period: {period:4d} (0x{period:03X})\n"
+    "  Frequency: {freq:7.2f} Hz\n"
+    "  Amplitude: {amp:2d} (0x{amp:02X})\n"
+    "  Tone: {tone}, Noise: {noise}"
+)
+
+
+@lru_cache(maxsize=256)
+def _frequency_to_period(clock_freq, freq_hz):
+    """AY period value for freq_hz at clock_freq"""
+    if freq_hz == 0:
+        return 0
+    return int(clock_freq / (16 * freq_hz))
+
+
+@lru_cache(maxsize=256)
+def _period_to_frequency(clock_freq, period):
+    """Frequency in Hz of an AY period value at clock_freq"""
+    if period == 0:
+        return 0
+    return clock_freq / (16 * period)
+
+
 class AY3810Emulator:
     """Emulator for the AY-3-8910 Programmable Sound Generator"""
     
+    __slots__ = ('clock_freq', 'registers', 'address_latch')
+    
+    CHANNEL_NAMES = ('A', 'B', 'C')
+    
+    # Mixer (R7) disable bits for channels A, B, C
+    TONE_MASK = (0x01, 0x02, 0x04)
+    NOISE_MASK = (0x08, 0x10, 0x20)
+    
     def __init__(self, clock_freq=2000000):
         """
         Initialize AY-3-8910 emulator
@@ -30,7 +68,7 @@ class AY3810Emulator:
             clock_freq: Master clock frequency in Hz (default 2 MHz)
         """
         self.clock_freq = clock_freq
-        self.registers = [0] * 16
+        self.registers = bytearray(16)
         self.address_latch = 0
         
         # Initialize to silent state
@@ -60,16 +98,13 @@ class AY3810Emulator:
             period: 12-bit period value
         """
         if 0 <= channel <= 2:
-            reg_base = channel * 2
-            self.registers[reg_base] = period & 0xFF
-            self.registers[reg_base + 1] = (period >> 8) & 0x0F
+            # Fine tune (low byte) and coarse tune (4 bits) in one write
+            struct.pack_into('<H', self.registers, channel * 2, period & 0x0FFF)
             
     def get_channel_frequency(self, channel):
         """Get frequency period for a channel"""
         if 0 <= channel <= 2:
-            reg_base = channel * 2
-            period = self.registers[reg_base] | (self.registers[reg_base + 1] << 8)
-            return period
+            return struct.unpack_from('<H', self.registers, channel * 2)[0]
         return 0
         
     def set_channel_amplitude(self, channel, amplitude):
@@ -96,64 +131,58 @@ class AY3810Emulator:
     def enable_channel_tone(self, channel, enable=True):
         """Enable or disable tone output for a channel"""
         if 0 <= channel <= 2:
-            if enable:
-                self.registers[7] &= ~(1 << channel)  # 0 = enabled
-            else:
-                self.registers[7] |= (1 << channel)   # 1 = disabled
+            mask = self.TONE_MASK[channel]
+            # Clear the bit, then set it again when disabling (1 = disabled)
+            self.registers[7] = (self.registers[7] & ~mask) | (mask * (not enable))
                 
     def enable_channel_noise(self, channel, enable=True):
         """Enable or disable noise output for a channel"""
         if 0 <= channel <= 2:
-            if enable:
-                self.registers[7] &= ~(1 << (3 + channel))  # 0 = enabled
-            else:
-                self.registers[7] |= (1 << (3 + channel))   # 1 = disabled
+            mask = self.NOISE_MASK[channel]
+            # Clear the bit, then set it again when disabling (1 = disabled)
+            self.registers[7] = (self.registers[7] & ~mask) | (mask * (not enable))
                 
     def frequency_to_period(self, freq_hz):
         """Convert frequency in Hz to AY period value"""
-        if freq_hz == 0:
-            return 0
-        return int(self.clock_freq / (16 * freq_hz))
+        return _frequency_to_period(self.clock_freq, freq_hz)
         
     def period_to_frequency(self, period):
         """Convert AY period value to frequency in Hz"""
-        if period == 0:
-            return 0
-        return self.clock_freq / (16 * period)
+        return _period_to_frequency(self.clock_freq, period)
         
     def get_state_string(self):
         """Get human-readable state of all channels"""
-        lines = ["AY-3-8910 State:"]
-        lines.append("=" * 60)
-        
-        for ch in range(3):
-            ch_name = chr(ord('A') + ch)
+        channels = []
+        for ch, ch_name in enumerate(self.CHANNEL_NAMES):
             period = self.get_channel_frequency(ch)
             amp = self.get_channel_amplitude(ch)
             freq = self.period_to_frequency(period) if period > 0 else 0
             
-            tone_enabled = (self.registers[7] & (1 << ch)) == 0
-            noise_enabled = (self.registers[7] & (1 << (3 + ch))) == 0
+            tone_enabled = (self.registers[7] & self.TONE_MASK[ch]) == 0
+            noise_enabled = (self.registers[7] & self.NOISE_MASK[ch]) == 0
             
-            lines.append(f"Channel {ch_name}:")
-            lines.append(f"  Period: {period:4d} (0x{period:03X})")
-            lines.append(f"  Frequency: {freq:7.2f} Hz")
-            lines.append(f"  Amplitude: {amp:2d} (0x{amp:02X})")
-            lines.append(f"  Tone: {'ON' if tone_enabled else 'OFF'}, "
-                        f"Noise: {'ON' if noise_enabled else 'OFF'}")
-        
-        lines.append("=" * 60)
-        return "\n".join(lines)
+            channels.append(_CHANNEL_STATE_FORMAT.format(
+                name=ch_name, period=period, freq=freq, amp=amp,
+                tone='ON' if tone_enabled else 'OFF',
+                noise='ON' if noise_enabled else 'OFF'))
+        
+        return "\n".join(["AY-3-8910 State:", "=" * 60, *channels, "=" * 60])
 
 
 class Sound8051Emulator:
     """Emulator for the 8051 MCU firmware that controls AY-3-8910"""
     
+    __slots__ = ('ay_chip', 'state', 'start_marker', 'buffer', 'buffer_len',
+                 '_buffer_view', 'data_ready_flag', 'command_handlers')
+    
     # State machine states
     STATE_WAIT_START = 0
     STATE_RECEIVE_CMD = 1
     STATE_RECEIVE_DATA = 2
     
+    # Receive buffer size: longer frames are dropped
+    BUFFER_SIZE = 64
+    
     def __init__(self, ay_chip):
         """
         Initialize 8051 emulator
@@ -164,9 +193,23 @@ class Sound8051Emulator:
         self.ay_chip = ay_chip
         self.state = self.STATE_WAIT_START
         self.start_marker = 0
-        self.buffer = []
+        # Command and data bytes of the current frame, up to buffer_len
+        self.buffer = bytearray(self.BUFFER_SIZE)
+        self.buffer_len = 0
+        self._buffer_view = memoryview(self.buffer)
         self.data_ready_flag = False
         
+        # Command byte -> handler
+        self.command_handlers = {
+            0xA0: self._cmd_status,      # Status/control command
+            0xA2: self._cmd_freq_low,    # Set frequency low byte
+            0xA3: self._cmd_freq_high,   # Set frequency high byte
+            0xA4: self._cmd_note,        # Full note command (channel + freq + amplitude)
+            0xA6: self._cmd_stop,        # Stop/silence command
+            0xA7: self._cmd_special1,    # Special command 1
+            0xA8: self._cmd_special2,    # Special command 2
+        }
+        
     def uart_receive(self, byte):
         """
         Process a byte received via UART
@@ -178,23 +221,55 @@ class Sound8051Emulator:
             # State 0: Look for start marker
             if byte in [0xB5, 0xB6]:
                 self.start_marker = byte
-                self.buffer = []
+                self.buffer_len = 0
                 self.state = self.STATE_RECEIVE_CMD
                 
         elif self.state == self.STATE_RECEIVE_CMD:
             # State 1: Receive first data/command byte
-            self.buffer.append(byte)
+            self.buffer[0] = byte & 0xFF
+            self.buffer_len = 1
             self.state = self.STATE_RECEIVE_DATA
             
         elif self.state == self.STATE_RECEIVE_DATA:
             # State 2: Continue receiving data
-            self.buffer.append(byte)
+            if self.buffer_len == self.BUFFER_SIZE:
+                # Overflow: drop the frame and wait for the next start marker
+                self.buffer_len = 0
+                self.state = self.STATE_WAIT_START
+                return
+            self.buffer[self.buffer_len] = byte & 0xFF
+            self.buffer_len += 1
             
             # Check for end marker
             if byte == 0xB0:
                 self.data_ready_flag = True
                 self.state = self.STATE_WAIT_START
                 
+    def uart_receive_frame(self, frame):
+        """
+        Process a complete command frame received via UART
+        
+        Same as passing each byte to uart_receive() and calling process(),
+        but the end marker is found with a single index() call instead of
+        stepping the state machine byte by byte. Bytes after the end
+        marker are ignored.
+        
+        Args:
+            frame: [START] [CMD] [DATA...] [END] as bytes or a list of ints
+            
+        Returns:
+            True if a command was processed, False otherwise
+        """
+        if len(frame) < 3 or frame[0] not in (0xB5, 0xB6):
+            return False
+        try:
+            end = frame.index(0xB0, 2)
+        except ValueError:
+            return False
+            
+        self.start_marker = frame[0]
+        return self._handle_command(frame[1], frame[2:end])
+        
     def process(self):
         """
         Process any pending commands
@@ -202,7 +277,7 @@ class Sound8051Emulator:
         Returns:
             True if a command was processed, False otherwise
         """
-        if not self.data_ready_flag or len(self.buffer) == 0:
+        if not self.data_ready_flag or self.buffer_len == 0:
             return False
             
         self.data_ready_flag = False
@@ -210,51 +285,25 @@ class Sound8051Emulator:
         # First byte is the command
         cmd = self.buffer[0]
         
-        # Everything between command and end marker (0xB0) is data
-        data = self.buffer[1:-1] if len(self.buffer) > 1 else []
+        # Everything between command and end marker (0xB0) is data,
+        # passed as a view rather than a copy
+        data = self._buffer_view[1:self.buffer_len - 1] if self.buffer_len > 1 else []
         
         # Dispatch to command handler
         result = self._handle_command(cmd, data)
         
         # Clear buffer
-        self.buffer = []
+        self.buffer_len = 0
         
         return result
         
     def _handle_command(self, cmd, data):
         """Handle a specific command"""
-        
-        if cmd == 0xA0:
-            # Status/control command
-            return self._cmd_status(data)
-            
-        elif cmd == 0xA2:
-            # Set frequency low byte
-            return self._cmd_freq_low(data)
-            
-        elif cmd == 0xA3:
-            # Set frequency high byte
-            return self._cmd_freq_high(data)
-            
-        elif cmd == 0xA4:
-            # Full note command (channel + freq + amplitude)
-            return self._cmd_note(data)
-            
-        elif cmd == 0xA6:
-            # Stop/silence command
-            return self._cmd_stop(data)
-            
-        elif cmd == 0xA7:
-            # Special command 1
-            return self._cmd_special1(data)
-            
-        elif cmd == 0xA8:
-            # Special command 2
-            return self._cmd_special2(data)
-            
-        else:
+        handler = self.command_handlers.get(cmd)
+        if handler is None:
             print(f"Unknown command: 0x{cmd:02X}")
             return False
+        return handler(data)
             
     def _cmd_status(self, data):
         """Handle 0xA0 status command"""
@@ -344,6 +393,8 @@ class Sound8051Emulator:
 class SoundSystemEmulator:
     """Complete sound system emulator (8051 + AY-3-8910)"""
     
+    __slots__ = ('ay_chip', 'mcu')
+    
     def __init__(self, clock_freq=2000000):
         """
         Initialize sound system emulator
@@ -359,9 +410,10 @@ class SoundSystemEmulator:
         self.mcu.uart_receive(byte)
         
     def uart_send_bytes(self, bytes_list):
-        """Send multiple bytes to the UART"""
+        """Send multiple bytes (bytes, bytearray or a list of ints) to the UART"""
+        receive = self.mcu.uart_receive
         for byte in bytes_list:
-            self.uart_receive(byte)
+            receive(byte)
             
     def process(self):
         """Process any pending commands"""
@@ -387,19 +439,18 @@ class SoundSystemEmulator:
             frequency_hz: Frequency in Hz
             amplitude: Volume (0-15)
         """
-        period = self.ay_chip.frequency_to_period(frequency_hz)
-        period_low = period & 0xFF
-        period_high = (period >> 8) & 0x0F
-        
-        cmd = [0xB5, 0xA4, channel, period_low, period_high, amplitude, 0xB0]
-        self.uart_send_bytes(cmd)
-        self.process()
+        # Same register writes as the 0xA4 note command, made directly
+        ay_chip = self.ay_chip
+        period = ay_chip.frequency_to_period(frequency_hz)
+        ay_chip.set_channel_frequency(channel, period & 0xFFF)
+        ay_chip.set_channel_amplitude(channel, amplitude)
+        ay_chip.enable_channel_tone(channel, True)
         
     def stop_all(self):
         """Stop all channels"""
-        cmd = [0xB5, 0xA6, 0xB0]
-        self.uart_send_bytes(cmd)
-        self.process()
+        # Same as the 0xA6 stop command
+        for ch in range(3):
+            self.ay_chip.set_channel_amplitude(ch, 0)
 
 
 def demo():
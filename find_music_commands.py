@@ -4,20 +4,183 @@ Enhanced Music Command Finder
 Searches for music playback commands in the 8051 binary
 """
 
+import mmap
+import struct
 import sys
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional - without it disasm_block is an ordinary Python loop,
+    # which is fast enough for the 30-instruction flow listings
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Opcodes decoded by analyze_command_flow
+OPCODES_1BYTE = {
+    0xA3: "INC DPTR",
+    0x22: "RET",
+    0xE0: "MOVX A,@DPTR",
+    0xF0: "MOVX @DPTR,A",
+    0x93: "MOVC A,@A+DPTR",
+    0xC3: "CLR C",
+}
+
+OPCODES_2BYTE = {
+    0x74: "MOV A,#",
+    0x75: "MOV direct,#",
+    0xE5: "MOV A,direct",
+    0xF5: "MOV direct,A",
+    0x94: "SUBB A,#",
+    0xB4: "CJNE A,#",
+    0x80: "SJMP",
+}
+
+OPCODES_3BYTE = {
+    0x90: "MOV DPTR,#",
+}
+
+# Instruction length and mnemonic for every opcode, indexed by opcode.
+# Unknown opcodes decode as one byte with no mnemonic.
+LEN_TABLE = np.ones(256, dtype=np.uint8)
+MNEM = [None] * 256
+for _size, _table in ((1, OPCODES_1BYTE), (2, OPCODES_2BYTE), (3, OPCODES_3BYTE)):
+    for _op, _mnem in _table.items():
+        LEN_TABLE[_op] = _size
+        MNEM[_op] = _mnem
+_LENGTH = tuple(LEN_TABLE.tolist())
+
+# True for every 16-bit address in the music data area (0x2700-0x32FF)
+MUSIC_RANGE = np.zeros(0x10000, dtype=bool)
+MUSIC_RANGE[0x2700:0x3300] = True
+
+# Display name of a note byte in the music tables: printable bytes as their
+# character, the rest in hex
+_NOTE_NAME = tuple(chr(b) if 0x30 <= b <= 0x7F else f"0x{b:02X}" for b in range(256))
+
+# Sections 4-6 of find_music_commands() depend only on the known protocol,
+# not on the binary, so their lines are built once at import
+KNOWN_CMDS = (0xA0, 0xA2, 0xA3, 0xA4, 0xA6, 0xA7, 0xA8, 0xB0, 0xB5, 0xB6)
+
+TEST_CMDS = (
+    ("Play music 0", (0xB5, 0x60, 0x00, 0xB0)),
+    ("Play music 1", (0xB5, 0x60, 0x01, 0xB0)),
+    ("Stop music", (0xB5, 0x61, 0xB0)),
+    ("Alt music cmd", (0xB5, 0x65, 0x00, 0xB0)),
+    ("Another variant", (0xB5, 0x68, 0x00, 0xB0)),
+)
+
+_PROTOCOL_NOTES = (
+    "\n4. MISSING COMMAND RANGE ANALYSIS:",
+    "-" * 80,
+    f"   Known commands: {', '.join(f'0x{c:02X}' for c in KNOWN_CMDS)}",
+    "\n   Gap analysis:",
+    "   - 0x00-0x5F: Likely note/data values",
+    "   - 0x60-0x9F: MISSING RANGE - likely music commands here!",
+    "   - 0xA0-0xA8: Direct control commands (found)",
+    "   - 0xA9-0xAF: MISSING RANGE",
+    "   - 0xB0: End marker",
+    "   - 0xB5-0xB6: Start markers",
+    
+    "\n5. SUGGESTED TEST COMMANDS:",
+    "-" * 80,
+    "   Test these command sequences:",
+    *(f"   {desc:20s}: {' '.join(f'{b:02X}' for b in cmd)}" for desc, cmd in TEST_CMDS),
+    
+    "\n6. EXAMINING COMMAND DISPATCH MORE CAREFULLY:",
+    "-" * 80,
+    # The area around 0x00E0 where commands are dispatched
+    "   Command processing flow:",
+    "   - 0x00E0: Read buffer, check command type",
+    "   - 0x00F5: SUBB A,#0xA0 (check if >= 0xA0)",
+    "   - If < 0xA0: treated as data/note value",
+    "   - If >= 0xA0: dispatched to handler",
+    "\n   This means commands 0x60-0x9F are in the '<0xA0' path!",
+    "   Need to trace what happens to values in that range.",
+)
+
+_CONCLUSION = """
+The firmware has TWO command systems:
+
+1. Direct Commands (0xA0-0xA8):
+   - Immediate control of AY-3-8910
+   - Set frequency, amplitude directly
+   
+2. Music Commands (likely 0x60-0x9F):
+   - Reference pre-stored music data
+   - Play melodies, sequences
+   - Use note tables for lookup
+
+Commands 0x60-0x9F go through a different code path (< 0xA0 branch).
+They likely index into the music data tables and trigger playback.
+
+NEXT STEPS:
+1. Test commands 0x60-0x70 with various parameters
+2. Monitor what the firmware does at startup (might play intro music)
+3. Analyze code at 0x00F9-0x0150 more carefully (< 0xA0 branch)
+4. Use hardware/emulator to systematically test command values
+"""
+
+# Lines of the "code before" listing
+CMP_LINE = "      0x{:04X}: Compare A with 0x{:02X}".format
+LOAD_LINE = "      0x{:04X}: MOV A,0xF0 (load command)".format
 
 def load_binary(filename):
+    """Map the binary file read-only (no copy into the Python heap)"""
     with open(filename, 'rb') as f:
-        return bytearray(f.read())
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-def find_music_commands(data):
-    """Find commands related to music playback"""
-    print("=" * 80)
-    print("ENHANCED MUSIC COMMAND ANALYSIS")
-    print("=" * 80)
+@lru_cache(maxsize=4)
+def load_binary_cached(filename):
+    """load_binary() as a read-only view, mapped once per file"""
+    return memoryview(load_binary(filename)).toreadonly()
+
+def build_opcode_index(data):
+    """
+    Group the addresses of every byte value in a single pass over data
+    
+    Returns:
+        list indexed by opcode, each entry the sorted array of addresses
+        holding that byte
+    """
+    a = np.frombuffer(data, dtype=np.uint8)
+    # A stable sort keeps the addresses of each byte value in order
+    order = np.argsort(a, kind="stable")
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(a, minlength=256))))
+    return [order[bounds[op]:bounds[op + 1]] for op in range(256)]
+
+@lru_cache(maxsize=4)
+def opcode_index_cached(filename):
+    """build_opcode_index() of load_binary_cached(filename), built once"""
+    return build_opcode_index(load_binary_cached(filename))
+
+def _between(addrs, start, end):
+    """Return the sorted addresses that fall within [start, end)"""
+    return addrs[np.searchsorted(addrs, start):np.searchsorted(addrs, end)]
+
+def _write_lines(lines):
+    """Write a batch of output lines with a single stdout write"""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+
+def find_music_commands(data, index=None):
+    """Find commands related to music playback
+    
+    index is the build_opcode_index() of data; it is built here if not given.
+    """
+    if index is None:
+        index = build_opcode_index(data)
+    out = ["=" * 80,
+           "ENHANCED MUSIC COMMAND ANALYSIS",
+           "=" * 80]
     
-    print("\n1. MUSIC DATA TABLES:")
-    print("-" * 80)
+    out.append("\n1. MUSIC DATA TABLES:")
+    out.append("-" * 80)
     
     # Music sequences identified
     music_tables = {
@@ -28,151 +191,131 @@ def find_music_commands(data):
     }
     
     for addr, desc in music_tables.items():
-        print(f"   0x{addr:04X}: {desc}")
+        out.append(f"   0x{addr:04X}: {desc}")
         # Show first few notes
-        for i in range(0, min(12, len(data)-addr), 3):
-            b1, b2, b3 = data[addr+i], data[addr+i+1], data[addr+i+2]
-            if b1 != 0xFF:
-                note = chr(b1) if 0x30 <= b1 <= 0x7F else f"0x{b1:02X}"
-                print(f"      [{note:4s}] dur={b2:02X} cmd={b3:02X}")
+        notes = data[addr:addr+12]
+        out += [f"      [{_NOTE_NAME[b1]:4s}] dur={b2:02X} cmd={b3:02X}"
+                for b1, b2, b3 in struct.iter_unpack("BBB", notes[:len(notes) // 3 * 3])
+                if b1 != 0xFF]
     
-    print("\n2. CODE REFERENCES TO MUSIC DATA:")
-    print("-" * 80)
+    out.append("\n2. CODE REFERENCES TO MUSIC DATA:")
+    out.append("-" * 80)
     
     # Find all MOV DPTR instructions pointing to music area
-    music_refs = []
-    for addr in range(0, 0x2000):
-        if data[addr] == 0x90:  # MOV DPTR,#data16
-            if addr + 2 < len(data):
-                dptr = (data[addr+1] << 8) | data[addr+2]
-                if 0x2700 <= dptr < 0x3300:  # Music data area
-                    music_refs.append((addr, dptr))
+    a = np.frombuffer(data, dtype=np.uint8)
+    code = _between(index[0x90], 0, min(0x2000, len(a) - 2))  # MOV DPTR,#data16
+    dptr = (a[code + 1].astype(np.uint16) << 8) | a[code + 2]
+    keep = MUSIC_RANGE[dptr]
+    music_refs = list(zip(code[keep].tolist(), dptr[keep].tolist()))
     
-    for code_addr, data_addr in music_refs[:10]:
-        print(f"   Code 0x{code_addr:04X} → Data 0x{data_addr:04X}")
+    out += [f"   Code 0x{code_addr:04X} → Data 0x{data_addr:04X}"
+            for code_addr, data_addr in music_refs[:10]]
     
-    print("\n3. COMMAND VALUE ANALYSIS:")
-    print("-" * 80)
+    out.append("\n3. COMMAND VALUE ANALYSIS:")
+    out.append("-" * 80)
     
     # Analyze what commands lead to music data access
-    print("   Looking for command values that trigger music code...")
+    out.append("   Looking for command values that trigger music code...")
     
     # Check code before each music reference
     for code_addr, data_addr in music_refs[:5]:
-        print(f"\n   Code before 0x{code_addr:04X}:")
+        out.append(f"\n   Code before 0x{code_addr:04X}:")
         # Go back 20 bytes and look for comparisons
-        for i in range(max(0, code_addr-20), code_addr):
-            if data[i] == 0xB4:  # CJNE A,#data,rel
-                cmd_val = data[i+1] if i+1 < len(data) else 0
-                print(f"      0x{i:04X}: Compare A with 0x{cmd_val:02X}")
-            elif data[i] == 0xE5 and i+1 < len(data):  # MOV A,direct
-                src = data[i+1]
-                if src == 0xF0:  # Often temp storage for command
-                    print(f"      0x{i:04X}: MOV A,0xF0 (load command)")
-    
-    print("\n4. MISSING COMMAND RANGE ANALYSIS:")
-    print("-" * 80)
-    
-    known_cmds = [0xA0, 0xA2, 0xA3, 0xA4, 0xA6, 0xA7, 0xA8, 0xB0, 0xB5, 0xB6]
-    print(f"   Known commands: {', '.join(f'0x{c:02X}' for c in known_cmds)}")
-    print("\n   Gap analysis:")
-    print("   - 0x00-0x5F: Likely note/data values")
-    print("   - 0x60-0x9F: MISSING RANGE - likely music commands here!")
-    print("   - 0xA0-0xA8: Direct control commands (found)")
-    print("   - 0xA9-0xAF: MISSING RANGE")
-    print("   - 0xB0: End marker")
-    print("   - 0xB5-0xB6: Start markers")
-    
-    print("\n5. SUGGESTED TEST COMMANDS:")
-    print("-" * 80)
-    
-    test_cmds = [
-        ("Play music 0", [0xB5, 0x60, 0x00, 0xB0]),
-        ("Play music 1", [0xB5, 0x60, 0x01, 0xB0]),
-        ("Stop music", [0xB5, 0x61, 0xB0]),
-        ("Alt music cmd", [0xB5, 0x65, 0x00, 0xB0]),
-        ("Another variant", [0xB5, 0x68, 0x00, 0xB0]),
-    ]
-    
-    print("   Test these command sequences:")
-    for desc, cmd in test_cmds:
-        hex_str = ' '.join(f'{b:02X}' for b in cmd)
-        print(f"   {desc:20s}: {hex_str}")
-    
-    print("\n6. EXAMINING COMMAND DISPATCH MORE CAREFULLY:")
-    print("-" * 80)
-    
-    # Look at the area around 0x00E0 where commands are dispatched
-    print("   Command processing flow:")
-    print("   - 0x00E0: Read buffer, check command type")
-    print("   - 0x00F5: SUBB A,#0xA0 (check if >= 0xA0)")
-    print("   - If < 0xA0: treated as data/note value")
-    print("   - If >= 0xA0: dispatched to handler")
-    print("\n   This means commands 0x60-0x9F are in the '<0xA0' path!")
-    print("   Need to trace what happens to values in that range.")
+        start = max(0, code_addr-20)
+        found = [(i, CMP_LINE(i, data[i+1]))
+                 for i in _between(index[0xB4], start, code_addr).tolist()]  # CJNE A,#data,rel
+        mov = _between(index[0xE5], start, code_addr)  # MOV A,direct
+        # 0xF0 is often temp storage for command
+        found += [(i, LOAD_LINE(i)) for i in mov[a[mov + 1] == 0xF0].tolist()]
+        found.sort()
+        out += [line for _, line in found]
+    
+    out += _PROTOCOL_NOTES
     
     # Look for handling of values < 0xA0
-    print("\n   Code at 0x00F9 (when A < 0xA0):")
-    for i in range(0x00F9, 0x0110):
-        print(f"      0x{i:04X}: {data[i]:02X}")
+    out.append("\n   Code at 0x00F9 (when A < 0xA0):")
+    hexdump = data[0x00F9:0x0110].hex().upper()
+    out += [f"      0x{0x00F9 + i:04X}: {hexdump[2*i:2*i+2]}"
+            for i in range(len(hexdump) // 2)]
     
+    _write_lines(out)
     return music_refs
 
+@njit(cache=True)
+def disasm_block(code, start, count, len_table):
+    """
+    Decode up to count instructions starting at start
+    
+    Returns:
+        (addrs, opcodes, operands) arrays of the decoded instructions. The
+        operand is the byte after the opcode for 2-byte instructions, the
+        big-endian word after it for 3-byte ones and 0 otherwise. Decoding
+        stops at an instruction whose operands would run past the end of
+        code.
+    """
+    addrs = np.empty(count, dtype=np.int32)
+    opcodes = np.empty(count, dtype=np.int32)
+    operands = np.empty(count, dtype=np.int32)
+    end = len(code)
+    addr = start
+    n = 0
+    while n < count and addr < end:
+        opcode = int(code[addr])
+        size = int(len_table[opcode])
+        if addr + size > end:
+            break
+        operand = 0
+        if size == 2:
+            operand = int(code[addr + 1])
+        elif size == 3:
+            operand = (int(code[addr + 1]) << 8) | int(code[addr + 2])
+        addrs[n] = addr
+        opcodes[n] = opcode
+        operands[n] = operand
+        addr += size
+        n += 1
+    return addrs[:n], opcodes[:n], operands[:n]
+
+def iter_disasm(data, start, count):
+    """
+    Decode up to count instructions starting at start
+    
+    Yields:
+        (addr, size, mnemonic, operand) for each instruction, mnemonic None
+        for opcodes not in MNEM and operand as returned by disasm_block.
+        Stops at an instruction whose operands would run past the end of
+        data.
+    """
+    addrs, opcodes, operands = disasm_block(np.frombuffer(data, dtype=np.uint8),
+                                            start, count, LEN_TABLE)
+    for addr, opcode, operand in zip(addrs.tolist(), opcodes.tolist(),
+                                     operands.tolist()):
+        yield addr, _LENGTH[opcode], MNEM[opcode], operand
+
 def analyze_command_flow(data, start_addr):
     """Trace command flow from a specific address"""
-    print(f"\n7. DETAILED FLOW ANALYSIS FROM 0x{start_addr:04X}:")
-    print("-" * 80)
-    
-    opcodes_1byte = {
-        0xA3: "INC DPTR",
-        0x22: "RET",
-        0xE0: "MOVX A,@DPTR",
-        0xF0: "MOVX @DPTR,A",
-        0x93: "MOVC A,@A+DPTR",
-        0xC3: "CLR C",
-    }
+    out = [f"\n7. DETAILED FLOW ANALYSIS FROM 0x{start_addr:04X}:",
+           "-" * 80]
     
-    opcodes_2byte = {
-        0x74: "MOV A,#",
-        0x75: "MOV direct,#",
-        0x90: "MOV DPTR,#",
-        0xE5: "MOV A,direct",
-        0xF5: "MOV direct,A",
-        0x94: "SUBB A,#",
-        0xB4: "CJNE A,#",
-        0x80: "SJMP",
-    }
-    
-    addr = start_addr
-    for _ in range(30):  # Disassemble 30 instructions
-        if addr >= len(data):
-            break
-        
+    for addr, size, mnem, operand in iter_disasm(data, start_addr, 30):  # Disassemble 30 instructions
         opcode = data[addr]
-        
-        if opcode in opcodes_1byte:
-            print(f"   0x{addr:04X}: {data[addr]:02X}       {opcodes_1byte[opcode]}")
-            addr += 1
-        elif opcode in opcodes_2byte:
-            if addr + 1 < len(data):
-                operand = data[addr+1]
-                mnem = opcodes_2byte[opcode]
-                if opcode == 0x90 and addr + 2 < len(data):
-                    dptr = (data[addr+1] << 8) | data[addr+2]
-                    print(f"   0x{addr:04X}: {data[addr]:02X} {data[addr+1]:02X} {data[addr+2]:02X} {mnem}0x{dptr:04X}")
-                    addr += 3
-                    continue
-                print(f"   0x{addr:04X}: {data[addr]:02X} {operand:02X}    {mnem}0x{operand:02X}")
-            addr += 2
+        if mnem is None:
+            out.append(f"   0x{addr:04X}: {opcode:02X}")
+        elif size == 1:
+            out.append(f"   0x{addr:04X}: {opcode:02X}       {mnem}")
+        elif size == 2:
+            out.append(f"   0x{addr:04X}: {opcode:02X} {operand:02X}    {mnem}0x{operand:02X}")
         else:
-            print(f"   0x{addr:04X}: {data[addr]:02X}")
-            addr += 1
+            out.append(f"   0x{addr:04X}: {opcode:02X} {operand >> 8:02X} {operand & 0xFF:02X} {mnem}0x{operand:04X}")
+    
+    _write_lines(out)
 
 def main():
     filename = "/home/runner/work/Mephisto/Mephisto/sound_cpu_8051.bin"
-    data = load_binary(filename)
+    data = load_binary_cached(filename)
+    index = opcode_index_cached(filename)
     
-    music_refs = find_music_commands(data)
+    music_refs = find_music_commands(data, index)
     
     # Analyze the code flow for processing commands < 0xA0
     if music_refs:
@@ -181,27 +324,7 @@ def main():
     print("\n" + "=" * 80)
     print("CONCLUSION:")
     print("=" * 80)
-    print("""
-The firmware has TWO command systems:
-
-1. Direct Commands (0xA0-0xA8):
-   - Immediate control of AY-3-8910
-   - Set frequency, amplitude directly
-   
-2. Music Commands (likely 0x60-0x9F):
-   - Reference pre-stored music data
-   - Play melodies, sequences
-   - Use note tables for lookup
-
-Commands 0x60-0x9F go through a different code path (< 0xA0 branch).
-They likely index into the music data tables and trigger playback.
-
-NEXT STEPS:
-1. Test commands 0x60-0x70 with various parameters
-2. Monitor what the firmware does at startup (might play intro music)
-3. Analyze code at 0x00F9-0x0150 more carefully (< 0xA0 branch)
-4. Use hardware/emulator to systematically test command values
-""")
+    print(_CONCLUSION)
 
 if __name__ == "__main__":
     main()